@@ -1,12 +1,13 @@
 from core.models.document import Document
 from core.models.text_buffer import TextBuffer
 from core.buffer.gap_buffer import GapBuffer
-from core.buffer.undo_stack import UndoStack, Edit
+from core.buffer.undo_stack import UndoStack, UndoStats, Edit
 
 __all__ = [
     "Document",
     "TextBuffer",
     "GapBuffer",
     "UndoStack",
+    "UndoStats",
     "Edit",
 ]
\ No newline at end of file
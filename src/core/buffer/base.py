@@ -0,0 +1,78 @@
+from abc import ABC, abstractmethod
+from typing import Iterator
+
+# Tamaño por defecto de los trozos devueltos por iter_chunks (caracteres)
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class BufferSnapshot(ABC):
+    """Vista inmutable del contenido de un buffer en un instante"""
+
+    @abstractmethod
+    def get_text(self) -> str:
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    def get_range(self, start: int, end: int) -> str:
+        return self.get_text()[start:end]
+
+    def iter_chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+        text = self.get_text()
+        for i in range(0, len(text), chunk_size):
+            yield text[i:i + chunk_size]
+
+
+class StringSnapshot(BufferSnapshot):
+    """Snapshot respaldado por una cadena (copia del contenido)"""
+
+    def __init__(self, text: str):
+        self._text = text
+
+    def get_text(self) -> str:
+        return self._text
+
+    def get_range(self, start: int, end: int) -> str:
+        return self._text[start:end]
+
+    def __len__(self) -> int:
+        return len(self._text)
+
+
+class BufferBackend(ABC):
+    """
+    Interfaz común de los motores de almacenamiento de TextBuffer.
+    Posiciones y longitudes son offsets de carácter.
+    """
+
+    @abstractmethod
+    def insert(self, position: int, text: str):
+        ...
+
+    @abstractmethod
+    def delete(self, position: int, length: int) -> str:
+        ...
+
+    @abstractmethod
+    def get_text(self) -> str:
+        ...
+
+    @abstractmethod
+    def get_range(self, start: int, end: int) -> str:
+        """Texto entre start y end sin materializar el documento"""
+        ...
+
+    @abstractmethod
+    def iter_chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+        """Recorre el contenido en trozos de como mucho chunk_size caracteres"""
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    def create_snapshot(self) -> BufferSnapshot:
+        """Snapshot inmutable; por defecto copia el texto"""
+        return StringSnapshot(self.get_text())
@@ -1,12 +1,51 @@
-class GapBuffer:
+from array import array
+from typing import Iterator
+from core.buffer.base import BufferBackend, DEFAULT_CHUNK_SIZE
+
+class GapBuffer(BufferBackend):
+    """
+    Gap buffer direccionado por caracteres.
+
+    Como las cadenas de CPython (PEP 393), almacena 1 byte por carácter
+    (Latin-1) mientras el texto lo permita y pasa a UCS-4 (array 'w') la
+    primera vez que aparece un carácter fuera de ese rango. Con ancho fijo,
+    posición y longitud son siempre offsets de carácter, sin decodificar.
+    """
+
     def __init__(self, initial_content: str = "", gap_size: int = 1024):
-        content_bytes = initial_content.encode('utf-8')
-        self._buffer = bytearray(len(content_bytes) + gap_size)
-        self._buffer[:len(content_bytes)] = content_bytes
-        self._gap_start = len(content_bytes)
-        self._gap_end = len(content_bytes) + gap_size
+        self._wide = False
+        self._buffer = bytearray()
+        content = self._encode(initial_content)
+        self._buffer = self._allocate(len(content) + gap_size)
+        self._buffer[:len(content)] = content
+        self._gap_start = len(content)
+        self._gap_end = len(content) + gap_size
         self._total_size = len(self._buffer)
-    
+
+    def _allocate(self, size: int):
+        if self._wide:
+            return array('w', '\0') * size
+        return bytearray(size)
+
+    def _encode(self, text: str):
+        """Convierte texto al formato de almacenamiento actual"""
+        if not self._wide:
+            try:
+                return text.encode('latin-1')
+            except UnicodeEncodeError:
+                self._widen()
+        return array('w', text)
+
+    def _decode(self, data) -> str:
+        if self._wide:
+            return data.tounicode()
+        return data.decode('latin-1')
+
+    def _widen(self):
+        """Pasa el almacenamiento de Latin-1 a UCS-4"""
+        self._wide = True
+        self._buffer = array('w', self._buffer.decode('latin-1'))
+
     def _move_gap(self, position: int):
         if position < self._gap_start:
             distance = self._gap_start - position
@@ -20,36 +59,62 @@ class GapBuffer:
                 self._buffer[self._gap_end:self._gap_end + distance]
             self._gap_start += distance
             self._gap_end += distance
-    
+
     def _expand_gap(self, min_size: int):
-        new_gap_size = max(min_size, 1024)
-        new_buffer = bytearray(len(self._buffer) + new_gap_size)
+        # Crecimiento geométrico: coste amortizado O(1) por carácter insertado
+        new_gap_size = max(min_size, 1024, len(self._buffer) // 4)
+        new_buffer = self._allocate(len(self._buffer) + new_gap_size)
         new_buffer[:self._gap_start] = self._buffer[:self._gap_start]
         new_buffer[self._gap_start + new_gap_size:] = \
             self._buffer[self._gap_end:]
         self._buffer = new_buffer
         self._gap_end = self._gap_start + new_gap_size
-    
+
     def insert(self, position: int, text: str):
-        data = text.encode('utf-8')
+        data = self._encode(text)
+        position = max(0, min(position, len(self)))
         self._move_gap(position)
-        
+
         if self._gap_end - self._gap_start < len(data):
             self._expand_gap(len(data))
-        
+
         self._buffer[self._gap_start:self._gap_start + len(data)] = data
         self._gap_start += len(data)
-    
+
     def delete(self, position: int, length: int) -> str:
+        position = max(0, min(position, len(self)))
+        length = max(0, min(length, len(self) - position))
         self._move_gap(position)
         deleted = self._buffer[self._gap_end:self._gap_end + length]
         self._gap_end += length
-        return deleted.decode('utf-8', errors='replace')
-    
+        return self._decode(deleted)
+
     def get_text(self) -> str:
         before = self._buffer[:self._gap_start]
         after = self._buffer[self._gap_end:]
-        return (before + after).decode('utf-8', errors='replace')
-    
+        return self._decode(before + after)
+
+    def _physical(self, position: int) -> int:
+        """Índice en el array de almacenamiento de una posición lógica"""
+        if position < self._gap_start:
+            return position
+        return position + (self._gap_end - self._gap_start)
+
+    def get_range(self, start: int, end: int) -> str:
+        start = max(0, min(start, len(self)))
+        end = max(start, min(end, len(self)))
+        if end <= self._gap_start:
+            return self._decode(self._buffer[start:end])
+        if start >= self._gap_start:
+            return self._decode(self._buffer[self._physical(start):self._physical(end)])
+        return (self._decode(self._buffer[start:self._gap_start])
+                + self._decode(self._buffer[self._gap_end:self._physical(end)]))
+
+    def iter_chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+        """Recorre las dos mitades del gap copiando un trozo cada vez"""
+        for start, end in ((0, self._gap_start), (self._gap_end, len(self._buffer))):
+            for i in range(start, end, chunk_size):
+                yield self._decode(self._buffer[i:min(i + chunk_size, end)])
+
     def __len__(self):
-        return len(self._buffer) - (self._gap_end - self._gap_start)
\ No newline at end of file
+        return len(self._buffer) - (self._gap_end - self._gap_start)
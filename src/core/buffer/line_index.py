@@ -0,0 +1,155 @@
+from array import array
+from bisect import bisect_right
+from itertools import accumulate, repeat
+from operator import add
+from typing import Iterable, List, Tuple
+
+
+class LineIndex:
+    """
+    Índice de líneas mantenido incrementalmente.
+
+    Guarda la longitud de cada línea (incluyendo su '\\n') agrupada en
+    bloques de array('q') (8 bytes por línea), con sumas por bloque; las
+    búsquedas offset↔línea hacen bisect sobre los prefijos de bloque y
+    recorren un único bloque. Todos los offsets están en caracteres.
+    """
+
+    BLOCK_SIZE = 512
+
+    def __init__(self, text: str = ""):
+        self._load(self._scan([text]))
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[str]) -> 'LineIndex':
+        """Construye el índice recorriendo el texto por trozos"""
+        index = cls.__new__(cls)
+        index._load(index._scan(chunks))
+        return index
+
+    @staticmethod
+    def _scan(chunks: Iterable[str]) -> array:
+        """Longitudes de línea de un texto dado por trozos"""
+        lengths = array('q')
+        current = 0
+        for chunk in chunks:
+            parts = chunk.split('\n')
+            if len(parts) == 1:
+                current += len(chunk)
+                continue
+            lengths.append(current + len(parts[0]) + 1)
+            lengths.extend(map(add, map(len, parts[1:-1]), repeat(1)))
+            current = len(parts[-1])
+        lengths.append(current)
+        return lengths
+
+    def _load(self, lengths: array):
+        self._blocks: List[array] = [
+            lengths[i:i + self.BLOCK_SIZE]
+            for i in range(0, len(lengths), self.BLOCK_SIZE)
+        ]
+        self._block_chars: List[int] = [sum(b) for b in self._blocks]
+        self._block_lines: List[int] = [len(b) for b in self._blocks]
+        self._char_starts: List[int] = []
+        self._line_starts: List[int] = []
+        self._dirty = True
+
+    def _refresh(self):
+        """Recalcula los prefijos de bloque si hubo ediciones"""
+        if not self._dirty:
+            return
+        self._char_starts = [0, *accumulate(self._block_chars)]
+        self._line_starts = [0, *accumulate(self._block_lines)]
+        self._dirty = False
+
+    def _locate_line(self, line: int) -> Tuple[int, int]:
+        """Devuelve (bloque, índice dentro del bloque) de una línea"""
+        self._refresh()
+        block = bisect_right(self._line_starts, line) - 1
+        block = min(block, len(self._blocks) - 1)
+        return block, line - self._line_starts[block]
+
+    @property
+    def line_count(self) -> int:
+        self._refresh()
+        return self._line_starts[-1]
+
+    @property
+    def char_count(self) -> int:
+        self._refresh()
+        return self._char_starts[-1]
+
+    def line_to_offset(self, line: int) -> int:
+        """Offset del primer carácter de una línea (0-based)"""
+        line = max(0, min(line, self.line_count - 1))
+        block, index = self._locate_line(line)
+        return self._char_starts[block] + sum(self._blocks[block][:index])
+
+    def line_length(self, line: int, include_newline: bool = False) -> int:
+        """Longitud de una línea, con o sin su salto de línea"""
+        block, index = self._locate_line(line)
+        length = self._blocks[block][index]
+        if not include_newline and line < self.line_count - 1:
+            length -= 1
+        return length
+
+    def offset_to_line_col(self, offset: int) -> Tuple[int, int]:
+        """Convierte un offset en (línea, columna), ambos 0-based"""
+        self._refresh()
+        offset = max(0, min(offset, self._char_starts[-1]))
+        block = bisect_right(self._char_starts, offset) - 1
+        block = min(block, len(self._blocks) - 1)
+
+        column = offset - self._char_starts[block]
+        ends = list(accumulate(self._blocks[block]))
+        index = min(bisect_right(ends, column), len(ends) - 1)
+        if index:
+            column -= ends[index - 1]
+        return self._line_starts[block] + index, column
+
+    def insert(self, offset: int, text: str):
+        """Actualiza el índice tras insertar texto en offset"""
+        if not text:
+            return
+        line, column = self.offset_to_line_col(offset)
+        parts = text.split('\n')
+        if len(parts) == 1:
+            self._replace_lines(line, line, [self.line_length(line, True) + len(text)])
+            return
+
+        original = self.line_length(line, True)
+        new_lengths = [column + len(parts[0]) + 1]
+        new_lengths.extend(len(part) + 1 for part in parts[1:-1])
+        new_lengths.append(original - column + len(parts[-1]))
+        self._replace_lines(line, line, new_lengths)
+
+    def delete(self, offset: int, length: int):
+        """Actualiza el índice tras borrar length caracteres desde offset"""
+        if length <= 0:
+            return
+        first, first_col = self.offset_to_line_col(offset)
+        last, last_col = self.offset_to_line_col(offset + length)
+        merged = first_col + self.line_length(last, True) - last_col
+        self._replace_lines(first, last, [merged])
+
+    def _replace_lines(self, first: int, last: int, new_lengths: List[int]):
+        """Sustituye las líneas first..last por new_lengths"""
+        first_block, first_index = self._locate_line(first)
+        last_block, last_index = self._locate_line(last)
+
+        combined = (
+            self._blocks[first_block][:first_index]
+            + array('q', new_lengths)
+            + self._blocks[last_block][last_index + 1:]
+        )
+        size = self.BLOCK_SIZE
+        if len(combined) < size // 4 and last_block + 1 < len(self._blocks):
+            # Evitar fragmentación: absorber el bloque siguiente
+            last_block += 1
+            combined += self._blocks[last_block]
+        new_blocks = [combined[i:i + size] for i in range(0, len(combined), size)]
+
+        self._blocks[first_block:last_block + 1] = new_blocks
+        self._block_chars[first_block:last_block + 1] = [sum(b) for b in new_blocks]
+        self._block_lines[first_block:last_block + 1] = [len(b) for b in new_blocks]
+        self._dirty = True
@@ -0,0 +1,139 @@
+"""
+Texto de un archivo mapeado en memoria (solo lectura).
+
+Se usa como buffer "original" de la PieceTable en archivos grandes: el
+contenido no se copia al abrir, solo se decodifican los bloques que se
+leen. Al abrir se hace una única pasada por bloques para conocer cuántos
+caracteres tiene cada uno, con memoria constante. Esa pasada también
+detecta la codificación como el modo normal: UTF-8 (con o sin BOM) si el
+archivo es UTF-8 válido y Latin-1 si no, de modo que nunca se sustituye
+un byte por U+FFFD. Los '\r\n' se leen como '\n' y newline recuerda si
+el archivo los usaba. Con encoding y newline se omite la detección (al
+mapear de nuevo un archivo recién guardado con ellos).
+"""
+
+import codecs
+import mmap
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional
+
+# Tamaño de bloque en bytes (se ajusta para no partir secuencias UTF-8)
+BLOCK_SIZE = 256 * 1024
+# Bloques decodificados que se mantienen en caché
+CACHE_BLOCKS = 16
+
+
+class MappedText:
+    """Secuencia de caracteres respaldada por un mmap, con slicing por carácter"""
+
+    def __init__(self, path: Path, encoding: Optional[str] = None, newline: Optional[str] = None):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = self._file.seek(0, 2)
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self._byte_starts: List[int] = [0]
+        self._char_starts: List[int] = [0]
+        self._cache: OrderedDict = OrderedDict()
+        # Los snapshots se leen también desde hilos en segundo plano
+        self._cache_lock = threading.Lock()
+        # Codificación para guardar (la BOM se salta al leer)
+        self.encoding = encoding or (
+            'utf-8-sig' if self._map[:3] == codecs.BOM_UTF8 else 'utf-8'
+        )
+        self.newline = newline or '\n'
+        self._detect_newline = newline is None
+        try:
+            self._index_blocks(size)
+        except UnicodeDecodeError:
+            if encoding is not None:
+                self.close()
+                raise
+            # No es UTF-8: Latin-1 lee cualquier byte sin perder nada
+            self.encoding = 'latin-1'
+            self._index_blocks(size)
+
+    def _index_blocks(self, size: int):
+        """Calcula los límites de bloque en bytes y caracteres"""
+        latin1 = self.encoding == 'latin-1'
+        # Sin detección, los '\r\n' solo cuentan como un carácter en archivos CRLF
+        translate = self._detect_newline or self.newline == '\r\n'
+        position = len(codecs.BOM_UTF8) if self.encoding == 'utf-8-sig' else 0
+        self._byte_starts = [position]
+        self._char_starts = [0]
+        chars = 0
+        crlf = False
+        while position < size:
+            end = min(position + BLOCK_SIZE, size)
+            # No cortar en un byte de continuación UTF-8 (10xxxxxx)
+            while (not latin1 and end < size and end > position + 1
+                   and (self._map[end] & 0xC0) == 0x80):
+                end -= 1
+            # Ni entre el '\r' y el '\n' de un salto de línea
+            if end < size and end > position + 1 and self._map[end - 1:end + 1] == b'\r\n':
+                end -= 1
+            block = self._map[position:end]
+            if latin1 or block.isascii():
+                newlines = block.count(b'\r\n') if translate else 0
+                chars += len(block) - newlines
+            else:
+                # Estricto: un error hace que se relea como Latin-1
+                text = block.decode('utf-8')
+                newlines = text.count('\r\n') if translate else 0
+                chars += len(text) - newlines
+            crlf = crlf or newlines > 0
+            position = end
+            self._byte_starts.append(position)
+            self._char_starts.append(chars)
+        if crlf and self._detect_newline:
+            self.newline = '\r\n'
+
+    def _decode(self, data: bytes) -> str:
+        text = data.decode('latin-1' if self.encoding == 'latin-1' else 'utf-8')
+        return text.replace('\r\n', '\n') if self.newline != '\n' else text
+
+    def _block_text(self, index: int) -> str:
+        """Texto decodificado de un bloque (con caché LRU)"""
+        with self._cache_lock:
+            text = self._cache.get(index)
+            if text is not None:
+                self._cache.move_to_end(index)
+                return text
+        text = self._decode(self._map[self._byte_starts[index]:self._byte_starts[index + 1]])
+        with self._cache_lock:
+            self._cache[index] = text
+            if len(self._cache) > CACHE_BLOCKS:
+                self._cache.popitem(last=False)
+        return text
+
+    def __len__(self) -> int:
+        return self._char_starts[-1]
+
+    def __getitem__(self, key: slice) -> str:
+        start, stop, _ = key.indices(len(self))
+        if stop <= start:
+            return ""
+
+        first = bisect_right(self._char_starts, start) - 1
+        last = bisect_right(self._char_starts, stop - 1) - 1
+        # Lecturas pequeñas (el caso habitual: líneas) pasan por la caché
+        use_cache = last - first < 2
+        parts = []
+        for index in range(first, last + 1):
+            block_start = self._char_starts[index]
+            text = self._block_text(index) if use_cache else self._decode(
+                self._map[self._byte_starts[index]:self._byte_starts[index + 1]]
+            )
+            parts.append(text[max(start - block_start, 0):stop - block_start])
+        return ''.join(parts)
+
+    @property
+    def byte_size(self) -> int:
+        return self._byte_starts[-1] - self._byte_starts[0]
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
@@ -0,0 +1,279 @@
+"""
+Piece table con árbol de piezas persistente.
+
+El texto original se guarda tal cual se leyó (o mapeado en memoria) y cada inserción se añade al
+final de un buffer de adiciones que nunca se reescribe. El documento es la
+secuencia de piezas (buffer, inicio, longitud) guardada en un treap
+implícito: insertar y borrar cuestan O(log n) y, como los nodos nunca se
+modifican (path copying), un snapshot es simplemente la raíz actual.
+"""
+
+import random
+from array import array
+from collections import deque
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple, Union
+
+from core.buffer.base import BufferBackend, BufferSnapshot, DEFAULT_CHUNK_SIZE
+from core.buffer.mapped_text import MappedText
+
+ORIGINAL = 0
+ADD = 1
+
+
+class _Piece:
+    """Nodo inmutable del árbol de piezas"""
+
+    __slots__ = ('source', 'start', 'length', 'priority', 'left', 'right', 'size')
+
+    def __init__(
+        self,
+        source: int,
+        start: int,
+        length: int,
+        priority: float,
+        left: Optional['_Piece'] = None,
+        right: Optional['_Piece'] = None
+    ):
+        self.source = source
+        self.start = start
+        self.length = length
+        self.priority = priority
+        self.left = left
+        self.right = right
+        self.size = length + _size(left) + _size(right)
+
+    def with_children(self, left: Optional['_Piece'], right: Optional['_Piece']) -> '_Piece':
+        return _Piece(self.source, self.start, self.length, self.priority, left, right)
+
+
+def _size(node: Optional[_Piece]) -> int:
+    return node.size if node else 0
+
+
+def _merge(a: Optional[_Piece], b: Optional[_Piece]) -> Optional[_Piece]:
+    """Concatena dos árboles (todas las piezas de a van antes que las de b)"""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if a.priority > b.priority:
+        return a.with_children(a.left, _merge(a.right, b))
+    return b.with_children(_merge(a, b.left), b.right)
+
+
+def _split(node: Optional[_Piece], position: int) -> Tuple[Optional[_Piece], Optional[_Piece]]:
+    """Divide un árbol en los primeros position caracteres y el resto"""
+    if node is None:
+        return None, None
+
+    left_size = _size(node.left)
+    if position <= left_size:
+        left, right = _split(node.left, position)
+        return left, node.with_children(right, node.right)
+
+    offset = position - left_size
+    if offset >= node.length:
+        left, right = _split(node.right, offset - node.length)
+        return node.with_children(node.left, left), right
+
+    # El corte cae dentro de esta pieza: partirla en dos
+    head = _Piece(node.source, node.start, offset, node.priority, node.left, None)
+    tail = _Piece(node.source, node.start + offset, node.length - offset,
+                  node.priority, None, node.right)
+    return head, tail
+
+
+def _replace_last(node: _Piece, length: int) -> _Piece:
+    """Copia el árbol cambiando la longitud de su última pieza"""
+    if node.right is not None:
+        return node.with_children(node.left, _replace_last(node.right, length))
+    return _Piece(node.source, node.start, length, node.priority, node.left, None)
+
+
+def _last_piece(node: Optional[_Piece]) -> Optional[_Piece]:
+    while node is not None and node.right is not None:
+        node = node.right
+    return node
+
+
+def _iter_pieces(node: Optional[_Piece]) -> Iterator[_Piece]:
+    """Recorre las piezas en orden sin recursión"""
+    stack: List[_Piece] = []
+    while stack or node is not None:
+        while node is not None:
+            stack.append(node)
+            node = node.left
+        node = stack.pop()
+        yield node
+        node = node.right
+
+
+class PieceTableSnapshot(BufferSnapshot):
+    """Estado inmutable de una PieceTable (comparte los buffers de texto)"""
+
+    def __init__(self, root: Optional[_Piece], original: Union[str, MappedText], add: array):
+        self._root = root
+        self._original = original
+        self._add = add
+
+    def _piece_text(self, piece: _Piece) -> str:
+        if piece.source == ORIGINAL:
+            return self._original[piece.start:piece.start + piece.length]
+        return self._add[piece.start:piece.start + piece.length].tounicode()
+
+    def get_text(self) -> str:
+        return ''.join(self._piece_text(p) for p in _iter_pieces(self._root))
+
+    def get_range(self, start: int, end: int) -> str:
+        # Los cortes crean nodos nuevos: el árbol compartido no cambia
+        _, rest = _split(self._root, max(0, start))
+        middle, _ = _split(rest, max(0, end - max(0, start)))
+        return PieceTableSnapshot(middle, self._original, self._add).get_text()
+
+    def iter_chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+        for piece in _iter_pieces(self._root):
+            for offset in range(0, piece.length, chunk_size):
+                start = piece.start + offset
+                end = piece.start + min(offset + chunk_size, piece.length)
+                if piece.source == ORIGINAL:
+                    yield self._original[start:end]
+                else:
+                    yield self._add[start:end].tounicode()
+
+    def __len__(self) -> int:
+        return _size(self._root)
+
+
+class PieceTable(BufferBackend):
+    """
+    Buffer de texto basado en piece table. El contenido inicial puede ser
+    un MappedText: el archivo mapeado hace de buffer original sin copiarse.
+    """
+
+    def __init__(self, initial_content: Union[str, MappedText] = ""):
+        self._original = initial_content
+        self._add = array('w')
+        self._root: Optional[_Piece] = None
+        if initial_content:
+            self._root = _Piece(ORIGINAL, 0, len(initial_content), random.random())
+
+    def insert(self, position: int, text: str):
+        if not text:
+            return
+        position = max(0, min(position, len(self)))
+        add_start = len(self._add)
+        self._add.fromunicode(text)
+
+        left, right = _split(self._root, position)
+        last = _last_piece(left)
+        if (last is not None and last.source == ADD
+                and last.start + last.length == add_start):
+            # Tecleo continuo: extender la última pieza en vez de crear otra
+            left = _replace_last(left, last.length + len(text))
+        else:
+            left = _merge(left, _Piece(ADD, add_start, len(text), random.random()))
+        self._root = _merge(left, right)
+
+    def delete(self, position: int, length: int) -> str:
+        position = max(0, min(position, len(self)))
+        length = max(0, min(length, len(self) - position))
+        if not length:
+            return ""
+
+        left, rest = _split(self._root, position)
+        middle, right = _split(rest, length)
+        self._root = _merge(left, right)
+        return PieceTableSnapshot(middle, self._original, self._add).get_text()
+
+    def get_text(self) -> str:
+        return self.create_snapshot().get_text()
+
+    def get_range(self, start: int, end: int) -> str:
+        return self.create_snapshot().get_range(start, end)
+
+    def iter_chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+        return self.create_snapshot().iter_chunks(chunk_size)
+
+    def create_snapshot(self) -> PieceTableSnapshot:
+        """Snapshot O(1): el árbol es persistente"""
+        return PieceTableSnapshot(self._root, self._original, self._add)
+
+    def restore_snapshot(self, snapshot: PieceTableSnapshot):
+        """Vuelve al estado de un snapshot previo de esta misma tabla"""
+        self._root = snapshot._root
+
+    def rebase(self, original: Union[str, MappedText]):
+        """
+        Toma original, con el mismo texto que la tabla, como contenido
+        inicial: queda una sola pieza y el buffer de añadidos se vacía.
+        """
+        self._original = original
+        self._add = array('w')
+        self._root = _Piece(ORIGINAL, 0, len(original), random.random()) if original else None
+
+    def swap_original(self, original: Union[str, MappedText]):
+        """Sustituye el buffer original por otro con el mismo contenido"""
+        self._original = original
+
+    @property
+    def piece_count(self) -> int:
+        return sum(1 for _ in _iter_pieces(self._root))
+
+    def __len__(self) -> int:
+        return _size(self._root)
+
+
+@dataclass
+class Edit:
+    position: int
+    length: int  # caracteres eliminados (0 = inserción)
+    text: str  # texto insertado o eliminado
+    timestamp: float
+    version: int
+
+
+class UndoStack:
+    """
+    Historial que guarda junto a cada Edit el snapshot resultante, de modo
+    que deshacer puede restaurar el árbol en O(1) en vez de reaplicar texto.
+    """
+
+    def __init__(self, max_size: int = 1000, initial: Optional[PieceTableSnapshot] = None):
+        self._undo: deque = deque(maxlen=max_size)
+        self._redo: List[Tuple[Edit, Optional[PieceTableSnapshot]]] = []
+        self._initial = initial
+
+    def push(self, edit: Edit, snapshot: Optional[PieceTableSnapshot] = None):
+        if len(self._undo) == self._undo.maxlen:
+            # El más antiguo sale del historial: su snapshot pasa a ser la base
+            self._initial = self._undo[0][1]
+        self._undo.append((edit, snapshot))
+        self._redo.clear()
+
+    def undo(self) -> Optional[Edit]:
+        if not self._undo:
+            return None
+        entry = self._undo.pop()
+        self._redo.append(entry)
+        return entry[0]
+
+    def redo(self) -> Optional[Edit]:
+        if not self._redo:
+            return None
+        entry = self._redo.pop()
+        self._undo.append(entry)
+        return entry[0]
+
+    @property
+    def current_snapshot(self) -> Optional[PieceTableSnapshot]:
+        """Snapshot del estado tras el último Edit vigente"""
+        if self._undo:
+            return self._undo[-1][1]
+        return self._initial
+
+    def can_undo(self) -> bool:
+        return len(self._undo) > 0
+
+    def can_redo(self) -> bool:
+        return len(self._redo) > 0
@@ -0,0 +1,184 @@
+"""
+Rope de trozos para documentos de cientos de MB.
+
+El texto se guarda como una lista de cadenas inmutables de tamaño acotado
+y un árbol de Fenwick sobre sus longitudes localiza el trozo de una
+posición en O(log n). Una edición reescribe solo los trozos que toca, así
+que su coste no depende de dónde estuvo la edición anterior ni del tamaño
+del documento.
+"""
+
+from typing import Iterator, List, Tuple
+
+from core.buffer.base import BufferBackend, BufferSnapshot, DEFAULT_CHUNK_SIZE
+
+# Tamaño objetivo de cada trozo (caracteres)
+CHUNK_SIZE = 64 * 1024
+MIN_CHUNK = CHUNK_SIZE // 4
+MAX_CHUNK = CHUNK_SIZE * 2
+
+
+def _split_text(text: str) -> List[str]:
+    return [text[i:i + CHUNK_SIZE] for i in range(0, len(text), CHUNK_SIZE)]
+
+
+class RopeSnapshot(BufferSnapshot):
+    """Snapshot de una Rope: los trozos son inmutables, basta copiar la lista"""
+
+    def __init__(self, chunks: Tuple[str, ...], length: int):
+        self._chunks = chunks
+        self._length = length
+
+    def get_text(self) -> str:
+        return ''.join(self._chunks)
+
+    def iter_chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+        return _iter_sized(self._chunks, chunk_size)
+
+    def __len__(self) -> int:
+        return self._length
+
+
+def _iter_sized(chunks, chunk_size: int) -> Iterator[str]:
+    """Devuelve los trozos, partiendo los que superan chunk_size"""
+    for chunk in chunks:
+        if len(chunk) <= chunk_size:
+            if chunk:
+                yield chunk
+            continue
+        for i in range(0, len(chunk), chunk_size):
+            yield chunk[i:i + chunk_size]
+
+
+class Rope(BufferBackend):
+    """Buffer de texto como lista de trozos con índice de Fenwick"""
+
+    def __init__(self, initial_content: str = ""):
+        self._chunks: List[str] = _split_text(initial_content) or [""]
+        self._length = len(initial_content)
+        self._rebuild_index()
+
+    # ==================== ÍNDICE DE FENWICK ====================
+
+    def _rebuild_index(self):
+        """Reconstruye el árbol de Fenwick (tras partir o unir trozos)"""
+        tree = [0] * (len(self._chunks) + 1)
+        for i, chunk in enumerate(self._chunks, 1):
+            tree[i] += len(chunk)
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+        self._top_bit = 1 << (len(self._chunks).bit_length() - 1) if self._chunks else 0
+
+    def _update(self, index: int, delta: int):
+        i = index + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _locate(self, position: int) -> Tuple[int, int]:
+        """Devuelve (trozo, offset dentro del trozo) de una posición"""
+        index = 0
+        remaining = position
+        step = self._top_bit
+        while step:
+            nxt = index + step
+            if nxt < len(self._tree) and self._tree[nxt] < remaining:
+                index = nxt
+                remaining -= self._tree[nxt]
+            step >>= 1
+        # index = número de trozos que quedan enteramente antes de position
+        if index >= len(self._chunks):
+            index = len(self._chunks) - 1
+            remaining = len(self._chunks[index])
+        return index, remaining
+
+    # ==================== EDICIÓN ====================
+
+    def _set_chunks(self, start: int, end: int, new_chunks: List[str]):
+        """Sustituye self._chunks[start:end] manteniendo el índice"""
+        if len(new_chunks) == end - start:
+            for offset, chunk in enumerate(new_chunks):
+                index = start + offset
+                self._update(index, len(chunk) - len(self._chunks[index]))
+                self._chunks[index] = chunk
+            return
+        self._chunks[start:end] = new_chunks
+        if not self._chunks:
+            self._chunks.append("")
+        self._rebuild_index()
+
+    def _normalize(self, text: str) -> List[str]:
+        """Parte un trozo demasiado grande en trozos de tamaño objetivo"""
+        if len(text) <= MAX_CHUNK:
+            return [text]
+        return _split_text(text)
+
+    def insert(self, position: int, text: str):
+        if not text:
+            return
+        position = max(0, min(position, self._length))
+        index, offset = self._locate(position)
+        chunk = self._chunks[index]
+        self._set_chunks(index, index + 1,
+                         self._normalize(chunk[:offset] + text + chunk[offset:]))
+        self._length += len(text)
+
+    def delete(self, position: int, length: int) -> str:
+        position = max(0, min(position, self._length))
+        length = max(0, min(length, self._length - position))
+        if not length:
+            return ""
+
+        first, first_offset = self._locate(position)
+        last, last_offset = self._locate(position + length)
+        if first == last:
+            chunk = self._chunks[first]
+            deleted = chunk[first_offset:last_offset]
+            merged = chunk[:first_offset] + chunk[last_offset:]
+        else:
+            deleted = ''.join(
+                [self._chunks[first][first_offset:]]
+                + self._chunks[first + 1:last]
+                + [self._chunks[last][:last_offset]]
+            )
+            merged = self._chunks[first][:first_offset] + self._chunks[last][last_offset:]
+
+        end = last + 1
+        if len(merged) < MIN_CHUNK and end < len(self._chunks):
+            # Evitar trozos diminutos: absorber el siguiente
+            merged += self._chunks[end]
+            end += 1
+        self._set_chunks(first, end, self._normalize(merged) if merged else [])
+        self._length -= length
+        return deleted
+
+    def get_text(self) -> str:
+        return ''.join(self._chunks)
+
+    def get_range(self, start: int, end: int) -> str:
+        start = max(0, min(start, self._length))
+        end = max(start, min(end, self._length))
+        first, first_offset = self._locate(start)
+        last, last_offset = self._locate(end)
+        if first == last:
+            return self._chunks[first][first_offset:last_offset]
+        return ''.join(
+            [self._chunks[first][first_offset:]]
+            + self._chunks[first + 1:last]
+            + [self._chunks[last][:last_offset]]
+        )
+
+    def iter_chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+        return _iter_sized(list(self._chunks), chunk_size)
+
+    def create_snapshot(self) -> RopeSnapshot:
+        return RopeSnapshot(tuple(self._chunks), self._length)
+
+    @property
+    def chunk_count(self) -> int:
+        return len(self._chunks)
+
+    def __len__(self) -> int:
+        return self._length
@@ -1,40 +1,198 @@
-from dataclasses import dataclass
-from typing import List, Optional
+import sys
+import time
+from array import array
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, List, Optional, Union
 
 @dataclass
 class Edit:
     position: int
     deleted_text: str
     inserted_text: str
+    timestamp: float = field(default_factory=time.monotonic)
+
+    @property
+    def size(self) -> int:
+        """Memoria aproximada del texto que guarda (bytes)"""
+        return sys.getsizeof(self.deleted_text) + sys.getsizeof(self.inserted_text)
+
+@dataclass
+class EditGroup:
+    """Ediciones de una transacción, en orden de aplicación; se deshacen juntas"""
+    edits: List[Edit]
+    timestamp: float = field(default_factory=time.monotonic)
+
+    @property
+    def size(self) -> int:
+        return sum(edit.size for edit in self.edits)
+
+class ReplaceGroup:
+    """
+    Reemplazo masivo en formato compacto: posiciones en un array y textos
+    compartidos entre ediciones (suelen repetirse). Se deshace como un
+    EditGroup; los Edit se crean solo al deshacer o rehacer.
+    """
+
+    def __init__(self, timestamp: Optional[float] = None):
+        self.positions = array('q')
+        self.deleted: List[str] = []
+        self.inserted: List[str] = []
+        self.timestamp = time.monotonic() if timestamp is None else timestamp
+
+    def append(self, position: int, deleted_text: str, inserted_text: str):
+        self.positions.append(position)
+        self.deleted.append(deleted_text)
+        self.inserted.append(inserted_text)
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    @property
+    def edits(self) -> List[Edit]:
+        """Ediciones en orden de aplicación"""
+        return [
+            Edit(position, deleted, inserted, self.timestamp)
+            for position, deleted, inserted in zip(self.positions, self.deleted, self.inserted)
+        ]
+
+    @property
+    def size(self) -> int:
+        # Cada texto compartido cuenta una sola vez
+        strings = {id(text): text for text in self.deleted + self.inserted}
+        return (
+            self.positions.itemsize * len(self.positions)
+            + sys.getsizeof(self.deleted) + sys.getsizeof(self.inserted)
+            + sum(sys.getsizeof(text) for text in strings.values())
+        )
+
+UndoEntry = Union[Edit, EditGroup, ReplaceGroup]
+
+@dataclass
+class UndoStats:
+    undo_entries: int
+    undo_bytes: int
+    redo_entries: int
+    redo_bytes: int
+
+    @property
+    def total_bytes(self) -> int:
+        return self.undo_bytes + self.redo_bytes
 
 class UndoStack:
-    def __init__(self, max_size: int = 1000):
-        self._undo: List[Edit] = []
-        self._redo: List[Edit] = []
+    """
+    Historial de ediciones con agrupación de tecleo.
+
+    Ediciones contiguas dentro de merge_window segundos se fusionan en una
+    sola entrada (escribir, borrar hacia atrás o hacia delante). El
+    historial se limita por número de entradas y por memoria; las más
+    antiguas se descartan en O(1).
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1000,
+        max_bytes: int = 64 * 1024 * 1024,
+        merge_window: float = 1.0
+    ):
+        self._undo: Deque[UndoEntry] = deque()
+        self._redo: List[UndoEntry] = []
         self._max = max_size
-    
-    def push(self, edit: Edit):
-        self._undo.append(edit)
+        self._max_bytes = max_bytes
+        self._merge_window = merge_window
+        self._undo_bytes = 0
+        self._redo_bytes = 0
+        self._group_open = False
+
+    def push(self, edit: UndoEntry):
         self._redo.clear()
-        if len(self._undo) > self._max:
-            self._undo.pop(0)
-    
-    def undo(self) -> Optional[Edit]:
+        self._redo_bytes = 0
+
+        if self._group_open and self._undo and isinstance(edit, Edit):
+            last = self._undo[-1]
+            before = last.size
+            if self._merge(last, edit):
+                self._undo_bytes += last.size - before
+                self._evict()
+                return
+
+        self._undo.append(edit)
+        self._undo_bytes += edit.size
+        self._group_open = True
+        self._evict()
+
+    def _merge(self, last: UndoEntry, edit: Edit) -> bool:
+        """Fusiona edit en last si es continuación del mismo tecleo"""
+        if not isinstance(last, Edit):
+            return False
+        if edit.timestamp - last.timestamp > self._merge_window:
+            return False
+
+        if not edit.deleted_text:
+            # Escritura a continuación de lo último insertado
+            if (last.inserted_text and '\n' not in edit.inserted_text
+                    and edit.position == last.position + len(last.inserted_text)):
+                last.inserted_text += edit.inserted_text
+                last.timestamp = edit.timestamp
+                return True
+            return False
+
+        if edit.inserted_text or last.inserted_text:
+            return False
+        if edit.position + len(edit.deleted_text) == last.position:
+            # Backspace
+            last.position = edit.position
+            last.deleted_text = edit.deleted_text + last.deleted_text
+        elif edit.position == last.position:
+            # Supr
+            last.deleted_text += edit.deleted_text
+        else:
+            return False
+        last.timestamp = edit.timestamp
+        return True
+
+    def _evict(self):
+        """Descarta las entradas más antiguas por encima de los límites"""
+        while len(self._undo) > self._max or (
+            self._undo_bytes > self._max_bytes and len(self._undo) > 1
+        ):
+            self._undo_bytes -= self._undo.popleft().size
+
+    def close_group(self):
+        """Impide que la próxima edición se fusione con la anterior"""
+        self._group_open = False
+
+    def undo(self) -> Optional[UndoEntry]:
         if not self._undo:
             return None
         edit = self._undo.pop()
+        self._undo_bytes -= edit.size
         self._redo.append(edit)
+        self._redo_bytes += edit.size
+        self._group_open = False
         return edit
-    
-    def redo(self) -> Optional[Edit]:
+
+    def redo(self) -> Optional[UndoEntry]:
         if not self._redo:
             return None
         edit = self._redo.pop()
+        self._redo_bytes -= edit.size
         self._undo.append(edit)
+        self._undo_bytes += edit.size
+        self._group_open = False
         return edit
-    
+
     def can_undo(self) -> bool:
         return len(self._undo) > 0
-    
+
     def can_redo(self) -> bool:
-        return len(self._redo) > 0
\ No newline at end of file
+        return len(self._redo) > 0
+
+    def stats(self) -> UndoStats:
+        """Entradas y memoria usadas por el historial"""
+        return UndoStats(
+            undo_entries=len(self._undo),
+            undo_bytes=self._undo_bytes,
+            redo_entries=len(self._redo),
+            redo_bytes=self._redo_bytes,
+        )
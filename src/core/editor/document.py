@@ -7,6 +7,7 @@ from pathlib import Path
 from PySide6.QtCore import QObject, Property, Signal, Slot
 
 from ..buffer.piece_table import PieceTable, UndoStack, Edit
+from ..models.file_saver import save_chunks
 from ..syntax.tokenizer import IncrementalTokenizer
 
 
@@ -44,7 +45,8 @@ class Document(QObject):
         self.cursor_line = 0
         self.cursor_column = 0
 
-    def _detect_language(self, file_path: Optional[str]) -> str:
+    @staticmethod
+    def _detect_language(file_path: Optional[str]) -> str:
         """Detecta lenguaje por extensión"""
         if not file_path:
             return "plaintext"
@@ -92,9 +94,7 @@ class Document(QObject):
         self.undo_stack.push(edit, snapshot)
 
         # Marcar líneas como dirty para re-tokenización
-        start_line = self.buffer.get_text()[:position].count("\n")
-        end_line = start_line + text.count("\n")
-        self.tokenizer.mark_dirty(start_line, end_line)
+        self._mark_edit(position, "", text)
 
         self.textChanged.emit()
         self.modifiedChanged.emit(self._modified)
@@ -113,12 +113,18 @@ class Document(QObject):
         self.undo_stack.push(edit, snapshot)
 
         # Marcar líneas como dirty
-        start_line = self.buffer.get_text()[:position].count("\n")
-        self.tokenizer.mark_dirty(start_line, start_line + 1)
+        self._mark_edit(position, deleted, "")
 
         self.textChanged.emit()
         self.modifiedChanged.emit(self._modified)
 
+    def _mark_edit(self, position: int, removed: str, inserted: str):
+        """Pasa al tokenizador solo las líneas que tocó una edición"""
+        start_line = self.buffer.get_range(0, position).count("\n")
+        self.tokenizer.edit_lines(
+            start_line, start_line + removed.count("\n"), start_line + inserted.count("\n")
+        )
+
     @Slot()
     def undo(self):
         """Deshacer"""
@@ -129,11 +135,12 @@ class Document(QObject):
         # Aplicar undo al buffer
         if edit.length == 0:  # Was insert
             self.buffer.delete(edit.position, len(edit.text))
+            self._mark_edit(edit.position, edit.text, "")
         else:  # Was delete
             self.buffer.insert(edit.position, edit.text)
+            self._mark_edit(edit.position, "", edit.text)
 
         self.version = edit.version - 1
-        self.tokenizer.invalidate_cache()
         self.textChanged.emit()
 
     @Slot()
@@ -146,11 +153,12 @@ class Document(QObject):
         # Aplicar redo
         if edit.length == 0:  # Was insert
             self.buffer.insert(edit.position, edit.text)
+            self._mark_edit(edit.position, "", edit.text)
         else:  # Was delete
             self.buffer.delete(edit.position, edit.length)
+            self._mark_edit(edit.position, edit.text, "")
 
         self.version = edit.version
-        self.tokenizer.invalidate_cache()
         self.textChanged.emit()
 
     @Slot(result=bool)
@@ -160,8 +168,7 @@ class Document(QObject):
             return False
 
         try:
-            with open(self.file_path, "w", encoding="utf-8") as f:
-                f.write(self.buffer.get_text())
+            save_chunks(Path(self.file_path), self.buffer.iter_chunks())
             self._modified = False
             self.modifiedChanged.emit(False)
             return True
@@ -1,21 +1,56 @@
+import codecs
+import os
 from pathlib import Path
 from typing import Optional
+from core.buffer.mapped_text import MappedText
+from core.models.file_saver import SaveResult, save_chunks
 from core.models.text_buffer import TextBuffer
 
+# Archivos a partir de este tamaño (bytes) se abren mapeados en memoria
+LARGE_FILE_THRESHOLD = 16 * 1024 * 1024
+
 class Document:
     def __init__(self, file_path: Optional[Path] = None):
         self.file_path = file_path
         self._modified = False
         self._language = "plaintext"
+        self._mapped: Optional[MappedText] = None
+        self._encoding = 'utf-8'
+        self._newline = '\n'
+        self._last_save: Optional[SaveResult] = None
         
         content = ""
         if file_path and file_path.exists():
-            content = file_path.read_text(encoding='utf-8')
             self._language = self._detect_language(file_path)
+            if file_path.stat().st_size >= LARGE_FILE_THRESHOLD:
+                # Modo archivo grande: sin copia ni decodificación completa
+                self._mapped = MappedText(file_path)
+                self._encoding = self._mapped.encoding
+                self._newline = self._mapped.newline
+                content = self._mapped
+            else:
+                content = self._read_content(file_path)
         
         self.buffer = TextBuffer(content)
     
-    def _detect_language(self, path: Path) -> str:
+    def _read_content(self, path: Path) -> str:
+        """Lee el archivo recordando codificación y saltos de línea"""
+        data = path.read_bytes()
+        if data.startswith(codecs.BOM_UTF8):
+            self._encoding = 'utf-8-sig'
+        try:
+            text = data.decode(self._encoding)
+        except UnicodeDecodeError:
+            self._encoding = 'latin-1'
+            text = data.decode(self._encoding)
+        
+        if '\r\n' in text:
+            self._newline = '\r\n'
+            text = text.replace('\r\n', '\n')
+        return text
+    
+    @staticmethod
+    def _detect_language(path: Path) -> str:
         ext_map = {
             '.py': 'python',
             '.js': 'javascript',
@@ -32,18 +67,83 @@ class Document:
             return False
         
         try:
-            self.file_path.write_text(self.buffer.get_text(), encoding='utf-8')
+            try:
+                self._last_save = self._write()
+            except UnicodeEncodeError:
+                if self._encoding != 'latin-1':
+                    raise
+                # El texto ya no cabe en Latin-1 (p. ej. se escribió "€"):
+                # se guarda en UTF-8, que lo representa todo
+                self._encoding = 'utf-8'
+                self._last_save = self._write()
             self._modified = False
             return True
         except Exception as e:
             print(f"Save error: {e}")
             return False
     
+    def _write(self) -> SaveResult:
+        mapped = self._mapped
+        if mapped is None or os.path.realpath(self.file_path) != os.path.realpath(mapped.path):
+            return save_chunks(
+                self.file_path,
+                self.buffer.iter_chunks(),
+                encoding=self._encoding,
+                newline=self._newline,
+            )
+        
+        # Windows no deja reemplazar un archivo mapeado: se suelta el mapeo
+        # con el temporal ya escrito y después se mapea el archivo nuevo
+        released = False
+        
+        def release():
+            nonlocal released
+            mapped.close()
+            released = True
+        
+        try:
+            result = save_chunks(
+                self.file_path,
+                self.buffer.iter_chunks(),
+                encoding=self._encoding,
+                newline=self._newline,
+                before_replace=release,
+            )
+        except BaseException:
+            if released:
+                # El rename falló: el archivo sigue siendo el original
+                self._remap(MappedText(mapped.path, mapped.encoding, mapped.newline), saved=False)
+            raise
+        self._remap(MappedText(mapped.path, self._encoding, self._newline), saved=True)
+        return result
+    
+    def _remap(self, mapped: MappedText, saved: bool):
+        self._mapped = mapped
+        self.buffer.remap(mapped, saved)
+    
     def save_as(self, file_path: Path) -> bool:
         self.file_path = file_path
         self._language = self._detect_language(file_path)
         return self.save()
     
+    def close(self):
+        """Libera el mapeo del archivo en modo archivo grande"""
+        if self._mapped is not None:
+            self._mapped.close()
+    
+    @property
+    def large_file(self) -> bool:
+        return self._mapped is not None
+    
+    @property
+    def last_save(self) -> Optional[SaveResult]:
+        """Bytes escritos y duración del último guardado"""
+        return self._last_save
+    
+    @property
+    def encoding(self) -> str:
+        return self._encoding
+    
     @property
     def modified(self) -> bool:
         return self._modified
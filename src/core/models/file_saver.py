@@ -0,0 +1,114 @@
+"""
+Guardado atómico y por trozos.
+
+El contenido se escribe en streaming a un archivo temporal del mismo
+directorio, se sincroniza a disco y se renombra sobre el destino. Si algo
+falla a mitad, el archivo original queda intacto. Un enlace simbólico se
+sigue hasta su destino, que es el archivo que se reemplaza, y el temporal
+toma los permisos y el propietario del original.
+"""
+
+import codecs
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+
+@dataclass
+class SaveResult:
+    bytes_written: int
+    seconds: float
+
+    @property
+    def bytes_per_second(self) -> float:
+        if self.seconds <= 0:
+            return float(self.bytes_written)
+        return self.bytes_written / self.seconds
+
+
+def _read_umask() -> int:
+    # os.umask solo se puede leer cambiándola: se hace una vez al importar,
+    # antes de que haya hilos que creen archivos
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# Permisos de un archivo nuevo según la umask del proceso
+_DEFAULT_MODE = 0o666 & ~_read_umask()
+
+
+def _fsync_directory(directory: Path):
+    """Persiste el rename (no disponible en Windows)"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def save_chunks(
+    path: Path,
+    chunks: Iterable[str],
+    encoding: str = 'utf-8',
+    newline: str = '\n',
+    before_replace: Optional[Callable[[], None]] = None
+) -> SaveResult:
+    """
+    Escribe los trozos en path de forma atómica. before_replace se llama
+    con el temporal ya escrito, justo antes de renombrarlo sobre path.
+    """
+    started = time.perf_counter()
+    # Se reemplaza el destino del enlace, no el enlace
+    path = Path(os.path.realpath(path))
+    try:
+        info = path.stat()
+    except FileNotFoundError:
+        info = None
+    mode = info.st_mode & 0o7777 if info is not None else _DEFAULT_MODE
+
+    fd, tmp_name = tempfile.mkstemp(
+        prefix=f'.{path.name}.', suffix='.tmp', dir=path.parent
+    )
+    written = 0
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            encoder = codecs.getincrementalencoder(encoding)()
+            for chunk in chunks:
+                if newline != '\n':
+                    chunk = chunk.replace('\n', newline)
+                data = encoder.encode(chunk)
+                f.write(data)
+                written += len(data)
+            data = encoder.encode('', final=True)
+            f.write(data)
+            written += len(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if info is not None and hasattr(os, 'chown'):
+            try:
+                os.chown(tmp_name, info.st_uid, info.st_gid)
+            except OSError:
+                # Sin privilegios para dar el archivo a otro usuario
+                pass
+        os.chmod(tmp_name, mode)
+        if before_replace is not None:
+            before_replace()
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+    _fsync_directory(path.parent)
+    return SaveResult(written, time.perf_counter() - started)
@@ -1,10 +1,72 @@
+import os
 from pathlib import Path
-from typing import List, Optional, Dict
+from typing import Iterator, List, Optional, Dict, Tuple
 from enum import Enum
 
+from core.models.gitignore import GitIgnore
+
+# Carpetas que no se muestran ni se recorren
+IGNORED_NAMES = {'__pycache__', 'node_modules', '.git', '.venv', 'dist', 'build'}
+# Entradas que se muestran de una vez; el resto se pide por páginas
+FILE_PAGE_SIZE = 500
+
+def is_ignored(name: str) -> bool:
+    """Nombres que el árbol no muestra nunca (ocultos y carpetas generadas)"""
+    return name.startswith('.') or name in IGNORED_NAMES
+
+def visible_entry(
+    directory: Path, entry: os.DirEntry, gitignore: Optional[GitIgnore]
+) -> Optional[bool]:
+    """
+    Reglas de exclusión del árbol, que también usan la búsqueda en archivos
+    y el índice de trigramas: si la entrada es una carpeta, o None si está
+    excluida por nombre o por .gitignore.
+    """
+    name = entry.name
+    if is_ignored(name):
+        return None
+    try:
+        is_dir = entry.is_dir()
+    except OSError:
+        is_dir = False
+    if gitignore is not None and gitignore.is_ignored(directory, name, is_dir):
+        return None
+    return is_dir
+
+def walk_files(
+    root: Path, start: Optional[Path] = None, folders: Optional[List[str]] = None
+) -> Iterator[os.DirEntry]:
+    """
+    Archivos visibles bajo start (por defecto root, que es donde empiezan
+    las reglas .gitignore), sin entrar en enlaces a carpetas. En folders
+    se añaden las carpetas recorridas.
+    """
+    gitignore = GitIgnore(root)
+    pending = [start or root]
+    while pending:
+        directory = pending.pop()
+        try:
+            scanner = os.scandir(directory)
+        except OSError:
+            continue
+        if folders is not None:
+            folders.append(str(directory))
+        children = []
+        with scanner:
+            for entry in scanner:
+                is_dir = visible_entry(directory, entry, gitignore)
+                if is_dir is None:
+                    continue
+                if not is_dir:
+                    yield entry
+                elif not entry.is_symlink():
+                    children.append(Path(entry.path))
+        pending.extend(reversed(children))
+
 class FileType(Enum):
     FILE = "file"
     FOLDER = "folder"
+    MORE = "more"  # fila "N más" de una carpeta paginada
 
 class FileNode:
     """Nodo del árbol de archivos"""
@@ -24,6 +86,8 @@ class FileNode:
         self.parent = parent
         self.expanded = False
         self.children: List['FileNode'] = []
+        # Entradas aún sin nodo (nombre, es carpeta), ya filtradas y ordenadas
+        self.pending: List[Tuple[str, bool]] = []
     
     def to_dict(self) -> Dict:
         """Convierte a diccionario para QML"""
@@ -71,6 +135,7 @@ class FileNode:
             'level': self.level,
             'expanded': self.expanded,
             'isFolder': self.file_type == FileType.FOLDER,
+            'isMore': self.file_type == FileType.MORE,
             'icon': self.get_icon(),  # NUEVO
         }
 
@@ -81,6 +146,7 @@ class FileTree:
         self.root_path = root_path
         self.root_nodes: List[FileNode] = []
         self._flat_list: List[FileNode] = []
+        self._gitignore: Optional[GitIgnore] = None
         
         if root_path:
             self.load_directory(root_path)
@@ -92,6 +158,7 @@ class FileTree:
         
         self.root_path = path
         self.root_nodes = []
+        self._gitignore = GitIgnore(path)
         
         # Crear nodo raíz
         root = FileNode(
@@ -120,45 +187,59 @@ class FileTree:
             return
         
         try:
-            entries = list(node.path.iterdir())
-            
-            # Filtrar y ordenar
-            filtered = []
-            for entry in entries:
-                if entry.name.startswith('.'):
-                    continue
-                if entry.name in ['__pycache__', 'node_modules', '.git', '.venv', 'dist', 'build']:
-                    continue
-                filtered.append(entry)
-            
-            # Ordenar: carpetas primero, luego por nombre
-            filtered.sort(key=lambda x: (not x.is_dir(), x.name.lower()))
-            
-            # Límite de archivos por carpeta (evitar carpetas gigantes)
-            MAX_FILES = 500
-            if len(filtered) > MAX_FILES:
-                filtered = filtered[:MAX_FILES]
-            
-            for entry in filtered:
-                child_type = FileType.FOLDER if entry.is_dir() else FileType.FILE
-                child = FileNode(
-                    name=entry.name,
-                    path=entry,
-                    file_type=child_type,
-                    level=node.level + 1,
-                    parent=node
-                )
-                
-                node.children.append(child)
-                
-                # Solo auto-expandir el primer nivel
-                if child.file_type == FileType.FOLDER and child.level <= 1:
-                    child.expanded = False  # No expandir automáticamente
-        
+            node.pending = self._scan(node.path)
         except PermissionError:
-            pass
+            return
         except Exception as e:
             print(f"Error loading {node.path}: {e}")
+            return
+        self._load_page(node)
+    
+    def _scan(self, path: Path) -> List[Tuple[str, bool]]:
+        """
+        Entradas visibles de una carpeta, carpetas primero. El tipo sale de
+        DirEntry (readdir ya lo trae): no hace falta un stat por entrada.
+        """
+        entries = []
+        with os.scandir(path) as scanner:
+            for entry in scanner:
+                is_dir = visible_entry(path, entry, self._gitignore)
+                if is_dir is not None:
+                    entries.append((entry.name, is_dir))
+        entries.sort(key=lambda entry: (not entry[1], entry[0].lower()))
+        return entries
+    
+    def _load_page(self, node: FileNode):
+        """Crea los nodos de la siguiente página de entradas de node"""
+        page, node.pending = node.pending[:FILE_PAGE_SIZE], node.pending[FILE_PAGE_SIZE:]
+        if node.children and node.children[-1].file_type == FileType.MORE:
+            node.children.pop()
+        for name, is_dir in page:
+            node.children.append(FileNode(
+                name=name,
+                path=node.path / name,
+                file_type=FileType.FOLDER if is_dir else FileType.FILE,
+                level=node.level + 1,
+                parent=node
+            ))
+        if node.pending:
+            # Fila para pedir la siguiente página; su path es el de la carpeta
+            node.children.append(FileNode(
+                name=f"{len(node.pending)} more…",
+                path=node.path,
+                file_type=FileType.MORE,
+                level=node.level + 1,
+                parent=node
+            ))
+    
+    def load_more(self, path: str) -> bool:
+        """Muestra la siguiente página de una carpeta grande"""
+        node = self._find_node_by_path(Path(path))
+        if not node or not node.pending:
+            return False
+        self._load_page(node)
+        self._rebuild_flat_list()
+        return True
     
     def toggle_node(self, path: str) -> bool:
         """Expande/colapsa un nodo"""
@@ -170,7 +251,7 @@ class FileTree:
         
         # Cargar hijos si es la primera vez que se expande
         if node.expanded and not node.children:
-            self._load_children(node)
+            self._load_children(node, max_depth=node.level + 1)
         
         self._rebuild_flat_list()
         return True
@@ -179,7 +260,7 @@ class FileTree:
         """Busca un nodo por su path"""
         def search(nodes: List[FileNode]) -> Optional[FileNode]:
             for node in nodes:
-                if node.path == path:
+                if node.path == path and node.file_type != FileType.MORE:
                     return node
                 if node.children:
                     result = search(node.children)
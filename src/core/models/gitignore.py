@@ -0,0 +1,127 @@
+"""
+Reglas de .gitignore para el árbol de archivos y los recorridos del
+workspace (búsqueda en archivos e índice de trigramas).
+
+Cubre la sintaxis habitual: comentarios, negación con '!', patrones solo
+de carpetas ('/' final), anclados a su carpeta ('/' inicial o intermedio),
+comodines '*', '?', '[...]' y '**'. Cada carpeta añade las reglas de su
+.gitignore a las de sus padres; la última regla que coincide decide.
+"""
+
+import re
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+
+class IgnoreRule(NamedTuple):
+    pattern: 're.Pattern'
+    negated: bool
+    dir_only: bool
+
+
+def _translate(glob: str) -> str:
+    """Expresión regular de un patrón de .gitignore (ruta relativa con '/')"""
+    parts = []
+    i = 0
+    while i < len(glob):
+        char = glob[i]
+        if glob.startswith('**/', i):
+            parts.append('(?:.*/)?')
+            i += 3
+            continue
+        if glob.startswith('/**', i) and i + 3 == len(glob):
+            parts.append('/.*')
+            break
+        if glob.startswith('**', i):
+            parts.append('.*')
+            i += 2
+            continue
+        if char == '*':
+            parts.append('[^/]*')
+        elif char == '?':
+            parts.append('[^/]')
+        elif char == '[':
+            end = glob.find(']', i + 1)
+            if end < 0:
+                parts.append(re.escape(char))
+            else:
+                body = glob[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                parts.append(f'[{body}]')
+                i = end
+        elif char == '\\' and i + 1 < len(glob):
+            i += 1
+            parts.append(re.escape(glob[i]))
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    return ''.join(parts)
+
+
+def parse_rules(text: str) -> List[IgnoreRule]:
+    """Reglas de un archivo .gitignore"""
+    rules = []
+    for line in text.splitlines():
+        line = line.rstrip()
+        if not line or line.startswith('#'):
+            continue
+        negated = line.startswith('!')
+        if negated:
+            line = line[1:]
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            continue
+        if '/' in line:
+            # Anclado a la carpeta del .gitignore
+            expression = _translate(line.lstrip('/'))
+        else:
+            # Solo el nombre: vale a cualquier profundidad
+            expression = '(?:.*/)?' + _translate(line)
+        rules.append(IgnoreRule(re.compile(expression + r'\Z'), negated, dir_only))
+    return rules
+
+
+class GitIgnore:
+    """Reglas .gitignore de un árbol, leídas una vez por carpeta"""
+
+    def __init__(self, root: Path):
+        self.root = root
+        # Carpeta -> [(carpeta base, reglas)] de ella y de sus padres
+        self._cache: Dict[Path, List[Tuple[Path, List[IgnoreRule]]]] = {}
+
+    def _rules(self, directory: Path) -> List[Tuple[Path, List[IgnoreRule]]]:
+        cached = self._cache.get(directory)
+        if cached is not None:
+            return cached
+        inherited: List[Tuple[Path, List[IgnoreRule]]] = []
+        if directory != self.root and self.root in directory.parents:
+            inherited = self._rules(directory.parent)
+        own = self._read(directory / '.gitignore')
+        rules = inherited + [(directory, own)] if own else inherited
+        self._cache[directory] = rules
+        return rules
+
+    @staticmethod
+    def _read(path: Path) -> Optional[List[IgnoreRule]]:
+        try:
+            return parse_rules(path.read_text(encoding='utf-8', errors='replace'))
+        except OSError:
+            return None
+
+    def is_ignored(self, directory: Path, name: str, is_dir: bool) -> bool:
+        """Si la entrada name de directory está excluida"""
+        ignored = False
+        for base, rules in self._rules(directory):
+            relative = (directory / name).relative_to(base).as_posix()
+            for rule in rules:
+                if rule.dir_only and not is_dir:
+                    continue
+                if rule.pattern.match(relative):
+                    ignored = not rule.negated
+        return ignored
+
+    def clear(self):
+        """Olvida las reglas leídas (al refrescar el árbol)"""
+        self._cache.clear()
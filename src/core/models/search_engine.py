@@ -1,82 +1,766 @@
-from typing import List, Tuple, Optional
+from array import array
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+import time
+from threading import Event
+from typing import TYPE_CHECKING, AnyStr, Callable, Iterable, Iterator, List, Tuple, Optional
 import re
 
+if TYPE_CHECKING:
+    from core.models.text_buffer import TextBuffer
+
+# Lotes con más ediciones que esto se resuelven con una búsqueda completa
+SESSION_RESCAN_THRESHOLD = 64
+# Búsqueda en segundo plano: tamaño máximo y antigüedad máxima de cada lote
+SEARCH_BATCH_SIZE = 1000
+SEARCH_BATCH_INTERVAL = 0.05
+# Consultas compiladas que se conservan (buscar mientras se escribe)
+PATTERN_CACHE_SIZE = 64
+# La vía rápida literal se usa si hay menos de una coincidencia por estos caracteres
+LITERAL_DENSITY_LIMIT = 64
+
 class SearchMatch:
+    __slots__ = ('start', 'end', 'line')
+    
     def __init__(self, start: int, end: int, line: int):
         self.start = start
         self.end = end
         self.line = line
 
+
+class MatchList:
+    """
+    Coincidencias en columnas compactas (inicio, fin, línea) ordenadas por
+    inicio. Los SearchMatch se crean solo al acceder a ellos.
+
+    Como en un gap buffer, las coincidencias desde _split guardan su
+    posición relativa a un desplazamiento común: tras una edición solo se
+    reescriben las que quedan entre el punto anterior y el nuevo.
+    """
+
+    def __init__(self):
+        self._starts = array('q')
+        self._ends = array('q')
+        self._lines = array('q')
+        self._split = 0
+        self._delta = 0
+        self._line_delta = 0
+
+    def append(self, start: int, end: int, line: int):
+        self._starts.append(start - self._delta)
+        self._ends.append(end - self._delta)
+        self._lines.append(line - self._line_delta)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __getitem__(self, index: int) -> SearchMatch:
+        if index < 0:
+            index += len(self._starts)
+        if index >= self._split:
+            return SearchMatch(
+                self._starts[index] + self._delta,
+                self._ends[index] + self._delta,
+                self._lines[index] + self._line_delta,
+            )
+        return SearchMatch(self._starts[index], self._ends[index], self._lines[index])
+
+    def __iter__(self) -> Iterator[SearchMatch]:
+        for i in range(len(self._starts)):
+            yield self[i]
+
+    def _move_split(self, index: int):
+        """Lleva el punto de desplazamiento a index"""
+        if index == self._split:
+            return
+        low, high = sorted((index, self._split))
+        # Hacia atrás: absolutas -> relativas; hacia delante: al revés
+        delta = -self._delta if index < self._split else self._delta
+        line_delta = -self._line_delta if index < self._split else self._line_delta
+        for column, offset in ((self._starts, delta), (self._ends, delta), (self._lines, line_delta)):
+            if offset:
+                column[low:high] = array('q', [value + offset for value in column[low:high]])
+        self._split = index
+
+    def _bisect(self, column: array, value: int, right: bool, lo: int = 0) -> int:
+        find = bisect_right if right else bisect_left
+        if lo < self._split:
+            index = find(column, value, lo, self._split)
+            if index < self._split:
+                return index
+            lo = self._split
+        return find(column, value - self._delta, lo)
+
+    def bisect_starts(self, position: int, right: bool = False, lo: int = 0) -> int:
+        return self._bisect(self._starts, position, right, lo)
+
+    def bisect_ends(self, position: int, right: bool = False, lo: int = 0) -> int:
+        # Las coincidencias no se solapan: los finales también están ordenados
+        return self._bisect(self._ends, position, right, lo)
+
+    def index_after(self, position: int) -> int:
+        """Índice de la primera coincidencia que empieza después de position"""
+        return self.bisect_starts(position, right=True)
+
+    def index_before(self, position: int) -> int:
+        """Índice de la última coincidencia que empieza antes de position (-1 si no hay)"""
+        return self.bisect_starts(position) - 1
+
+    def in_range(self, start: int, end: int) -> List[SearchMatch]:
+        """Coincidencias que se solapan con [start, end), p. ej. el viewport"""
+        first = self.bisect_ends(start, right=True)
+        last = self.bisect_starts(end, lo=first)
+        return [self[i] for i in range(first, last)]
+
+    def replace(self, first: int, last: int, other: 'MatchList'):
+        """Sustituye las coincidencias [first, last) por las de other"""
+        self._move_split(first)
+        other._move_split(0)
+        for column, source, offset in (
+            (self._starts, other._starts, other._delta - self._delta),
+            (self._ends, other._ends, other._delta - self._delta),
+            (self._lines, other._lines, other._line_delta - self._line_delta),
+        ):
+            column[first:last] = (
+                array('q', [value + offset for value in source]) if offset else source
+            )
+
+    def shift(self, first: int, delta: int, line_delta: int):
+        """Desplaza las coincidencias desde first (tras una edición anterior)"""
+        self._move_split(first)
+        self._delta += delta
+        self._line_delta += line_delta
+
+
+def _collect(
+    regex: 'SearchPattern',
+    text: str,
+    offset: int = 0,
+    line: int = 0,
+    pos: int = 0,
+    stop: Optional[int] = None
+) -> MatchList:
+    """
+    Coincidencias de regex en text, desplazadas offset caracteres y line
+    líneas. Se busca desde pos y solo las que empiezan antes de stop.
+    """
+    matches = MatchList()
+    last_start = 0
+    for match in regex.finditer(text, pos):
+        if stop is not None and match.start() >= stop:
+            break
+        # Contar solo los saltos desde la coincidencia anterior
+        line += text.count('\n', last_start, match.start())
+        last_start = match.start()
+        matches.append(offset + match.start(), offset + match.end(), line)
+    return matches
+
+
+class LiteralMatch:
+    """Coincidencia de la vía rápida literal, con la interfaz de re.Match que se usa"""
+    __slots__ = ('string', '_start', '_end')
+
+    def __init__(self, string, start: int, end: int):
+        self.string = string
+        self._start = start
+        self._end = end
+
+    def start(self) -> int:
+        return self._start
+
+    def end(self) -> int:
+        return self._end
+
+    def group(self):
+        return self.string[self._start:self._end]
+
+    def expand(self, template: AnyStr) -> AnyStr:
+        return template
+
+
+class LiteralPattern:
+    """
+    Búsqueda de un literal con str.find / bytes.find en lugar del motor de
+    expresiones regulares, que sin distinguir mayúsculas compara carácter a
+    carácter. Sin distinguir mayúsculas solo se usa con texto ASCII (donde
+    lower() no cambia posiciones) y pocas coincidencias; si no, recurre a
+    fallback.
+    """
+
+    def __init__(self, literal: AnyStr, ignore_case: bool, fallback: re.Pattern):
+        self.literal = literal
+        self.ignore_case = ignore_case
+        self.fallback = fallback
+        self._folded = literal.lower() if ignore_case and literal.isascii() else None
+
+    def finditer(self, string, pos: int = 0):
+        if not self.literal:
+            return self.fallback.finditer(string, pos)
+        if not self.ignore_case:
+            # Con str/bytes el motor de regex ya busca el literal en C tan rápido como find
+            if isinstance(string, (str, bytes)):
+                return self.fallback.finditer(string, pos)
+            haystack, needle = string, self.literal
+        elif self._folded is not None and isinstance(string, (str, bytes)) and string.isascii():
+            haystack, needle = string.lower(), self._folded
+        else:
+            return self.fallback.finditer(string, pos)
+        if isinstance(haystack, (str, bytes)):
+            # Con muchas coincidencias el motor de regex (en C) sale más barato
+            count = haystack.count(needle, pos)
+            if not count:
+                return iter(())
+            if count * LITERAL_DENSITY_LIMIT > len(haystack) - pos:
+                return self.fallback.finditer(string, pos)
+        return self._find_all(string, haystack, needle, pos)
+
+    @staticmethod
+    def _find_all(string, haystack, needle, pos: int) -> Iterator[LiteralMatch]:
+        length = len(needle)
+        start = haystack.find(needle, pos)
+        while start >= 0:
+            yield LiteralMatch(string, start, start + length)
+            start = haystack.find(needle, start + length)
+
+    def subn(self, replacement: AnyStr, string: AnyStr) -> Tuple[AnyStr, int]:
+        if not self.ignore_case:
+            count = string.count(self.literal)
+            return (string.replace(self.literal, replacement) if count else string), count
+        return self.fallback.subn(lambda match: replacement, string)
+
+
+class SearchPattern:
+    """
+    Consulta compilada. regex=False busca el texto tal cual (con la vía
+    rápida literal si se puede); regex=True la interpreta como expresión
+    regular, con ^ y $ por línea.
+
+    max_length es la longitud máxima de una coincidencia y max_lines los
+    saltos de línea que puede abarcar (None: sin límite conocido). Con
+    ellos la búsqueda por trozos y la búsqueda viva saben cuánto contexto
+    volver a mirar.
+    """
+
+    def __init__(self, query: str, case_sensitive: bool, whole_word: bool, regex: bool):
+        self.query = query
+        self.is_regex = regex
+        pattern = query if regex else re.escape(query)
+        if whole_word:
+            pattern = r'\b(?:' + pattern + r')\b' if regex else r'\b' + pattern + r'\b'
+        flags = 0 if case_sensitive else re.IGNORECASE
+        if regex:
+            flags |= re.MULTILINE
+        self.regex = re.compile(pattern, flags)
+        self._matcher = (
+            LiteralPattern(query, not case_sensitive, self.regex)
+            if not regex and not whole_word else self.regex
+        )
+        if regex:
+            self.max_length, self.max_lines = _regex_bounds(self.regex)
+        else:
+            self.max_length, self.max_lines = len(query), query.count('\n')
+
+    def finditer(self, string, pos: int = 0):
+        return self._matcher.finditer(string, pos)
+
+    def subn(self, replacement: str, string: str) -> Tuple[str, int]:
+        """Reemplaza todo; en modo regex replacement admite \\1, \\g<nombre>..."""
+        if self.is_regex:
+            return self.regex.subn(replacement, string)
+        if isinstance(self._matcher, LiteralPattern):
+            return self._matcher.subn(replacement, string)
+        return self.regex.subn(lambda match: replacement, string)
+
+
+def _regex_bounds(regex: re.Pattern) -> Tuple[Optional[int], Optional[int]]:
+    """(max_length, max_lines) de una expresión regular; None si no hay cota"""
+    from re import _parser as sre_parse
+    try:
+        parsed = sre_parse.parse(regex.pattern, regex.flags)
+    except Exception:
+        return None, None
+    multiline = _can_match_newline(parsed, bool(regex.flags & re.DOTALL))
+    # Con lookarounds la coincidencia depende de texto fuera de ella
+    _, longest = parsed.getwidth()
+    if longest >= sre_parse.MAXREPEAT or _has_lookaround(parsed):
+        return None, (None if multiline else 0)
+    return longest, (longest if multiline else 0)
+
+
+# Clases (\d, \w, \S...) que nunca incluyen el salto de línea
+_SAME_LINE_CATEGORIES = {
+    'CATEGORY_NOT_SPACE', 'CATEGORY_DIGIT', 'CATEGORY_WORD', 'CATEGORY_NOT_LINEBREAK',
+    'CATEGORY_UNI_NOT_SPACE', 'CATEGORY_UNI_DIGIT', 'CATEGORY_UNI_WORD',
+    'CATEGORY_UNI_NOT_LINEBREAK',
+}
+
+
+def _can_match_newline(items, dotall: bool) -> bool:
+    """Si algún elemento del patrón analizado puede consumir un '\\n'"""
+    from re import _parser as sre_parse
+    for op, value in items:
+        if op is sre_parse.LITERAL:
+            found = value == 10
+        elif op is sre_parse.NOT_LITERAL:
+            found = value != 10
+        elif op is sre_parse.ANY:
+            found = dotall
+        elif op is sre_parse.AT or op is sre_parse.GROUPREF:
+            found = False
+        elif op is sre_parse.CATEGORY:
+            found = _category_matches_newline(value)
+        elif op is sre_parse.IN:
+            found = _set_matches_newline(value)
+        elif op is sre_parse.BRANCH:
+            found = any(_can_match_newline(branch, dotall) for branch in value[1])
+        elif op is sre_parse.SUBPATTERN:
+            _, add_flags, del_flags, sub = value
+            sub_dotall = (dotall or bool(add_flags & re.DOTALL)) and not del_flags & re.DOTALL
+            found = _can_match_newline(sub, sub_dotall)
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, sre_parse.POSSESSIVE_REPEAT):
+            found = value[1] > 0 and _can_match_newline(value[2], dotall)
+        elif op is sre_parse.ATOMIC_GROUP:
+            found = _can_match_newline(value, dotall)
+        elif op is sre_parse.ASSERT or op is sre_parse.ASSERT_NOT:
+            found = _can_match_newline(value[1], dotall)
+        elif op is sre_parse.GROUPREF_EXISTS:
+            _, yes, no = value
+            found = _can_match_newline(yes, dotall) or (
+                no is not None and _can_match_newline(no, dotall)
+            )
+        else:
+            found = True
+        if found:
+            return True
+    return False
+
+
+def _category_matches_newline(category) -> bool:
+    return str(category) not in _SAME_LINE_CATEGORIES
+
+
+def _set_matches_newline(items) -> bool:
+    from re import _parser as sre_parse
+    negate = False
+    found = False
+    for op, value in items:
+        if op is sre_parse.NEGATE:
+            negate = True
+        elif op is sre_parse.LITERAL:
+            found = found or value == 10
+        elif op is sre_parse.RANGE:
+            found = found or value[0] <= 10 <= value[1]
+        elif op is sre_parse.CATEGORY:
+            found = found or _category_matches_newline(value)
+        else:
+            found = True
+    return found != negate
+
+
+def _has_lookaround(items) -> bool:
+    from re import _parser as sre_parse
+    for op, value in items:
+        if op is sre_parse.ASSERT or op is sre_parse.ASSERT_NOT:
+            return True
+        if op is sre_parse.BRANCH:
+            if any(_has_lookaround(branch) for branch in value[1]):
+                return True
+        elif op is sre_parse.SUBPATTERN:
+            if _has_lookaround(value[3]):
+                return True
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, sre_parse.POSSESSIVE_REPEAT):
+            if _has_lookaround(value[2]):
+                return True
+        elif op is sre_parse.ATOMIC_GROUP:
+            if _has_lookaround(value):
+                return True
+        elif op is sre_parse.GROUPREF_EXISTS:
+            if _has_lookaround(value[1]) or (value[2] is not None and _has_lookaround(value[2])):
+                return True
+    return False
+
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def compile_query(
+    query: str, case_sensitive: bool, whole_word: bool, regex: bool = False
+) -> SearchPattern:
+    """
+    Compila una consulta (con caché: al escribir la consulta se repiten las
+    mismas). Con regex=True lanza re.error si la expresión no es válida.
+    """
+    return SearchPattern(query, case_sensitive, whole_word, regex)
+
+
+def _iter_found(
+    chunks: Iterable[str],
+    pattern: SearchPattern,
+    cancel: Optional[Event] = None
+) -> Iterator[Tuple[int, object, int]]:
+    """
+    Recorre los trozos de un documento y devuelve (base, coincidencia,
+    línea) sin unirlos en una sola cadena; la coincidencia es relativa a
+    base.
+
+    Si la longitud de las coincidencias está acotada, entre trozos se
+    conservan max_length + 1 caracteres, de modo que las que cruzan un
+    borde (y los \\b de sus extremos) se resuelven igual que sobre el
+    texto completo. Si no lo está pero no cruzan líneas, se conserva la
+    última línea incompleta; si tampoco, se busca al final sobre todo el
+    texto. Se detiene en cuanto se activa cancel.
+    """
+    max_length = pattern.max_length
+    line_bounded = pattern.max_lines == 0
+    window = ""
+    base = 0        # offset en el documento de window[0]
+    pos = 0         # dónde sigue la búsqueda dentro de window
+    line = 0        # línea de window[line_pos]
+    line_pos = 0
+    iterator = iter(chunks)
+    final = False
+    while not final:
+        if cancel is not None and cancel.is_set():
+            return
+        chunk = next(iterator, None)
+        final = chunk is None
+        if chunk:
+            window += chunk
+        # Solo son definitivas las coincidencias que no pueden llegar al borde
+        if final:
+            limit = len(window)
+        elif max_length is not None:
+            limit = len(window) - max_length - 1
+        elif line_bounded:
+            limit = window.rfind('\n')
+        else:
+            continue
+
+        for match in pattern.finditer(window, pos):
+            start = match.start()
+            if start > limit:
+                break
+            line += window.count('\n', line_pos, start)
+            line_pos = start
+            yield base, match, line
+            pos = match.end() if match.end() > start else start + 1
+
+        # Conservar la cola (y un carácter antes para los \\b)
+        pos = max(pos, limit + 1)
+        cut = min(max(pos - 1, 0), len(window))
+        line += window.count('\n', line_pos, cut)
+        window = window[cut:]
+        base += cut
+        pos -= cut
+        line_pos = 0
+
+
+def iter_matches(
+    chunks: Iterable[str],
+    pattern: SearchPattern,
+    cancel: Optional[Event] = None
+) -> Iterator[Tuple[int, int, int]]:
+    """(inicio, fin, línea) de cada coincidencia en los trozos de un documento"""
+    for base, match, line in _iter_found(chunks, pattern, cancel):
+        yield base + match.start(), base + match.end(), line
+
+
+def iter_match_batches(
+    chunks: Iterable[str],
+    query: str,
+    case_sensitive: bool = False,
+    whole_word: bool = False,
+    cancel: Optional[Event] = None,
+    batch_size: int = SEARCH_BATCH_SIZE,
+    regex: bool = False
+) -> Iterator[List[SearchMatch]]:
+    """
+    Agrupa las coincidencias de iter_matches en lotes para enviarlas a otro
+    hilo. Un lote sale al llenarse o a los SEARCH_BATCH_INTERVAL segundos,
+    así los primeros resultados llegan enseguida.
+    """
+    if not query:
+        return
+    pattern = compile_query(query, case_sensitive, whole_word, regex)
+    batch: List[SearchMatch] = []
+    last_flush = time.monotonic()
+    for start, end, line in iter_matches(chunks, pattern, cancel):
+        if cancel is not None and cancel.is_set():
+            return
+        batch.append(SearchMatch(start, end, line))
+        if len(batch) >= batch_size or time.monotonic() - last_flush >= SEARCH_BATCH_INTERVAL:
+            yield batch
+            batch = []
+            last_flush = time.monotonic()
+    if batch and not (cancel is not None and cancel.is_set()):
+        yield batch
+
+
+class SearchSession:
+    """
+    Búsqueda viva ligada a un TextBuffer.
+
+    Tras cada edición solo se vuelven a buscar las líneas tocadas; las
+    coincidencias posteriores se desplazan y la lista sigue ordenada.
+    """
+
+    def __init__(
+        self,
+        buffer: 'TextBuffer',
+        query: str,
+        case_sensitive: bool = False,
+        whole_word: bool = False,
+        on_update: Optional[Callable[[], None]] = None,
+        regex: bool = False
+    ):
+        self._buffer = buffer
+        self._pattern = compile_query(query, case_sensitive, whole_word, regex)
+        # Líneas extra que puede ocupar una coincidencia (None: cualquiera)
+        self._extra_lines = self._pattern.max_lines
+        self._on_update = on_update
+        self.matches = MatchList()
+        self._rescan_all()
+        buffer.add_listener(self._on_edits)
+
+    def close(self):
+        self._buffer.remove_listener(self._on_edits)
+
+    def _rescan_all(self):
+        # Por trozos: un archivo mapeado no llega a materializarse
+        found = MatchList()
+        for start, end, line in iter_matches(self._buffer.iter_chunks(), self._pattern):
+            found.append(start, end, line)
+        self.matches.replace(0, len(self.matches), found)
+
+    def _on_edits(self, edits):
+        if len(edits) > SESSION_RESCAN_THRESHOLD or self._extra_lines is None:
+            self._rescan_all()
+        else:
+            dirty: List[List[int]] = []
+            for edit in edits:
+                self._shift(edit, dirty)
+            for start, end in self._merge(dirty):
+                self._rescan(start, end)
+        if self._on_update is not None:
+            self._on_update()
+
+    def _shift(self, edit, dirty: List[List[int]]):
+        """Quita las coincidencias que toca edit y desplaza las siguientes"""
+        position = edit.position
+        old_end = position + len(edit.deleted_text)
+        delta = len(edit.inserted_text) - len(edit.deleted_text)
+        line_delta = edit.inserted_text.count('\n') - edit.deleted_text.count('\n')
+
+        matches = self.matches
+        first = matches.bisect_ends(position)
+        last = matches.bisect_starts(old_end, right=True, lo=first)
+        matches.replace(first, last, MatchList())
+        matches.shift(first, delta, line_delta)
+
+        # Rangos sucios anteriores, llevados a las coordenadas nuevas
+        for span in dirty:
+            if span[0] >= old_end:
+                span[0] += delta
+            elif span[0] > position:
+                span[0] = position
+            if span[1] >= old_end:
+                span[1] += delta
+            elif span[1] > position:
+                span[1] = position + len(edit.inserted_text)
+        dirty.append([position, position + len(edit.inserted_text)])
+
+    @staticmethod
+    def _merge(dirty: List[List[int]]) -> List[List[int]]:
+        merged: List[List[int]] = []
+        for start, end in sorted(dirty):
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        return merged
+
+    def _line_end(self, line: int) -> int:
+        buffer = self._buffer
+        return buffer.line_to_offset(line + 1) if line + 1 < buffer.line_count else len(buffer)
+
+    def _rescan(self, start: int, end: int):
+        """Vuelve a buscar en las líneas completas que cubren [start, end]"""
+        buffer = self._buffer
+        extra = self._extra_lines
+        first_line = max(buffer.line_of(start) - extra, 0)
+        last_line = min(buffer.line_of(end) + extra, buffer.line_count - 1)
+        region_start = buffer.line_to_offset(first_line)
+        region_end = self._line_end(last_line)
+
+        matches = self.matches
+        # Al final del documento entran también las coincidencias vacías
+        # que empiezan justo en region_end (p. ej. "a|" o "b*")
+        at_end = region_end == len(buffer)
+        first = matches.bisect_starts(region_start)
+        last = len(matches) if at_end else matches.bisect_starts(region_end, lo=first)
+        # Con consultas de varias líneas una coincidencia puede cruzar los bordes
+        scan_from = max(region_start, matches[first - 1].end) if first else region_start
+        old_tail = max(region_end, matches[last - 1].end) if last > first else region_end
+
+        # Los bordes de la región son saltos de línea: \b se comporta igual
+        text_end = self._line_end(min(last_line + extra, buffer.line_count - 1))
+        text = buffer.get_range(region_start, text_end)
+        found = _collect(
+            self._pattern, text, region_start, first_line,
+            scan_from - region_start, None if at_end else region_end - region_start
+        )
+        new_tail = max(region_end, found[-1].end) if found else region_end
+        if new_tail != old_tail:
+            # El resto de coincidencias ya no encaja con las nuevas
+            self._rescan_all()
+            return
+        matches.replace(first, last, found)
+
+    @property
+    def match_count(self) -> int:
+        return len(self.matches)
+
 class SearchEngine:
     """Motor de búsqueda para el editor"""
     
     def __init__(self):
         self._last_search = ""
-        self._matches: List[SearchMatch] = []
+        self._matches = MatchList()
         self._current_match_index = -1
+        self._session: Optional[SearchSession] = None
+        self._session_callback: Optional[Callable[[], None]] = None
+        self._stream_cancel: Optional[Event] = None
+        self._pattern: Optional[SearchPattern] = None
+    
+    def search_buffer(
+        self,
+        buffer: 'TextBuffer',
+        query: str,
+        case_sensitive: bool = False,
+        whole_word: bool = False,
+        on_update: Optional[Callable[[], None]] = None,
+        regex: bool = False
+    ) -> MatchList:
+        """
+        Busca en un TextBuffer y mantiene las coincidencias al día con sus
+        ediciones. on_update se llama después de cada actualización.
+        """
+        self.cancel_stream()
+        self.close_session()
+        self._last_search = query
+        if not query:
+            self._matches = MatchList()
+            self._current_match_index = -1
+            return self._matches
+        
+        self._session = SearchSession(
+            buffer, query, case_sensitive, whole_word, self._session_updated, regex
+        )
+        self._pattern = self._session._pattern
+        self._session_callback = on_update
+        self._matches = self._session.matches
+        self._current_match_index = 0 if self._matches else -1
+        return self._matches
+    
+    def close_session(self):
+        """Deja de seguir las ediciones del buffer"""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+    
+    def _session_updated(self):
+        if self._current_match_index >= len(self._matches):
+            self._current_match_index = len(self._matches) - 1
+        elif self._current_match_index < 0 and self._matches:
+            self._current_match_index = 0
+        if self._session_callback is not None:
+            self._session_callback()
     
     def search(
         self, 
         text: str, 
         query: str, 
         case_sensitive: bool = False,
-        whole_word: bool = False
-    ) -> List[SearchMatch]:
-        """Busca todas las ocurrencias"""
+        whole_word: bool = False,
+        line_of: Optional[Callable[[int], int]] = None,
+        regex: bool = False
+    ) -> MatchList:
+        """
+        Busca todas las ocurrencias.
+        line_of permite resolver la línea con el índice del buffer.
+        """
+        self.cancel_stream()
+        self.close_session()
         if not query:
-            self._matches = []
-            return []
+            self._matches = MatchList()
+            self._current_match_index = -1
+            return self._matches
         
         self._last_search = query
-        self._matches = []
-        
-        # Construir regex
-        pattern = re.escape(query)
-        if whole_word:
-            pattern = r'\b' + pattern + r'\b'
-        
-        flags = 0 if case_sensitive else re.IGNORECASE
-        regex = re.compile(pattern, flags)
-        
-        # Buscar todas las ocurrencias
-        for match in regex.finditer(text):
-            line = text[:match.start()].count('\n')
-            self._matches.append(
-                SearchMatch(match.start(), match.end(), line)
-            )
+        pattern = self._pattern = compile_query(query, case_sensitive, whole_word, regex)
+        if line_of is None:
+            self._matches = _collect(pattern, text)
+        else:
+            self._matches = MatchList()
+            for match in pattern.finditer(text):
+                self._matches.append(match.start(), match.end(), line_of(match.start()))
         
         self._current_match_index = 0 if self._matches else -1
         return self._matches
     
+    def search_chunks(
+        self,
+        chunks: Iterable[str],
+        query: str,
+        case_sensitive: bool = False,
+        whole_word: bool = False,
+        regex: bool = False
+    ) -> Iterator[SearchMatch]:
+        """
+        Búsqueda en streaming sobre los trozos del documento: las
+        coincidencias se devuelven (y acumulan) según aparecen. Empezar
+        otra búsqueda cancela la anterior.
+        """
+        self.cancel_stream()
+        self.close_session()
+        self._last_search = query
+        self._matches = MatchList()
+        self._current_match_index = -1
+        if not query:
+            return
+        
+        cancel = self._stream_cancel = Event()
+        matches = self._matches
+        pattern = self._pattern = compile_query(query, case_sensitive, whole_word, regex)
+        for start, end, line in iter_matches(chunks, pattern, cancel):
+            matches.append(start, end, line)
+            if self._current_match_index < 0:
+                self._current_match_index = 0
+            yield SearchMatch(start, end, line)
+    
+    def cancel_stream(self):
+        """Detiene la búsqueda en streaming en curso"""
+        if self._stream_cancel is not None:
+            self._stream_cancel.set()
+            self._stream_cancel = None
+    
     def next_match(self, current_position: int) -> Optional[SearchMatch]:
         """Encuentra siguiente coincidencia"""
         if not self._matches:
             return None
         
-        # Buscar siguiente match después de la posición actual
-        for i, match in enumerate(self._matches):
-            if match.start > current_position:
-                self._current_match_index = i
-                return match
-        
-        # Si no hay siguiente, volver al primero (wrap around)
-        self._current_match_index = 0
-        return self._matches[0]
+        # Siguiente match después de la posición actual; si no hay, volver al primero
+        index = self._matches.index_after(current_position)
+        self._current_match_index = index if index < len(self._matches) else 0
+        return self._matches[self._current_match_index]
     
     def previous_match(self, current_position: int) -> Optional[SearchMatch]:
         """Encuentra coincidencia anterior"""
         if not self._matches:
             return None
         
-        # Buscar match anterior a la posición actual
-        for i in range(len(self._matches) - 1, -1, -1):
-            if self._matches[i].start < current_position:
-                self._current_match_index = i
-                return self._matches[i]
-        
-        # Si no hay anterior, ir al último (wrap around)
-        self._current_match_index = len(self._matches) - 1
-        return self._matches[-1]
+        # Match anterior a la posición actual; si no hay, ir al último
+        index = self._matches.index_before(current_position)
+        self._current_match_index = index if index >= 0 else len(self._matches) - 1
+        return self._matches[self._current_match_index]
     
     def replace_current(
         self, 
@@ -102,17 +786,87 @@ class SearchEngine:
         query: str,
         replacement: str,
         case_sensitive: bool = False,
-        whole_word: bool = False
+        whole_word: bool = False,
+        regex: bool = False
     ) -> Tuple[str, int]:
-        """Reemplaza todas las coincidencias"""
-        pattern = re.escape(query)
-        if whole_word:
-            pattern = r'\b' + pattern + r'\b'
-        
-        flags = 0 if case_sensitive else re.IGNORECASE
-        
-        new_text, count = re.subn(pattern, replacement, text, flags=flags)
-        return new_text, count
+        """
+        Reemplaza todas las coincidencias. En modo literal replacement se
+        inserta tal cual; en modo regex admite referencias a grupos.
+        """
+        if not query:
+            return text, 0
+        return compile_query(query, case_sensitive, whole_word, regex).subn(replacement, text)
+    
+    def replace_all_in_buffer(
+        self,
+        buffer: 'TextBuffer',
+        query: str,
+        replacement: str,
+        case_sensitive: bool = False,
+        whole_word: bool = False,
+        progress: Optional[Callable[[int, int], None]] = None,
+        regex: bool = False
+    ) -> int:
+        """
+        Reemplaza todas las coincidencias directamente en el buffer. Se
+        buscan por trozos (sin copiar el documento) y se aplican como un
+        único lote con un undo compacto.
+        """
+        if not query:
+            return 0
+        pattern = compile_query(query, case_sensitive, whole_word, regex)
+        starts = array('q')
+        ends = array('q')
+        if not regex:
+            for start, end, _ in iter_matches(buffer.iter_chunks(), pattern):
+                starts.append(start)
+                ends.append(end)
+            return buffer.apply_edits(
+                ((start, end - start, replacement) for start, end in zip(starts, ends)),
+                progress
+            )
+        # Con grupos cada reemplazo puede ser distinto
+        replacements = []
+        for base, match, _ in _iter_found(buffer.iter_chunks(), pattern):
+            starts.append(base + match.start())
+            ends.append(base + match.end())
+            replacements.append(match.expand(replacement))
+        return buffer.apply_edits(
+            zip(starts, (end - start for start, end in zip(starts, ends)), replacements),
+            progress
+        )
+    
+    def replacement_for(self, buffer: 'TextBuffer', match: SearchMatch, replacement: str) -> str:
+        """
+        Texto que sustituye a match: en modo regex, con los grupos
+        expandidos (se vuelve a evaluar sobre sus líneas).
+        """
+        pattern = self._pattern
+        if pattern is None or not pattern.is_regex:
+            return replacement
+        first_line = buffer.line_of(match.start)
+        last_line = buffer.line_of(match.end)
+        region_start = buffer.line_to_offset(first_line)
+        region_end = (
+            buffer.line_to_offset(last_line + 1)
+            if last_line + 1 < buffer.line_count else len(buffer)
+        )
+        text = buffer.get_range(region_start, region_end)
+        found = pattern.regex.match(text, match.start - region_start)
+        if found is None or found.end() != match.end - region_start:
+            return replacement
+        return found.expand(replacement)
+    
+    @property
+    def current(self) -> Optional[SearchMatch]:
+        """Coincidencia actual, si la hay"""
+        if 0 <= self._current_match_index < len(self._matches):
+            return self._matches[self._current_match_index]
+        return None
+    
+    def matches_in_range(self, start: int, end: int) -> List[SearchMatch]:
+        """Coincidencias visibles en [start, end)"""
+        return self._matches.in_range(start, end)
     
     @property
     def match_count(self) -> int:
@@ -1,57 +1,328 @@
+from contextlib import contextmanager
+from dataclasses import replace
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
+from core.buffer.base import BufferBackend, BufferSnapshot, DEFAULT_CHUNK_SIZE
 from core.buffer.gap_buffer import GapBuffer
-from core.buffer.undo_stack import UndoStack, Edit
+from core.buffer.line_index import LineIndex
+from core.buffer.mapped_text import MappedText
+from core.buffer.piece_table import PieceTable
+from core.buffer.rope import Rope
+from core.buffer.undo_stack import UndoStack, UndoStats, Edit, EditGroup, ReplaceGroup
+
+# Motores de almacenamiento disponibles
+BACKENDS = {
+    'gap': GapBuffer,
+    'piece_table': PieceTable,
+    'rope': Rope,
+}
+
+# A partir de este tamaño (caracteres) se usa piece table: abrir no copia
+PIECE_TABLE_THRESHOLD = 1024 * 1024
+# Documentos enormes: trozos acotados, coste por edición independiente del tamaño
+ROPE_THRESHOLD = 64 * 1024 * 1024
+# Lotes con más ediciones que esto reconstruyen el índice de líneas al final
+# (una pasada lineal) en vez de actualizarlo edición a edición
+LINE_INDEX_BULK_THRESHOLD = 256
+# Cada cuántas ediciones de un lote se informa del progreso
+PROGRESS_INTERVAL = 10000
+
+def select_backend(size: int) -> str:
+    """Elige el motor adecuado para un documento de size caracteres"""
+    if size >= ROPE_THRESHOLD:
+        return 'rope'
+    if size >= PIECE_TABLE_THRESHOLD:
+        return 'piece_table'
+    return 'gap'
 
 class TextBuffer:
-    def __init__(self, content: str = ""):
-        self._buffer = GapBuffer(content)
+    def __init__(
+        self,
+        content: Union[str, MappedText] = "",
+        backend: Optional[str] = None
+    ):
+        if isinstance(content, MappedText):
+            # Archivo mapeado: solo la piece table lo usa sin copiarlo
+            backend = 'piece_table'
+        backend = backend or select_backend(len(content))
+        self._buffer: BufferBackend = BACKENDS[backend](content)
+        # El índice de líneas de un archivo mapeado se construye al primer uso
+        self._line_index: Optional[LineIndex] = (
+            LineIndex(content) if isinstance(content, str) else None
+        )
         self._undo_stack = UndoStack()
         self._version = 0
+        self._listeners: List[Callable[[List[Edit]], None]] = []
+        self._transaction: Optional[List[Edit]] = None
+        self._transaction_depth = 0
     
-    def insert(self, position: int, text: str):
+    @property
+    def _lines(self) -> LineIndex:
+        if self._line_index is None:
+            self._line_index = LineIndex.from_chunks(self._buffer.iter_chunks())
+        return self._line_index
+    
+    def _expect_bulk(self, count: int):
+        """Prepara un lote de count ediciones"""
+        if count > LINE_INDEX_BULK_THRESHOLD:
+            # Se reconstruirá por trozos en la próxima consulta
+            self._line_index = None
+    
+    def _insert(self, position: int, text: str):
         self._buffer.insert(position, text)
-        self._version += 1
-        edit = Edit(position=position, deleted_text="", inserted_text=text)
-        self._undo_stack.push(edit)
+        if self._line_index is not None:
+            self._line_index.insert(position, text)
     
-    def delete(self, position: int, length: int):
+    def _delete(self, position: int, length: int) -> str:
         deleted = self._buffer.delete(position, length)
-        self._version += 1
-        edit = Edit(position=position, deleted_text=deleted, inserted_text="")
-        self._undo_stack.push(edit)
+        if self._line_index is not None:
+            self._line_index.delete(position, len(deleted))
+        return deleted
     
-    def undo(self):
-        edit = self._undo_stack.undo()
-        if not edit:
+    def insert(self, position: int, text: str):
+        self._insert(position, text)
+        self._record(Edit(position=position, deleted_text="", inserted_text=text))
+    
+    def delete(self, position: int, length: int):
+        deleted = self._delete(position, length)
+        self._record(Edit(position=position, deleted_text=deleted, inserted_text=""))
+    
+    def replace(self, position: int, length: int, text: str):
+        """Reemplaza un rango registrando un único Edit con el cambio real"""
+        deleted = self._delete(position, length) if length else ""
+        if deleted == text:
+            # Sin cambio efectivo: restaurar y no ensuciar el historial
+            if deleted:
+                self._insert(position, deleted)
+            return
+        if text:
+            self._insert(position, text)
+        self._record(Edit(position=position, deleted_text=deleted, inserted_text=text))
+    
+    # ==================== TRANSACCIONES ====================
+    
+    def begin_transaction(self):
+        """Agrupa las ediciones siguientes en un único undo y una notificación"""
+        self._transaction_depth += 1
+        if self._transaction_depth == 1:
+            self._transaction = []
+    
+    def commit(self):
+        """Cierra la transacción abierta con begin_transaction()"""
+        if self._transaction_depth == 0:
+            return
+        self._transaction_depth -= 1
+        if self._transaction_depth > 0:
             return
         
+        edits, self._transaction = self._transaction, None
+        if not edits:
+            return
+        self._version += 1
+        self._undo_stack.push(edits[0] if len(edits) == 1 else EditGroup(edits))
+        self._undo_stack.close_group()
+        self._notify(edits)
+    
+    @contextmanager
+    def transaction(self):
+        self.begin_transaction()
+        try:
+            yield self
+        finally:
+            self.commit()
+    
+    def apply_edits(
+        self,
+        edits: Iterable[Tuple[int, int, str]],
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> int:
+        """
+        Aplica muchas ediciones (posición, longitud, texto) expresadas sobre
+        el documento actual. Se aplican de la última a la primera, de modo
+        que las posiciones no se desplazan y el buffer se recorre una vez.
+        Se deshacen juntas con un registro compacto; progress(hechas, total)
+        se llama cada PROGRESS_INTERVAL ediciones. Devuelve cuántas cambiaron
+        el texto.
+        """
+        ordered = sorted(edits, key=lambda e: e[0], reverse=True)
+        limit = len(self._buffer)
+        for position, length, _ in ordered:
+            if position < 0 or position + length > limit:
+                raise ValueError("Ediciones solapadas o fuera de rango")
+            limit = position
+        
+        self._expect_bulk(len(ordered))
+        if self._transaction is not None:
+            # Dentro de una transacción abierta se registran como ediciones sueltas
+            with self.transaction():
+                for position, length, text in ordered:
+                    self.replace(position, length, text)
+            return len(ordered)
+        
+        group = ReplaceGroup()
+        # Los textos repetidos se guardan una sola vez
+        strings = {}
+        total = len(ordered)
+        for done, (position, length, text) in enumerate(ordered, 1):
+            deleted = self._delete(position, length) if length else ""
+            if deleted == text:
+                if deleted:
+                    self._insert(position, deleted)
+            else:
+                if text:
+                    self._insert(position, text)
+                group.append(
+                    position, strings.setdefault(deleted, deleted), strings.setdefault(text, text)
+                )
+            if progress is not None and done % PROGRESS_INTERVAL == 0:
+                progress(done, total)
+        if progress is not None:
+            progress(total, total)
+        if not group:
+            return 0
+        
+        self._version += 1
+        self._undo_stack.push(group)
+        self._undo_stack.close_group()
+        self._notify(group.edits)
+        return len(group)
+    
+    # ==================== HISTORIAL Y NOTIFICACIONES ====================
+    
+    def _record(self, edit: Edit):
+        """Registra una edición aplicada: versión, undo y notificación"""
+        if not edit.deleted_text and not edit.inserted_text:
+            return
+        if self._transaction is not None:
+            self._transaction.append(edit)
+            if len(self._transaction) == LINE_INDEX_BULK_THRESHOLD:
+                self._expect_bulk(len(self._transaction) + 1)
+            return
+        self._version += 1
+        # El historial puede fusionar (mutar) su copia con el tecleo siguiente
+        self._undo_stack.push(replace(edit))
+        self._notify([edit])
+    
+    # ==================== ARCHIVO MAPEADO ====================
+    
+    def remap(self, content: MappedText, saved: bool):
+        """
+        Pasa a leer de otro mapeo del archivo. Con saved, content tiene el
+        texto actual (el archivo recién guardado) y queda como único
+        contenido; si no, es el mismo archivo original abierto de nuevo.
+        El texto, el historial y la versión no cambian.
+        """
+        if not isinstance(self._buffer, PieceTable):
+            raise TypeError("solo la piece table usa archivos mapeados")
+        if saved:
+            self._buffer.rebase(content)
+        else:
+            self._buffer.swap_original(content)
+    
+    def add_listener(self, listener: Callable[[List[Edit]], None]):
+        """
+        Suscribe a los cambios del buffer. El listener recibe la lista de
+        ediciones en orden de aplicación (cada posición es relativa al
+        estado del documento en ese momento).
+        """
+        self._listeners.append(listener)
+    
+    def remove_listener(self, listener: Callable[[List[Edit]], None]):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+    
+    def _notify(self, edits: List[Edit]):
+        for listener in list(self._listeners):
+            listener(edits)
+    
+    def _apply_inverse(self, edit: Edit) -> Edit:
         if edit.inserted_text:
-            self._buffer.delete(edit.position, len(edit.inserted_text))
+            self._delete(edit.position, len(edit.inserted_text))
         if edit.deleted_text:
-            self._buffer.insert(edit.position, edit.deleted_text)
+            self._insert(edit.position, edit.deleted_text)
+        return Edit(edit.position, edit.inserted_text, edit.deleted_text)
+    
+    def _apply_forward(self, edit: Edit) -> Edit:
+        if edit.deleted_text:
+            self._delete(edit.position, len(edit.deleted_text))
+        if edit.inserted_text:
+            self._insert(edit.position, edit.inserted_text)
+        return Edit(edit.position, edit.deleted_text, edit.inserted_text)
+    
+    def undo(self):
+        entry = self._undo_stack.undo()
+        if not entry:
+            return
         
+        edits = [entry] if isinstance(entry, Edit) else entry.edits
+        self._expect_bulk(len(edits))
+        applied = [self._apply_inverse(edit) for edit in reversed(edits)]
         self._version += 1
+        self._notify(applied)
     
     def redo(self):
-        edit = self._undo_stack.redo()
-        if not edit:
+        entry = self._undo_stack.redo()
+        if not entry:
             return
         
-        if edit.deleted_text:
-            self._buffer.delete(edit.position, len(edit.deleted_text))
-        if edit.inserted_text:
-            self._buffer.insert(edit.position, edit.inserted_text)
-        
+        edits = [entry] if isinstance(entry, Edit) else entry.edits
+        self._expect_bulk(len(edits))
+        applied = [self._apply_forward(edit) for edit in edits]
         self._version += 1
+        self._notify(applied)
     
     def get_text(self) -> str:
         return self._buffer.get_text()
     
+    def get_range(self, start: int, end: int) -> str:
+        """Texto entre start y end sin materializar el documento"""
+        return self._buffer.get_range(start, end)
+    
+    def iter_chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+        """Recorre el documento en trozos acotados"""
+        return self._buffer.iter_chunks(chunk_size)
+    
+    def line(self, line: int) -> str:
+        """Contenido de una línea (0-based) sin su salto de línea"""
+        start = self._lines.line_to_offset(line)
+        return self._buffer.get_range(start, start + self._lines.line_length(line))
+    
+    def snapshot(self) -> BufferSnapshot:
+        """Vista inmutable del contenido para lectores en segundo plano"""
+        return self._buffer.create_snapshot()
+    
+    def offset_to_line_col(self, offset: int) -> Tuple[int, int]:
+        """Convierte un offset en (línea, columna), ambos 0-based"""
+        return self._lines.offset_to_line_col(offset)
+    
+    def line_to_offset(self, line: int) -> int:
+        """Offset del inicio de una línea (0-based)"""
+        return self._lines.line_to_offset(line)
+    
+    def line_of(self, offset: int) -> int:
+        """Línea (0-based) que contiene un offset"""
+        return self._lines.offset_to_line_col(offset)[0]
+    
+    @property
+    def line_count(self) -> int:
+        return self._lines.line_count
+    
+    def __len__(self):
+        return len(self._buffer)
+    
     def can_undo(self) -> bool:
         return self._undo_stack.can_undo()
     
     def can_redo(self) -> bool:
         return self._undo_stack.can_redo()
     
+    def undo_stats(self) -> UndoStats:
+        """Uso de memoria del historial de deshacer"""
+        return self._undo_stack.stats()
+    
     @property
     def version(self) -> int:
-        return self._version
\ No newline at end of file
+        return self._version
+    
+    @property
+    def backend(self) -> str:
+        return next(k for k, v in BACKENDS.items() if type(self._buffer) is v)
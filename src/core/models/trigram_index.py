@@ -0,0 +1,527 @@
+"""
+Índice de trigramas persistente del workspace.
+
+Para cada archivo se guardan los trigramas (3 bytes consecutivos, en
+minúsculas ASCII) que contiene, y para cada trigrama la lista ordenada de
+archivos donde aparece. Una búsqueda intersecta las listas de los
+trigramas de la consulta y solo recorre esos archivos.
+
+El índice vive en una base SQLite bajo el directorio de datos de Lynx.
+Cada archivo se identifica por su ruta, mtime y tamaño: update() solo
+reindexa los que cambiaron y elimina los que ya no existen. Las consultas
+solo leen el índice: el editor lo mantiene al día reindexando lo que
+guarda y, con refresh_folders(), las carpetas en las que el sistema de
+archivos avisa de cambios. Los archivos de una actualización en curso
+son siempre candidatos.
+"""
+
+import hashlib
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from core.models.file_tree import visible_entry, walk_files
+from core.models.gitignore import GitIgnore
+
+# Directorio de datos de Lynx
+DATA_DIR = Path.home() / '.lynx'
+# Archivos mayores no se indexan: siempre son candidatos
+MAX_INDEXED_SIZE = 8 * 1024 * 1024
+# Bytes iniciales en los que un NUL delata un archivo binario
+BINARY_SNIFF_BYTES = 8192
+# A partir de tantos archivos por indexar se reparte el trabajo en procesos
+PARALLEL_THRESHOLD = 256
+# Archivos por tarea enviada al pool
+FILES_PER_TASK = 128
+
+# Ids por consulta al leer las rutas de los candidatos
+PATHS_PER_QUERY = 500
+
+# Estado de un archivo en el índice
+INDEXED, UNINDEXED, BINARY = 0, 1, 2
+
+
+@dataclass
+class IndexStats:
+    files: int
+    indexed: int
+    removed: int
+    seconds: float
+
+
+def index_path(root: Path) -> Path:
+    """Archivo del índice de un workspace"""
+    digest = hashlib.sha1(str(root.resolve()).encode('utf-8')).hexdigest()[:16]
+    return DATA_DIR / 'index' / f'{digest}.sqlite'
+
+
+def trigrams_of(data: bytes) -> array:
+    """Trigramas distintos de data (minúsculas ASCII) como enteros ordenados"""
+    data = data.lower()
+    return array('I', sorted(
+        (a << 16) | (b << 8) | c for a, b, c in set(zip(data, data[1:], data[2:]))
+    ))
+
+
+def query_trigrams(literal: str, case_sensitive: bool) -> Set[int]:
+    """
+    Trigramas que debe contener un archivo con literal. Sin distinguir
+    mayúsculas solo valen los ASCII: el índice no pliega el resto.
+    """
+    data = literal.encode('utf-8').lower()
+    grams = set()
+    for i in range(len(data) - 2):
+        a, b, c = data[i], data[i + 1], data[i + 2]
+        if not case_sensitive and (a | b | c) >= 0x80:
+            continue
+        grams.add((a << 16) | (b << 8) | c)
+    return grams
+
+
+def regex_literals(pattern: str) -> List[str]:
+    """
+    Fragmentos literales que toda coincidencia de pattern contiene (las
+    secuencias de literales del nivel superior). Vacío si no hay ninguno
+    seguro, p. ej. con alternativas.
+    """
+    try:
+        from re import _parser as sre_parse
+        parsed = sre_parse.parse(pattern)
+    except Exception:
+        return []
+    literals = []
+    run: List[str] = []
+    for op, value in parsed:
+        if op is sre_parse.LITERAL:
+            run.append(chr(value))
+            continue
+        if run:
+            literals.append(''.join(run))
+            run = []
+        if op is sre_parse.BRANCH:
+            return []
+    if run:
+        literals.append(''.join(run))
+    return [literal for literal in literals if len(literal) >= 3]
+
+
+def _scan_file(path: str) -> Tuple[int, Optional[array]]:
+    """Estado y trigramas de un archivo"""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read(MAX_INDEXED_SIZE + 1)
+    except OSError:
+        return UNINDEXED, None
+    if len(data) > MAX_INDEXED_SIZE:
+        return UNINDEXED, None
+    if b'\0' in data[:BINARY_SNIFF_BYTES]:
+        return BINARY, None
+    return INDEXED, trigrams_of(data)
+
+
+def _scan_batch(
+    items: List[Tuple[int, str]]
+) -> Tuple[List[Tuple[int, int, Optional[bytes]]], Dict[int, bytes]]:
+    """
+    Tarea del pool: trigramas de un lote de archivos (ids crecientes) y
+    las listas parciales de archivos por trigrama, ya agrupadas.
+    """
+    files = []
+    postings: Dict[int, List[int]] = defaultdict(list)
+    for file_id, path in items:
+        state, grams = _scan_file(path)
+        files.append((file_id, state, grams.tobytes() if grams is not None else None))
+        if grams is not None:
+            for gram in grams:
+                postings[gram].append(file_id)
+    return files, {gram: array('I', ids).tobytes() for gram, ids in postings.items()}
+
+
+def _ids(blob: Optional[bytes]) -> array:
+    ids = array('I')
+    if blob:
+        ids.frombytes(blob)
+    return ids
+
+
+def _prefix_end(prefix: str) -> Optional[str]:
+    """
+    Menor ruta mayor que todas las que empiezan por prefix (una carpeta
+    terminada en separador): las de la carpeta son [prefix, fin).
+    """
+    if not prefix:
+        return None
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class TrigramIndex:
+    """Índice de trigramas de un workspace guardado en disco"""
+
+    def __init__(self, root: Path, path: Optional[Path] = None):
+        self.root = root
+        self.path = path or index_path(root)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._update_lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript('''
+            CREATE TABLE IF NOT EXISTS files (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                path TEXT UNIQUE NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                state INTEGER NOT NULL,
+                trigrams BLOB
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                trigram INTEGER PRIMARY KEY,
+                ids BLOB NOT NULL
+            );
+            -- Los no indexados son candidatos de toda consulta
+            CREATE INDEX IF NOT EXISTS unindexed_files ON files (id) WHERE state = %d;
+        ''' % UNINDEXED)
+        self.last_update = 0.0
+        # Carpetas del workspace vistas en la última actualización completa
+        self.folders: List[str] = []
+        # Archivos que se están reindexando (rutas absolutas)
+        self._pending: Set[str] = set()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # ==================== ACTUALIZACIÓN ====================
+
+    def _walk(
+        self, start: Optional[Path] = None, folders: Optional[List[str]] = None
+    ) -> Iterable[Tuple[str, os.stat_result]]:
+        for entry in walk_files(self.root, start, folders):
+            try:
+                yield entry.path, entry.stat()
+            except OSError:
+                continue
+
+    def update(
+        self, paths: Optional[Iterable[str]] = None, forget: Iterable[str] = ()
+    ) -> IndexStats:
+        """
+        Sincroniza el índice con el disco. Sin paths recorre todo el
+        workspace (y olvida los archivos borrados); con paths solo revisa
+        esos archivos. forget son archivos que dejaron de formar parte del
+        workspace aunque sigan en disco (p. ej. por .gitignore).
+        """
+        started = time.perf_counter()
+        if paths is not None:
+            paths = [str(path) for path in paths]
+            forget = list(forget)
+        with self._update_lock:
+            with self._lock:
+                if paths is None:
+                    known: Dict[str, Tuple[int, int, int]] = {
+                        path: (file_id, mtime_ns, size)
+                        for file_id, path, mtime_ns, size in self._db.execute(
+                            'SELECT id, path, mtime_ns, size FROM files'
+                        )
+                    }
+                    total = len(known)
+                else:
+                    # Solo las filas de esos archivos: no depende del tamaño del workspace
+                    known = {}
+                    for path in paths + forget:
+                        relative = os.path.relpath(path, self.root)
+                        row = self._db.execute(
+                            'SELECT id, mtime_ns, size FROM files WHERE path = ?', (relative,)
+                        ).fetchone()
+                        if row is not None:
+                            known[relative] = row
+                    total = self._db.execute('SELECT COUNT(*) FROM files').fetchone()[0]
+                next_id = self._db.execute('SELECT COALESCE(MAX(id), 0) FROM files').fetchone()[0] + 1
+
+            changed: List[Tuple[int, str, os.stat_result]] = []
+            seen: Set[str] = set()
+            missing: List[str] = [os.path.relpath(path, self.root) for path in forget]
+            folders: List[str] = []
+            if paths is None:
+                entries = self._walk(folders=folders)
+            else:
+                entries = []
+                for path in paths:
+                    try:
+                        entries.append((path, os.stat(path)))
+                    except OSError:
+                        missing.append(os.path.relpath(path, self.root))
+            added = 0
+            for path, stat in entries:
+                relative = os.path.relpath(path, self.root)
+                seen.add(relative)
+                entry = known.get(relative)
+                if entry is None:
+                    # Ids nuevos crecientes: sus listas solo crecen por el final
+                    changed.append((next_id, path, stat))
+                    next_id += 1
+                    added += 1
+                elif entry[1] != stat.st_mtime_ns or entry[2] != stat.st_size:
+                    # Archivo modificado: conserva su id
+                    changed.append((entry[0], path, stat))
+            if paths is None:
+                removed = [path for path in known if path not in seen]
+            else:
+                removed = [path for path in missing if path in known]
+
+            if paths is None:
+                self.folders = folders
+            # Mientras se leen, las consultas los dan siempre por candidatos
+            pending = {path for _, path, _ in changed}
+            with self._lock:
+                self._pending |= pending
+
+            # La lectura de archivos no bloquea las consultas; en orden de id,
+            # las listas parciales de cada lote se encadenan ya ordenadas
+            changed.sort(key=lambda item: item[0])
+            try:
+                files, postings = self._scan([(file_id, path) for file_id, path, _ in changed])
+            except BaseException:
+                with self._lock:
+                    self._pending -= pending
+                raise
+            with self._lock:
+                self._remove([known[path][0] for path in removed])
+                self._remove(
+                    [file_id for file_id, path, _ in changed
+                     if os.path.relpath(path, self.root) in known],
+                    forget=False
+                )
+                self._db.executemany(
+                    'INSERT OR REPLACE INTO files (id, path, mtime_ns, size, state, trigrams) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    [
+                        (file_id, os.path.relpath(path, self.root),
+                         stat.st_mtime_ns, stat.st_size, state, blob)
+                        for (file_id, path, stat), (_, state, blob) in zip(changed, files)
+                    ]
+                )
+                self._flush(postings, {})
+                self._db.commit()
+                self._pending -= pending
+        if paths is None:
+            self.last_update = time.monotonic()
+        return IndexStats(
+            files=total + added - len(removed),
+            indexed=len(changed),
+            removed=len(removed),
+            seconds=time.perf_counter() - started,
+        )
+
+    def refresh_folders(self, folders: Iterable[str]) -> IndexStats:
+        """
+        Sincroniza solo los archivos de unas carpetas (en las que el sistema
+        de archivos avisó de cambios): nuevos, borrados o modificados. Las
+        subcarpetas sin archivos indexados se recorren enteras; las
+        indexadas que ya no existen se olvidan. El coste depende del tamaño
+        de las carpetas, no del workspace.
+        """
+        gitignore = GitIgnore(self.root)
+        paths: Set[str] = set()
+        forget: Set[str] = set()
+        new_folders: List[str] = []
+        for folder in folders:
+            folder = Path(folder)
+            if folder != self.root and self.root not in folder.parents:
+                continue
+            prefix = '' if folder == self.root else os.path.relpath(folder, self.root) + os.sep
+            with self._lock:
+                known_files, known_folders = self._children(prefix)
+            visible: Set[str] = set()
+            try:
+                with os.scandir(folder) as scanner:
+                    for entry in scanner:
+                        is_dir = visible_entry(folder, entry, gitignore)
+                        if is_dir is None:
+                            continue
+                        if not is_dir:
+                            visible.add(entry.path)
+                        elif entry.name in known_folders:
+                            # Tiene su propio aviso de cambios
+                            known_folders.discard(entry.name)
+                        elif not entry.is_symlink():
+                            for path, _ in self._walk(Path(entry.path), new_folders):
+                                visible.add(path)
+            except OSError:
+                # La carpeta ya no existe: sus archivos se olvidan
+                pass
+            paths |= visible
+            for relative in known_files:
+                path = os.path.join(self.root, relative)
+                if path not in visible:
+                    forget.add(path)
+            for name in known_folders:
+                with self._lock:
+                    gone = self._rows_under(prefix + name + os.sep)
+                forget.update(os.path.join(self.root, relative) for relative in gone)
+        stats = self.update(sorted(paths), forget)
+        self.folders.extend(new_folders)
+        return stats
+
+    def _children(self, prefix: str) -> Tuple[List[str], Set[str]]:
+        """
+        Archivos indexados directamente en la carpeta prefix y nombres de
+        sus subcarpetas con archivos indexados. Salta cada subcarpeta con
+        una consulta sobre el índice de path: no lee su contenido.
+        """
+        files: List[str] = []
+        folders: Set[str] = set()
+        end = _prefix_end(prefix)
+        cursor = prefix
+        while True:
+            row = self._db.execute(
+                'SELECT path FROM files WHERE path >= ? ORDER BY path LIMIT 1', (cursor,)
+            ).fetchone()
+            if row is None or (end is not None and row[0] >= end):
+                break
+            path = row[0]
+            head, separator, _ = path[len(prefix):].partition(os.sep)
+            if separator:
+                folders.add(head)
+                cursor = _prefix_end(prefix + head + os.sep)
+            else:
+                files.append(path)
+                # La ruta siguiente a path
+                cursor = path + '\0'
+        return files, folders
+
+    def _rows_under(self, prefix: str) -> List[str]:
+        """Rutas indexadas bajo la carpeta prefix"""
+        return [
+            path for path, in self._db.execute(
+                'SELECT path FROM files WHERE path >= ? AND path < ?',
+                (prefix, _prefix_end(prefix))
+            )
+        ]
+
+    def _scan(
+        self, items: List[Tuple[int, str]]
+    ) -> Tuple[List[Tuple[int, int, Optional[bytes]]], Dict[int, array]]:
+        """Trigramas de los archivos, en procesos si son muchos"""
+        batches = [items[i:i + FILES_PER_TASK] for i in range(0, len(items), FILES_PER_TASK)]
+        if len(items) < PARALLEL_THRESHOLD:
+            results = map(_scan_batch, batches)
+            pool = None
+        else:
+            # spawn: el proceso principal tiene hilos (Qt) y fork no es seguro
+            pool = ProcessPoolExecutor(mp_context=multiprocessing.get_context('spawn'))
+            results = pool.map(_scan_batch, batches)
+        files: List[Tuple[int, int, Optional[bytes]]] = []
+        postings: Dict[int, array] = {}
+        try:
+            for batch_files, batch_postings in results:
+                files.extend(batch_files)
+                for gram, blob in batch_postings.items():
+                    ids = postings.get(gram)
+                    if ids is None:
+                        postings[gram] = _ids(blob)
+                    else:
+                        ids.frombytes(blob)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        return files, postings
+
+    def _remove(self, file_ids: Iterable[int], forget: bool = True):
+        """Quita archivos de las listas de sus trigramas"""
+        removals: Dict[int, Set[int]] = {}
+        for file_id in file_ids:
+            row = self._db.execute('SELECT trigrams FROM files WHERE id = ?', (file_id,)).fetchone()
+            for gram in _ids(row[0] if row else None):
+                removals.setdefault(gram, set()).add(file_id)
+            if forget:
+                self._db.execute('DELETE FROM files WHERE id = ?', (file_id,))
+        self._flush({}, removals)
+
+    def _flush(self, additions: Dict[int, array], removals: Dict[int, Set[int]]):
+        """Aplica altas (ids ordenados) y bajas a las listas de cada trigrama"""
+        for gram in additions.keys() | removals.keys():
+            row = self._db.execute('SELECT ids FROM postings WHERE trigram = ?', (gram,)).fetchone()
+            ids = _ids(row[0] if row else None)
+            for file_id in removals.get(gram, ()):
+                i = bisect_left(ids, file_id)
+                if i < len(ids) and ids[i] == file_id:
+                    del ids[i]
+            added = additions.get(gram, ())
+            if added and (not ids or added[0] > ids[-1]):
+                # Archivos nuevos: ids crecientes, basta con añadir al final
+                ids.extend(added)
+            else:
+                for file_id in added:
+                    insort(ids, file_id)
+            if ids:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO postings (trigram, ids) VALUES (?, ?)',
+                    (gram, ids.tobytes())
+                )
+            else:
+                self._db.execute('DELETE FROM postings WHERE trigram = ?', (gram,))
+
+    # ==================== CONSULTA ====================
+
+    def candidates(
+        self,
+        query: str,
+        case_sensitive: bool = False,
+        regex: bool = False
+    ) -> Optional[List[str]]:
+        """
+        Archivos que pueden contener query (rutas absolutas), incluidos los
+        no indexados y los que se están reindexando. Solo consulta el
+        índice. None si la consulta no permite acotar la búsqueda.
+        """
+        literals = regex_literals(query) if regex else [query]
+        grams: Set[int] = set()
+        for literal in literals:
+            grams |= query_trigrams(literal, case_sensitive)
+        if not grams:
+            return None
+
+        with self._lock:
+            lists = []
+            for gram in grams:
+                row = self._db.execute(
+                    'SELECT ids FROM postings WHERE trigram = ?', (gram,)
+                ).fetchone()
+                lists.append(_ids(row[0] if row else None))
+            lists.sort(key=len)
+            matching = set(lists[0])
+            for ids in lists[1:]:
+                if not matching:
+                    break
+                matching.intersection_update(ids)
+
+            # Con la constante en el texto la consulta usa el índice parcial
+            found: Dict[int, str] = dict(self._db.execute(
+                f'SELECT id, path FROM files WHERE state = {UNINDEXED}'
+            ))
+            ids = sorted(matching)
+            for i in range(0, len(ids), PATHS_PER_QUERY):
+                batch = ids[i:i + PATHS_PER_QUERY]
+                found.update(self._db.execute(
+                    f'SELECT id, path FROM files WHERE id IN ({",".join("?" * len(batch))})',
+                    batch
+                ))
+            pending = sorted(self._pending)
+
+        paths = [os.path.join(self.root, found[file_id]) for file_id in sorted(found)]
+        seen = set(paths)
+        return paths + [path for path in pending if path not in seen]
+
+    @property
+    def file_count(self) -> int:
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM files').fetchone()[0]
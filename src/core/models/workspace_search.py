@@ -0,0 +1,338 @@
+"""
+Buscar en archivos: búsqueda en todo el workspace.
+
+El recorrido aplica las mismas reglas de exclusión que el árbol de
+archivos y descarta binarios. Los archivos se reparten por lotes entre un
+pool de procesos que los leen con mmap; los resultados se devuelven por
+archivo según terminan, para que la barra lateral los muestre enseguida.
+"""
+
+import mmap
+import multiprocessing
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from threading import Event
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, List, Optional, Set, Tuple
+
+from core.models.file_tree import walk_files
+from core.models.document import Document
+from core.models.search_engine import LiteralPattern, SearchEngine, SearchPattern, compile_query
+
+if TYPE_CHECKING:
+    from core.models.trigram_index import TrigramIndex
+
+# Bytes iniciales en los que un NUL delata un archivo binario
+BINARY_SNIFF_BYTES = 8192
+# Archivos por tarea enviada al pool (menos mensajes entre procesos)
+FILES_PER_TASK = 64
+# Coincidencias como máximo por archivo
+MAX_MATCHES_PER_FILE = 1000
+# Caracteres de la línea que se muestran como vista previa
+PREVIEW_CHARS = 200
+
+
+@dataclass
+class FileMatch:
+    line: int       # 0-based
+    column: int     # en caracteres
+    length: int
+    preview: str
+
+
+@dataclass
+class FileResult:
+    path: str
+    matches: List[FileMatch] = field(default_factory=list)
+
+    def to_dict(
+        self, replacement: Optional[str] = None, pattern: Optional['SearchPattern'] = None
+    ) -> dict:
+        """
+        Convierte a diccionario para QML. Con replacement, cada coincidencia
+        lleva también la vista previa de la línea ya reemplazada (con los
+        grupos de pattern expandidos si es una expresión regular).
+        """
+        matches = []
+        for m in self.matches:
+            match = {'line': m.line, 'column': m.column, 'length': m.length, 'preview': m.preview}
+            if replacement is not None:
+                text = replacement
+                if pattern is not None and pattern.is_regex:
+                    found = pattern.regex.match(m.preview, m.column)
+                    if found is not None:
+                        text = found.expand(replacement)
+                match['replaced'] = m.preview[:m.column] + text + m.preview[m.column + m.length:]
+            matches.append(match)
+        return {'path': self.path, 'name': os.path.basename(self.path), 'matches': matches}
+
+
+def iter_workspace_files(root: Path) -> Iterator[str]:
+    """Archivos del workspace, con las exclusiones del árbol de archivos"""
+    for entry in walk_files(root):
+        yield entry.path
+
+
+def _bytes_regex(query: str, case_sensitive: bool, whole_word: bool):
+    """
+    Patrón sobre los bytes UTF-8 del archivo (solo consultas ASCII). Los
+    bytes >= 0x80 cuentan como letra, así una palabra con acentos no se
+    parte en los límites de palabra. Los literales sin palabra completa
+    van por la vía rápida de bytes.find.
+    """
+    literal = query.encode('ascii')
+    pattern = re.escape(literal)
+    if whole_word:
+        pattern = rb'(?<![\w\x80-\xff])' + pattern + rb'(?![\w\x80-\xff])'
+    flags = 0 if case_sensitive else re.IGNORECASE
+    regex = re.compile(pattern, flags)
+    if whole_word:
+        return regex
+    return LiteralPattern(literal, not case_sensitive, regex)
+
+
+def _decode(data: bytes) -> str:
+    return data.decode('utf-8', errors='replace')
+
+
+def _search_bytes(data, regex) -> List[FileMatch]:
+    matches = []
+    line = 0
+    last = 0
+    for match in regex.finditer(data):
+        start = match.start()
+        line += data[last:start].count(b'\n')
+        last = start
+        line_start = data.rfind(b'\n', 0, start) + 1
+        line_end = data.find(b'\n', start)
+        if line_end < 0:
+            line_end = len(data)
+        column = len(_decode(data[line_start:start]))
+        matches.append(FileMatch(
+            line, column, len(_decode(match.group())),
+            _decode(data[line_start:min(line_end, line_start + PREVIEW_CHARS * 4)])[:PREVIEW_CHARS].rstrip('\r')
+        ))
+        if len(matches) >= MAX_MATCHES_PER_FILE:
+            break
+    return matches
+
+
+def _search_text(text: str, regex) -> List[FileMatch]:
+    matches = []
+    line = 0
+    last = 0
+    for match in regex.finditer(text):
+        start = match.start()
+        line += text.count('\n', last, start)
+        last = start
+        line_start = text.rfind('\n', 0, start) + 1
+        line_end = text.find('\n', start)
+        if line_end < 0:
+            line_end = len(text)
+        matches.append(FileMatch(
+            line, start - line_start, match.end() - start,
+            text[line_start:min(line_end, line_start + PREVIEW_CHARS)].rstrip('\r')
+        ))
+        if len(matches) >= MAX_MATCHES_PER_FILE:
+            break
+    return matches
+
+
+def search_file(
+    path: str,
+    query: str,
+    case_sensitive: bool = False,
+    whole_word: bool = False,
+    regex: bool = False
+) -> Optional[FileResult]:
+    """
+    Busca en un archivo; None si no hay coincidencias o es binario. Las
+    expresiones regulares se evalúan sobre el texto decodificado, para
+    que \\w y compañía se comporten igual que en el editor.
+    """
+    try:
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if data.find(b'\0', 0, BINARY_SNIFF_BYTES) >= 0:
+                    return None
+                if query.isascii() and not regex:
+                    matches = _search_bytes(data, _bytes_regex(query, case_sensitive, whole_word))
+                else:
+                    pattern = compile_query(query, case_sensitive, whole_word, regex)
+                    matches = _search_text(_decode(data[:]), pattern)
+    except (OSError, ValueError):
+        return None
+    return FileResult(path, matches) if matches else None
+
+
+def _search_files(
+    paths: List[str], query: str, case_sensitive: bool, whole_word: bool, regex: bool
+) -> List[FileResult]:
+    """Tarea del pool: busca en un lote de archivos"""
+    results = []
+    for path in paths:
+        result = search_file(path, query, case_sensitive, whole_word, regex)
+        if result is not None:
+            results.append(result)
+    return results
+
+
+def _batched(paths: Iterable[str], size: int) -> Iterator[List[str]]:
+    batch = []
+    for path in paths:
+        batch.append(path)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class WorkspaceSearch:
+    """Búsqueda en todos los archivos de un workspace con un pool de procesos"""
+
+    def __init__(
+        self,
+        root: Path,
+        query: str,
+        case_sensitive: bool = False,
+        whole_word: bool = False,
+        workers: Optional[int] = None,
+        index: Optional['TrigramIndex'] = None,
+        regex: bool = False
+    ):
+        self.root = root
+        self.query = query
+        self.case_sensitive = case_sensitive
+        self.whole_word = whole_word
+        self.regex = regex
+        self.workers = workers or os.cpu_count() or 1
+        self.index = index
+        self.files_searched = 0
+        self._cancel = Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def files(self) -> Iterable[str]:
+        """Archivos candidatos: los que permite el índice, o todo el workspace"""
+        if self.index is not None:
+            candidates = self.index.candidates(self.query, self.case_sensitive, self.regex)
+            if candidates is not None:
+                return candidates
+        return iter_workspace_files(self.root)
+
+    def run(self) -> Iterator[FileResult]:
+        """Devuelve los resultados de cada archivo según terminan los lotes"""
+        if not self.query:
+            return
+        # Una expresión inválida falla aquí y no en cada proceso
+        compile_query(self.query, self.case_sensitive, self.whole_word, self.regex)
+        files = self.files()
+        if isinstance(files, list) and len(files) <= FILES_PER_TASK:
+            # Pocos candidatos (índice): arrancar procesos cuesta más que buscar
+            for path in files:
+                if self.cancelled:
+                    return
+                self.files_searched += 1
+                result = search_file(
+                    path, self.query, self.case_sensitive, self.whole_word, self.regex
+                )
+                if result is not None:
+                    yield result
+            return
+        # spawn: el proceso principal tiene hilos (Qt) y fork no es seguro
+        context = multiprocessing.get_context('spawn')
+        pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        pending: Set[Future] = set()
+        try:
+            for batch in _batched(files, FILES_PER_TASK):
+                if self.cancelled:
+                    return
+                self.files_searched += len(batch)
+                pending.add(pool.submit(
+                    _search_files, batch, self.query, self.case_sensitive, self.whole_word,
+                    self.regex
+                ))
+                # Acotar lo encolado: el recorrido avanza a la par que la búsqueda
+                if len(pending) >= self.workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    yield from self._collect(done)
+
+            while pending and not self.cancelled:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                yield from self._collect(done)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _collect(self, done: Iterable[Future]) -> Iterator[FileResult]:
+        for future in done:
+            if self.cancelled:
+                return
+            yield from future.result()
+
+
+def replace_in_file(
+    path: str,
+    query: str,
+    replacement: str,
+    case_sensitive: bool = False,
+    whole_word: bool = False,
+    regex: bool = False
+) -> int:
+    """
+    Reemplaza en un archivo y lo guarda de forma atómica, conservando su
+    codificación y saltos de línea. Devuelve los reemplazos hechos.
+    """
+    document = Document(Path(path))
+    try:
+        count = SearchEngine().replace_all_in_buffer(
+            document.buffer, query, replacement, case_sensitive, whole_word, regex=regex
+        )
+        if count and not document.save():
+            return 0
+        return count
+    finally:
+        document.close()
+
+
+def replace_in_files(
+    paths: Iterable[str],
+    query: str,
+    replacement: str,
+    case_sensitive: bool = False,
+    whole_word: bool = False,
+    progress: Optional[Callable[[int, int], None]] = None,
+    cancel: Optional[Event] = None,
+    regex: bool = False
+) -> Tuple[int, int]:
+    """
+    Reemplaza en varios archivos (p. ej. los de una vista previa).
+    progress(hechos, total) se llama tras cada archivo. Devuelve
+    (archivos modificados, reemplazos).
+    """
+    paths = list(paths)
+    files = 0
+    replacements = 0
+    for done, path in enumerate(paths, 1):
+        if cancel is not None and cancel.is_set():
+            break
+        try:
+            count = replace_in_file(path, query, replacement, case_sensitive, whole_word, regex)
+        except (OSError, ValueError) as e:
+            print(f"Error replacing in {path}: {e}")
+            count = 0
+        if count:
+            files += 1
+            replacements += count
+        if progress is not None:
+            progress(done, len(paths))
+    return files, replacements
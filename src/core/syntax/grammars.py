@@ -0,0 +1,128 @@
+"""
+Registro de gramáticas tree-sitter del proceso.
+
+Cada gramática se carga una sola vez, al primer uso: desde su paquete
+tree_sitter_<lenguaje> o, si no está instalado, desde una biblioteca
+compilada en el directorio local de gramáticas. Los Language se comparten
+entre documentos y los Parser se reutilizan con un pool por lenguaje, así
+que abrir otro archivo del mismo lenguaje no vuelve a pagar la carga.
+"""
+
+import ctypes
+import importlib
+import sys
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from tree_sitter import Language, Parser
+
+# Directorio con gramáticas compiladas (<lenguaje>.so, .dylib o .dll),
+# junto al paquete para no depender del directorio de trabajo
+GRAMMAR_DIR = Path(__file__).resolve().parent / 'languages'
+# Parsers libres que se conservan por lenguaje
+PARSER_POOL_SIZE = 4
+
+
+class GrammarSpec(NamedTuple):
+    module: str     # paquete de Python con la gramática
+    function: str   # función del paquete que devuelve el lenguaje
+    symbol: str     # símbolo C en una biblioteca compilada
+
+
+# Lenguajes de los dos _detect_language (core.models y core.editor)
+GRAMMARS: Dict[str, GrammarSpec] = {
+    'python': GrammarSpec('tree_sitter_python', 'language', 'tree_sitter_python'),
+    'javascript': GrammarSpec('tree_sitter_javascript', 'language', 'tree_sitter_javascript'),
+    'typescript': GrammarSpec(
+        'tree_sitter_typescript', 'language_typescript', 'tree_sitter_typescript'
+    ),
+    'rust': GrammarSpec('tree_sitter_rust', 'language', 'tree_sitter_rust'),
+    'c': GrammarSpec('tree_sitter_c', 'language', 'tree_sitter_c'),
+    'cpp': GrammarSpec('tree_sitter_cpp', 'language', 'tree_sitter_cpp'),
+    'html': GrammarSpec('tree_sitter_html', 'language', 'tree_sitter_html'),
+    'css': GrammarSpec('tree_sitter_css', 'language', 'tree_sitter_css'),
+    'json': GrammarSpec('tree_sitter_json', 'language', 'tree_sitter_json'),
+    'yaml': GrammarSpec('tree_sitter_yaml', 'language', 'tree_sitter_yaml'),
+    'markdown': GrammarSpec('tree_sitter_markdown', 'language', 'tree_sitter_markdown'),
+}
+
+
+def _library_suffix() -> str:
+    if sys.platform == 'win32':
+        return '.dll'
+    if sys.platform == 'darwin':
+        return '.dylib'
+    return '.so'
+
+
+class GrammarRegistry:
+    """Language compartidos y pools de Parser, por nombre de lenguaje"""
+
+    def __init__(self, grammar_dir: Path = GRAMMAR_DIR):
+        self.grammar_dir = grammar_dir
+        # None: la gramática no está disponible (no se reintenta)
+        self._languages: Dict[str, Optional[Language]] = {}
+        self._parsers: Dict[str, List[Parser]] = {}
+        # Los parsers se piden también desde los hilos de resaltado
+        self._lock = threading.Lock()
+
+    def language(self, name: str) -> Optional[Language]:
+        """Language de un lenguaje, cargado la primera vez que se pide"""
+        with self._lock:
+            if name not in self._languages:
+                self._languages[name] = self._load(name)
+            return self._languages[name]
+
+    def _load(self, name: str) -> Optional[Language]:
+        spec = GRAMMARS.get(name)
+        if spec is None:
+            return None
+        try:
+            module = importlib.import_module(spec.module)
+            return Language(getattr(module, spec.function)())
+        except ImportError:
+            pass
+        except Exception as e:
+            print(f"Error loading tree-sitter language {name}: {e}")
+            return None
+
+        path = self.grammar_dir / f'{name}{_library_suffix()}'
+        if not path.exists():
+            return None
+        try:
+            function = getattr(ctypes.CDLL(str(path)), spec.symbol)
+            function.restype = ctypes.c_void_p
+            return Language(function())
+        except Exception as e:
+            print(f"Error loading tree-sitter language {name} from {path}: {e}")
+            return None
+
+    @contextmanager
+    def parser(self, name: str) -> Iterator[Optional[Parser]]:
+        """Presta un Parser del pool del lenguaje (None sin gramática)"""
+        language = self.language(name)
+        if language is None:
+            yield None
+            return
+        with self._lock:
+            pool = self._parsers.setdefault(name, [])
+            parser = pool.pop() if pool else None
+        if parser is None:
+            parser = Parser(language)
+        try:
+            yield parser
+        finally:
+            parser.reset()
+            with self._lock:
+                if len(pool) < PARSER_POOL_SIZE:
+                    pool.append(parser)
+
+
+_registry = GrammarRegistry()
+
+
+def grammar_registry() -> GrammarRegistry:
+    """Registro compartido por todo el proceso"""
+    return _registry
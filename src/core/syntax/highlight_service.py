@@ -0,0 +1,215 @@
+"""
+Resaltado de sintaxis en segundo plano.
+
+El hilo de la GUI solo encola: cada lote de ediciones del TextBuffer se
+guarda con un snapshot del texto tras el lote y la versión del buffer. Un
+hilo propio aplica al árbol todos los lotes pendientes, parsea una sola
+vez y entrega los tokens por línea: primero los de la zona visible y
+después, por tramos, los del resto de líneas que la vista aún no tiene al
+día. Cada entrega lleva la versión de la que sale; quien la recibe
+descarta las que ya no corresponden al buffer y las pide de nuevo con
+redeliver(). Sin gramática para el lenguaje, el mismo hilo usa el
+IncrementalTokenizer.
+"""
+
+import threading
+from collections import deque
+from typing import TYPE_CHECKING, Callable, Deque, List, Optional, Tuple, Union
+
+from core.syntax.highlighter import TreeSitterHighlighter
+from core.syntax.ranges import add_range, shift_ranges, take_range
+from core.syntax.token_store import TokenLines
+from core.syntax.tokenizer import IncrementalTokenizer
+
+if TYPE_CHECKING:
+    from core.buffer.base import BufferSnapshot
+    from core.buffer.undo_stack import Edit
+    from core.models.text_buffer import TextBuffer
+
+# Líneas por entrega fuera de la zona visible
+HIGHLIGHT_CHUNK_LINES = 256
+# Zona visible supuesta hasta que la vista informe de la suya
+DEFAULT_VIEWPORT_LINES = 100
+# Con más lotes pendientes que esto se reparsea desde el último snapshot
+MAX_PENDING_BATCHES = 64
+# Lotes recordados para llevar filas de una versión antigua a la actual
+HISTORY_BATCHES = 256
+
+# Receptor de entregas: (versión, primera línea, tokens de cada línea)
+LinesCallback = Callable[[int, int, TokenLines], None]
+
+
+class HighlightService:
+    """Parsea y resalta un TextBuffer en un hilo propio"""
+
+    def __init__(self, buffer: 'TextBuffer', language: str, on_lines: LinesCallback):
+        self._buffer = buffer
+        self._on_lines = on_lines
+        self._highlighter: Union[TreeSitterHighlighter, IncrementalTokenizer] = (
+            TreeSitterHighlighter(language)
+        )
+        if not self._highlighter.available:
+            # Sin gramática: el tokenizador por líneas
+            self._highlighter = IncrementalTokenizer(language)
+        self._condition = threading.Condition()
+        # Compartido con la GUI (bajo _condition)
+        self._pending: List[Tuple[Optional[List['Edit']], 'BufferSnapshot', int]] = []
+        self._redeliver: List[Tuple[int, int, int]] = []
+        self._viewport = (0, DEFAULT_VIEWPORT_LINES - 1)
+        self._closed = False
+        self._idle = threading.Event()
+        # Solo del hilo de trabajo
+        self._version = -1
+        self._remaining: List[Tuple[int, int]] = []
+        self._history: Deque[Tuple[int, int, int, int]] = deque(maxlen=HISTORY_BATCHES)
+        self._thread: Optional[threading.Thread] = None
+        if not self._highlighter.available:
+            self._idle.set()
+            return
+        self._pending.append((None, buffer.snapshot(), buffer.version))
+        buffer.add_listener(self._on_edits)
+        self._thread = threading.Thread(target=self._run, name='highlight', daemon=True)
+        self._thread.start()
+
+    @property
+    def available(self) -> bool:
+        return self._thread is not None
+
+    # ==================== HILO DE LA GUI ====================
+
+    def _on_edits(self, edits: List['Edit']):
+        """Listener del buffer: encola el lote; nunca espera al parser"""
+        snapshot = self._buffer.snapshot()
+        with self._condition:
+            if len(self._pending) >= MAX_PENDING_BATCHES:
+                # El hilo va muy atrasado: un parse completo sale más barato
+                self._pending = [(None, snapshot, self._buffer.version)]
+            else:
+                self._pending.append((edits, snapshot, self._buffer.version))
+            self._idle.clear()
+            self._condition.notify()
+
+    def set_viewport(self, first_line: int, last_line: int):
+        """Líneas visibles: se entregan antes que el resto"""
+        with self._condition:
+            self._viewport = (max(0, first_line), max(first_line, last_line))
+            self._idle.clear()
+            self._condition.notify()
+
+    def redeliver(self, version: int, first_line: int, last_line: int):
+        """Vuelve a pedir unas líneas de una entrega descartada por antigua"""
+        with self._condition:
+            self._redeliver.append((version, first_line, last_line))
+            self._idle.clear()
+            self._condition.notify()
+
+    def invalidate(self):
+        """La vista perdió sus tokens (texto recargado): se entregan todos otra vez"""
+        self.redeliver(-1, 0, -1)
+
+    def replace_source(self):
+        """
+        El buffer lee el mismo texto de otro sitio (un archivo grande que se
+        guardó y se mapeó de nuevo): se sigue desde un snapshot actual sin
+        volver a parsear. Solo con el hilo parado (wait_idle).
+        """
+        with self._condition:
+            self._highlighter.replace_source(self._buffer.snapshot())
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que no quede nada por parsear ni entregar"""
+        return self._idle.wait(timeout)
+
+    def close(self):
+        """Deja de seguir el buffer; el hilo termina sin entregar nada más"""
+        self._buffer.remove_listener(self._on_edits)
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+
+    # ==================== HILO DE TRABAJO ====================
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while (not self._pending and not self._redeliver and not self._remaining
+                       and not self._closed):
+                    self._idle.set()
+                    self._condition.wait()
+                if self._closed:
+                    return
+                pending, self._pending = self._pending, []
+                redeliver, self._redeliver = self._redeliver, []
+                first, last = self._viewport
+            try:
+                if pending:
+                    self._apply(pending)
+                for version, start, end in redeliver:
+                    self._requeue(version, start, end)
+                self._deliver_next(first, last)
+            except (ValueError, OSError):
+                # El archivo mapeado se cerró con el documento
+                return
+
+    def _apply(self, pending: List[Tuple[Optional[List['Edit']], 'BufferSnapshot', int]]):
+        """Aplica los lotes pendientes al árbol y parsea una sola vez"""
+        highlighter = self._highlighter
+        # Tras un reinicio, los lotes anteriores ya no importan
+        resets = [i for i, (edits, _, _) in enumerate(pending) if edits is None]
+        if resets:
+            _, snapshot, version = pending[resets[-1]]
+            highlighter.reset(snapshot)
+            self._history.clear()
+            self._remaining = []
+            add_range(self._remaining, 0, highlighter.line_count - 1)
+            self._version = version
+            pending = pending[resets[-1] + 1:]
+        if not pending:
+            return
+        for edits, snapshot, version in pending:
+            rows = highlighter.edit(edits, snapshot)
+            self._remaining = shift_ranges(self._remaining, *rows)
+            self._history.append((version, *rows))
+            self._version = version
+        highlighter.reparse()
+        for first, last in highlighter.changed_rows:
+            add_range(self._remaining, first, last)
+
+    def _requeue(self, version: int, first: int, last: int):
+        """Marca de nuevo unas filas de version, llevadas a la versión actual"""
+        line_count = self._highlighter.line_count
+        history = self._history
+        if version < 0 or (version < self._version and (not history or history[0][0] > version + 1)):
+            # Todo el documento, o la historia ya no llega tan atrás
+            add_range(self._remaining, 0, line_count - 1)
+            return
+        ranges = [(first, last)]
+        for batch_version, *rows in history:
+            if batch_version > version:
+                ranges = shift_ranges(ranges, *rows)
+        for start, end in ranges:
+            add_range(self._remaining, start, end)
+
+    def _deliver_next(self, first: int, last: int):
+        """Entrega un tramo: lo visible que falte o, si no, lo siguiente"""
+        remaining = self._remaining
+        line_count = self._highlighter.line_count
+        if remaining and remaining[-1][1] >= line_count:
+            take_range(remaining, line_count, remaining[-1][1])
+        if not remaining:
+            return
+        visible = [r for r in remaining if r[1] >= first and r[0] <= last]
+        if visible:
+            start, end = max(visible[0][0], first), min(visible[0][1], last)
+        else:
+            # Seguir por debajo de la zona visible y volver luego al principio
+            after = [r for r in remaining if r[0] > last]
+            start, end = (after or remaining)[0]
+            end = min(end, start + HIGHLIGHT_CHUNK_LINES - 1)
+        take_range(remaining, start, end)
+        lines = self._highlighter.line_spans(start, end)
+        if self._pending or self._closed:
+            # El texto ya cambió: entregar esto sería tirarlo
+            add_range(remaining, start, end)
+            return
+        self._on_lines(self._version, start, lines)
@@ -1,8 +1,51 @@
+from array import array
 from enum import Enum
 from dataclasses import dataclass
-from typing import List, Dict, Optional
+from typing import TYPE_CHECKING, List, Dict, Optional, Tuple, Union
 import tree_sitter
-from tree_sitter import Language, Parser
+from tree_sitter import Language, Query, QueryCursor
+
+from core.buffer.base import StringSnapshot
+from core.buffer.line_index import LineIndex
+from core.syntax.grammars import GRAMMARS, grammar_registry
+from core.syntax.token_store import TokenLines
+from core.models.text_buffer import LINE_INDEX_BULK_THRESHOLD
+
+if TYPE_CHECKING:
+    from core.buffer.base import BufferSnapshot
+    from core.buffer.undo_stack import Edit
+    from core.models.text_buffer import TextBuffer
+
+# Texto que se parsea: el buffer vivo o un snapshot suyo
+TextSource = Union['TextBuffer', 'BufferSnapshot']
+
+# Caracteres que entrega cada lectura del parser sobre el buffer
+PARSE_READ_CHARS = 16 * 1024
+# Líneas con tokens en caché (alrededor de la última zona consultada)
+TOKEN_CACHE_LINES = 4096
+
+# Queries compiladas por lenguaje (None si no compila con la gramática)
+_QUERY_CACHE: Dict[str, Optional[Query]] = {}
+
+
+def _byte_len(text: str) -> int:
+    return len(text) if text.isascii() else len(text.encode('utf-8'))
+
+
+def _char_column(text: str, byte_column: int) -> int:
+    """Columna en caracteres de una columna en bytes UTF-8 de text"""
+    if text.isascii():
+        return byte_column
+    return len(text.encode('utf-8')[:byte_column].decode('utf-8', errors='ignore'))
+
+
+def _as_bytes(text: str) -> str:
+    """
+    Texto con un carácter por byte UTF-8 y los mismos saltos de línea: un
+    LineIndex construido con él mide las líneas en bytes.
+    """
+    return text if text.isascii() else text.encode('utf-8').decode('latin-1')
+
 
 class TokenType(Enum):
     KEYWORD = "keyword"
@@ -13,7 +56,11 @@ class TokenType(Enum):
     OPERATOR = "operator"
     IDENTIFIER = "identifier"
 
-@dataclass
+# Tipos por id: los tokens guardan el índice en esta lista (un byte)
+TOKEN_TYPES: List[TokenType] = list(TokenType)
+TYPE_IDS: Dict[TokenType, int] = {token_type: i for i, token_type in enumerate(TOKEN_TYPES)}
+
+@dataclass(slots=True)
 class Token:
     type: TokenType
     start: int
@@ -23,63 +70,384 @@ class Token:
 class TreeSitterHighlighter:
     """Syntax highlighter usando tree-sitter"""
     
-    # Lenguajes soportados en MVP
-    SUPPORTED_LANGUAGES = ['python', 'javascript']
+    # Lenguajes con gramática en el registro
+    SUPPORTED_LANGUAGES = list(GRAMMARS)
     
     def __init__(self, language: str):
         self.language = language
-        self._parser: Optional[Parser] = None
         self._tree = None
+        self._buffer: Optional['TextBuffer'] = None
+        # Texto del árbol (tras el último lote aplicado) y sus líneas en
+        # caracteres y en bytes UTF-8; propios, para poder seguir snapshots
+        self._source: Optional[TextSource] = None
+        self._lines: Optional[LineIndex] = None
+        self._byte_lines: Optional[LineIndex] = None
+        # Última lectura del parser: (byte final, offset final), para seguir sin buscar
+        self._read_end: Tuple[int, int] = (-1, -1)
+        # Aumenta con cada árbol nuevo; changed_ranges son los del último parse
+        self.tree_version = 0
+        self.changed_ranges: List[tree_sitter.Range] = []
+        self._ts_language: Optional[Language] = None
+        # Tokens por línea, válidos para tree_version: fila -> (última fila
+        # que tocan, array plano [inicio, fin, id de tipo, ...] en bytes
+        # desde el inicio de la fila)
+        self._line_tokens: Dict[int, Tuple[int, array]] = {}
         self._setup_parser()
     
     def _setup_parser(self):
-        """Configura parser de tree-sitter"""
+        """Gramática compartida del registro (se carga una vez por proceso)"""
         if self.language not in self.SUPPORTED_LANGUAGES:
             return
-        
-        try:
-            # Cargar lenguaje pre-compilado (debes incluir los .so en el repo)
-            lang = Language(f'languages/{self.language}.so', self.language)
-            self._parser = Parser()
-            self._parser.set_language(lang)
-        except Exception as e:
-            print(f"Error loading tree-sitter language: {e}")
+        self._ts_language = grammar_registry().language(self.language)
+    
+    @property
+    def available(self) -> bool:
+        """Si hay gramática para el lenguaje"""
+        return self._ts_language is not None
+    
+    def _parse(self, source, old_tree=None) -> tree_sitter.Tree:
+        """Parsea con un Parser prestado por el pool del lenguaje"""
+        args = (source,) if old_tree is None else (source, old_tree)
+        with grammar_registry().parser(self.language) as parser:
+            return parser.parse(*args, encoding='utf8')
+    
+    @property
+    def line_count(self) -> int:
+        return self._lines.line_count if self._lines is not None else 0
     
     def parse(self, text: str):
         """Parsea el texto completo"""
-        if not self._parser:
+        if not self.available:
             return
         
-        self._tree = self._parser.parse(bytes(text, 'utf8'))
+        self.detach()
+        self._tree = self._parse(bytes(text, 'utf8'))
+        self._source = StringSnapshot(text)
+        self._lines = LineIndex(text)
+        self._byte_lines = LineIndex(_as_bytes(text))
+        self.changed_ranges = []
+        self.tree_version += 1
+        self._line_tokens.clear()
     
-    def get_tokens(self, start_line: int, end_line: int) -> List[Token]:
-        """Obtiene tokens para rango de líneas"""
-        if not self._tree:
-            return []
+    # ==================== PARSEO INCREMENTAL ====================
+    
+    def attach(self, buffer: 'TextBuffer'):
+        """
+        Parsea el buffer y lo sigue: cada lote de ediciones se aplica al
+        árbol anterior y solo se vuelve a parsear lo que cambió.
+        """
+        self.detach()
+        if not self.available:
+            return
+        self.reset(buffer)
+        self._buffer = buffer
+        buffer.add_listener(self._on_edits)
+    
+    def detach(self):
+        """Deja de seguir el buffer"""
+        if self._buffer is not None:
+            self._buffer.remove_listener(self._on_edits)
+            self._buffer = None
+    
+    def reset(self, source: TextSource):
+        """Parsea desde cero el texto de source (buffer o snapshot)"""
+        self._source = source
+        self._lines = LineIndex.from_chunks(source.iter_chunks())
+        self._byte_lines = LineIndex.from_chunks(_as_bytes(c) for c in source.iter_chunks())
+        self._read_end = (-1, -1)
+        self._tree = self._parse(self._read)
+        self.changed_ranges = []
+        self.tree_version += 1
+        self._line_tokens.clear()
+    
+    def replace_source(self, source: TextSource):
+        """Mismo texto leído de otro sitio: el árbol y los tokens siguen valiendo"""
+        self._source = source
+    
+    def edit(self, edits: List['Edit'], source: TextSource) -> Tuple[int, int, int]:
+        """
+        Aplica al árbol un lote de ediciones sin parsear todavía; source es
+        el texto justo después del lote. Se pueden encadenar varios lotes
+        antes de reparse(). Devuelve las filas (inicio, fin anterior, fin
+        nuevo) del tramo editado.
+        """
+        self._source = source
+        if len(edits) > LINE_INDEX_BULK_THRESHOLD:
+            self._lines = LineIndex.from_chunks(source.iter_chunks())
+        else:
+            for edit in edits:
+                self._lines.delete(edit.position, len(edit.deleted_text))
+                self._lines.insert(edit.position, edit.inserted_text)
+        rows = self._edit_tree(edits)
+        self._invalidate_tokens(*rows)
+        return rows
+    
+    def reparse(self):
+        """Parsea reutilizando el árbol editado; solo cambia lo editado"""
+        old_tree = self._tree
+        self._read_end = (-1, -1)
+        self._tree = self._parse(self._read, old_tree)
+        self.changed_ranges = list(old_tree.changed_ranges(self._tree))
+        self.tree_version += 1
+        self._drop_changed_rows()
+    
+    @property
+    def changed_rows(self) -> List[Tuple[int, int]]:
+        """Filas [inicio, fin] de los rangos que cambiaron en el último parse"""
+        return [(changed.start_point[0], changed.end_point[0]) for changed in self.changed_ranges]
+    
+    def _read(self, byte_offset: int, point: Tuple[int, int]) -> bytes:
+        """Lectura del parser: texto desde (fila, columna en bytes)"""
+        source = self._source
+        row, column = point
+        if row >= self._lines.line_count:
+            return b''
+        if byte_offset == self._read_end[0]:
+            # Continuación de la lectura anterior (el caso habitual)
+            start = self._read_end[1]
+        else:
+            start = self._lines.line_to_offset(row)
+            if column:
+                # La columna en bytes nunca es menor que en caracteres
+                start += _char_column(source.get_range(start, start + column), column)
+        text = source.get_range(start, start + PARSE_READ_CHARS)
+        data = text.encode('utf-8')
+        self._read_end = (byte_offset + len(data), start + len(text))
+        return data
+    
+    def _on_edits(self, edits: List['Edit']):
+        if self._tree is None:
+            return
+        self.edit(edits, self._buffer)
+        self.reparse()
+    
+    def _edit_tree(self, edits: List['Edit']) -> Tuple[int, int, int]:
+        """
+        Lleva el árbol al texto actual con un único tree.edit que cubre todo
+        el lote. Se calcula el tramo [lo, hi) del texto nuevo que difiere
+        del anterior; fuera de él el texto coincide, así que las posiciones
+        en bytes se obtienen del buffer actual y del índice de bytes previo.
+        Devuelve las filas (inicio, fin anterior, fin nuevo) del tramo.
+        """
+        lo = hi = edits[0].position
+        for edit in edits:
+            position = edit.position
+            old_end = position + len(edit.deleted_text)
+            new_end = position + len(edit.inserted_text)
+            if hi >= old_end:
+                hi += new_end - old_end
+            elif hi > position:
+                hi = new_end
+            lo = min(lo, position)
+            hi = max(hi, new_end)
         
-        tokens = []
-        root = self._tree.root_node
+        source = self._source
+        lines = self._lines
+        byte_lines = self._byte_lines
+        # Inicio: el texto anterior a lo no cambió
+        start_row = lines.offset_to_line_col(lo)[0]
+        line_start = lines.line_to_offset(start_row)
+        start_column = _byte_len(source.get_range(line_start, lo))
+        start_byte = byte_lines.line_to_offset(start_row) + start_column
+        
+        # Fin nuevo: a partir del texto insertado
+        inserted = _as_bytes(source.get_range(lo, hi))
+        new_end_byte = start_byte + len(inserted)
+        newline = inserted.rfind('\n')
+        new_end_row = start_row + inserted.count('\n')
+        new_end_column = start_column + len(inserted) if newline < 0 else len(inserted) - newline - 1
+        
+        # Fin anterior: el resto de su línea coincide con el que sigue a hi
+        old_end_row = byte_lines.line_count - (lines.line_count - new_end_row)
+        line_end = (
+            lines.line_to_offset(new_end_row + 1)
+            if new_end_row + 1 < lines.line_count else len(source)
+        )
+        old_end_column = (
+            byte_lines.line_length(old_end_row, include_newline=True)
+            - _byte_len(source.get_range(hi, line_end))
+        )
+        old_end_byte = byte_lines.line_to_offset(old_end_row) + old_end_column
         
-        # Query para obtener nodos interesantes
-        query_str = self._get_query_for_language()
-        if not query_str:
+        self._tree.edit(
+            start_byte, old_end_byte, new_end_byte,
+            (start_row, start_column), (old_end_row, old_end_column),
+            (new_end_row, new_end_column),
+        )
+        byte_lines.delete(start_byte, old_end_byte - start_byte)
+        byte_lines.insert(start_byte, inserted)
+        return start_row, old_end_row, new_end_row
+    
+    def _invalidate_tokens(self, start_row: int, old_end_row: int, new_end_row: int):
+        """
+        Lleva la caché de tokens al texto editado: descarta las líneas con
+        tokens dentro del tramo editado y renumera las siguientes.
+        """
+        line_delta = new_end_row - old_end_row
+        cache: Dict[int, Tuple[int, array]] = {}
+        for row, (last_row, spans) in self._line_tokens.items():
+            if row > old_end_row:
+                cache[row + line_delta] = (last_row + line_delta, spans)
+            elif last_row < start_row:
+                cache[row] = (last_row, spans)
+        self._line_tokens = cache
+    
+    def _drop_changed_rows(self):
+        """Descarta de la caché las líneas que tocan los rangos que cambiaron"""
+        cache = self._line_tokens
+        for changed in self.changed_ranges:
+            first, last = changed.start_point[0], changed.end_point[0]
+            for row in [r for r, (end, _) in cache.items() if r <= last and end >= first]:
+                del cache[row]
+    
+    def get_tokens(self, start_line: int, end_line: int) -> List[Token]:
+        """
+        Obtiene tokens para rango de líneas. La query solo recorre las
+        líneas que no están ya en caché.
+        """
+        if not self._tree:
             return []
         
-        query = self.language.query(query_str)
-        captures = query.captures(root)
+        cache = self._line_tokens
+        missing = [row for row in range(start_line, end_line + 1) if row not in cache]
+        if missing:
+            self._capture_lines(missing[0], missing[-1])
         
-        for node, capture_name in captures:
-            if start_line <= node.start_point[0] <= end_line:
-                token_type = self._map_capture_to_type(capture_name)
+        tokens = []
+        byte_lines = self._byte_lines
+        for row in range(start_line, end_line + 1):
+            entry = cache.get(row)
+            if not entry or not entry[1]:
+                continue
+            line_start = byte_lines.line_to_offset(row)
+            spans = entry[1]
+            for i in range(0, len(spans), 3):
                 tokens.append(Token(
-                    type=token_type,
-                    start=node.start_byte,
-                    end=node.end_byte,
-                    line=node.start_point[0]
+                    type=TOKEN_TYPES[spans[i + 2]],
+                    start=line_start + spans[i],
+                    end=line_start + spans[i + 1],
+                    line=row
                 ))
         
         return tokens
     
+    def line_spans(self, first_line: int, last_line: int) -> TokenLines:
+        """
+        Tokens de cada línea de [first_line, last_line] para la vista, en
+        columnas de carácter y recortados a la línea: un token de varias
+        líneas (docstring, comentario) aparece en cada una de ellas.
+        """
+        result = TokenLines()
+        if not self._tree:
+            return result
+        last_line = min(last_line, self.line_count - 1)
+        cache = self._line_tokens
+        missing = [row for row in range(first_line, last_line + 1) if row not in cache]
+        if missing:
+            self._capture_lines(missing[0], missing[-1])
+        
+        lines = self._lines
+        byte_lines = self._byte_lines
+        # Tokens abiertos: (byte final absoluto, tipo), empezando por los
+        # que vienen de líneas anteriores
+        open_tokens = [
+            (node.end_byte, type_id)
+            for node, type_id in self._captures(first_line, first_line)
+            if node.start_point[0] < first_line
+        ]
+        for row in range(first_line, last_line + 1):
+            start = lines.line_to_offset(row)
+            text = self._source.get_range(start, start + lines.line_length(row))
+            line_byte = byte_lines.line_to_offset(row)
+            line_bytes = byte_lines.line_length(row)
+            spans = [
+                (0, _char_column(text, min(end - line_byte, line_bytes)), type_id)
+                for end, type_id in open_tokens
+            ]
+            next_line = line_byte + byte_lines.line_length(row, include_newline=True)
+            open_tokens = [token for token in open_tokens if token[0] > next_line]
+            entry = cache.get(row)
+            packed = entry[1] if entry else ()
+            for i in range(0, len(packed), 3):
+                token_start, token_end, type_id = packed[i:i + 3]
+                spans.append((
+                    _char_column(text, token_start),
+                    _char_column(text, min(token_end, line_bytes)),
+                    type_id,
+                ))
+                if line_byte + token_end > next_line:
+                    open_tokens.append((line_byte + token_end, type_id))
+            result.append(spans)
+        return result
+    
+    def _captures(self, first_row: int, last_row: int) -> List[Tuple[tree_sitter.Node, int]]:
+        """
+        Nodos capturados (con el id de su tipo) que tocan las filas
+        [first_row, last_row]. Un nodo con varias capturas se queda con la
+        del primer patrón.
+        """
+        query = self._query()
+        if query is None:
+            return []
+        cursor = QueryCursor(query)
+        cursor.set_point_range((first_row, 0), (last_row + 1, 0))
+        captures = cursor.captures(self._tree.root_node)
+        
+        seen = set()
+        found = []
+        for index in range(query.capture_count):
+            name = query.capture_name(index)
+            type_id = TYPE_IDS[self._map_capture_to_type(name)]
+            for node in captures.get(name, ()):
+                key = (node.start_byte, node.end_byte)
+                if key in seen:
+                    continue
+                seen.add(key)
+                found.append((node, type_id))
+        return found
+    
+    def _capture_lines(self, first_row: int, last_row: int):
+        """Ejecuta la query sobre las filas [first_row, last_row] y las guarda en caché"""
+        if self._query() is None:
+            return
+        rows: Dict[int, List[Tuple[int, int, int, int]]] = {}
+        for node, type_id in self._captures(first_row, last_row):
+            row = node.start_point[0]
+            if first_row <= row <= last_row:
+                rows.setdefault(row, []).append(
+                    (node.start_point[1], node.end_byte, node.end_point[0], type_id)
+                )
+        
+        cache = self._line_tokens
+        if len(cache) > TOKEN_CACHE_LINES:
+            # Conservar solo lo cercano a la zona consultada
+            keep = TOKEN_CACHE_LINES // 2
+            for row in [r for r in cache if r < first_row - keep or r > last_row + keep]:
+                del cache[row]
+        byte_lines = self._byte_lines
+        for row in range(first_row, last_row + 1):
+            if row in cache:
+                continue
+            found = sorted(rows.get(row, ()), key=lambda t: t[0])
+            line_start = byte_lines.line_to_offset(row)
+            packed = array('I')
+            for column, end, _, type_id in found:
+                packed.extend((column, end - line_start, type_id))
+            cache[row] = (max((end_row for _, _, end_row, _ in found), default=row), packed)
+    
+    def _query(self) -> Optional[Query]:
+        """Query compilada del lenguaje (una vez por proceso)"""
+        if self.language not in _QUERY_CACHE:
+            query_str = self._get_query_for_language()
+            query = None
+            if query_str and self._ts_language is not None:
+                try:
+                    query = Query(self._ts_language, query_str)
+                except Exception as e:
+                    print(f"Error compiling tree-sitter query for {self.language}: {e}")
+            _QUERY_CACHE[self.language] = query
+        return _QUERY_CACHE[self.language]
+    
     def _get_query_for_language(self) -> str:
         """Queries específicas por lenguaje"""
         queries = {
@@ -98,7 +466,75 @@ class TreeSitterHighlighter:
                 (comment) @comment
                 (number) @number
                 (identifier) @identifier
-            '''
+            ''',
+            'typescript': '''
+                (function_declaration name: (identifier) @function)
+                (string) @string
+                (comment) @comment
+                (number) @number
+                (identifier) @identifier
+            ''',
+            'rust': '''
+                (function_item name: (identifier) @function)
+                (string_literal) @string
+                (char_literal) @string
+                (line_comment) @comment
+                (block_comment) @comment
+                (integer_literal) @number
+                (float_literal) @number
+                (identifier) @identifier
+            ''',
+            'c': '''
+                (function_declarator declarator: (identifier) @function)
+                (string_literal) @string
+                (char_literal) @string
+                (comment) @comment
+                (number_literal) @number
+                (identifier) @identifier
+            ''',
+            'cpp': '''
+                (function_declarator declarator: (identifier) @function)
+                (string_literal) @string
+                (raw_string_literal) @string
+                (char_literal) @string
+                (comment) @comment
+                (number_literal) @number
+                (identifier) @identifier
+            ''',
+            'html': '''
+                (tag_name) @keyword
+                (attribute_value) @string
+                (comment) @comment
+            ''',
+            'css': '''
+                (tag_name) @keyword
+                (property_name) @identifier
+                (string_value) @string
+                (integer_value) @number
+                (float_value) @number
+                (comment) @comment
+            ''',
+            'json': '''
+                (string) @string
+                (number) @number
+                (true) @keyword
+                (false) @keyword
+                (null) @keyword
+            ''',
+            'yaml': '''
+                (double_quote_scalar) @string
+                (single_quote_scalar) @string
+                (integer_scalar) @number
+                (float_scalar) @number
+                (boolean_scalar) @keyword
+                (comment) @comment
+            ''',
+            'markdown': '''
+                (atx_heading) @keyword
+                (setext_heading) @keyword
+                (fenced_code_block) @string
+                (indented_code_block) @string
+            ''',
         }
         return queries.get(self.language, '')
     
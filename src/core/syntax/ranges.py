@@ -0,0 +1,53 @@
+"""
+Rangos de filas [inicio, fin] (ambos incluidos), ordenados y disjuntos:
+las líneas que faltan por resaltar o por volver a tokenizar.
+"""
+
+from typing import List, Tuple
+
+
+def add_range(ranges: List[Tuple[int, int]], first: int, last: int):
+    """Añade [first, last] a una lista ordenada de rangos disjuntos"""
+    merged = []
+    for start, end in ranges:
+        if end < first - 1 or start > last + 1:
+            merged.append((start, end))
+        else:
+            first, last = min(first, start), max(last, end)
+    merged.append((first, last))
+    merged.sort()
+    ranges[:] = merged
+
+
+def take_range(ranges: List[Tuple[int, int]], first: int, last: int) -> List[Tuple[int, int]]:
+    """Quita [first, last] de ranges y devuelve los tramos que había dentro"""
+    taken = []
+    kept = []
+    for start, end in ranges:
+        if end < first or start > last:
+            kept.append((start, end))
+            continue
+        taken.append((max(start, first), min(end, last)))
+        if start < first:
+            kept.append((start, first - 1))
+        if end > last:
+            kept.append((last + 1, end))
+    ranges[:] = kept
+    return taken
+
+
+def shift_ranges(
+    ranges: List[Tuple[int, int]], start_row: int, old_end_row: int, new_end_row: int
+) -> List[Tuple[int, int]]:
+    """Lleva los rangos al texto editado (el tramo editado queda incluido)"""
+    delta = new_end_row - old_end_row
+    shifted: List[Tuple[int, int]] = []
+    for start, end in ranges:
+        if end < start_row:
+            shifted.append((start, end))
+        elif start > old_end_row:
+            shifted.append((start + delta, end + delta))
+        else:
+            add_range(shifted, min(start, start_row), max(end + delta, new_end_row))
+    add_range(shifted, start_row, new_end_row)
+    return shifted
@@ -0,0 +1,152 @@
+"""
+Almacenamiento compacto de tokens de resaltado.
+
+Los tokens de un tramo de líneas se guardan en arrays paralelos (inicio,
+fin, tipo) con una tabla de offsets por línea: unos 9 bytes por token en
+vez de un objeto de Python por token. TokenStore guarda así el documento
+entero, partido en bloques para que insertar o borrar líneas solo
+reescriba el bloque afectado.
+"""
+
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Iterable, Iterator, List, Tuple
+
+# Líneas por bloque de TokenStore
+BLOCK_LINES = 256
+
+
+class TokenLines:
+    """
+    Tokens de un tramo de líneas: los de la línea i ocupan las posiciones
+    [offsets[i], offsets[i + 1]) de starts, ends y types. Las columnas son
+    de carácter dentro de la línea; types guarda el id del tipo de token.
+    """
+
+    __slots__ = ('offsets', 'starts', 'ends', 'types')
+
+    def __init__(self):
+        self.offsets = array('I', [0])
+        self.starts = array('I')
+        self.ends = array('I')
+        self.types = array('B')
+
+    @classmethod
+    def empty(cls, line_count: int) -> 'TokenLines':
+        """line_count líneas sin tokens"""
+        lines = cls()
+        lines.offsets = array('I', [0]) * (line_count + 1)
+        return lines
+
+    @classmethod
+    def concat(cls, parts: Iterable['TokenLines']) -> 'TokenLines':
+        """Une varios tramos consecutivos en uno"""
+        lines = cls()
+        for part in parts:
+            base = lines.offsets[-1]
+            lines.offsets.extend(offset + base for offset in part.offsets[1:])
+            lines.starts.extend(part.starts)
+            lines.ends.extend(part.ends)
+            lines.types.extend(part.types)
+        return lines
+
+    def append(self, spans: Iterable[Tuple[int, int, int]]):
+        """Añade una línea con sus tokens (inicio, fin, id de tipo)"""
+        for start, end, type_id in spans:
+            self.starts.append(start)
+            self.ends.append(end)
+            self.types.append(type_id)
+        self.offsets.append(len(self.starts))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def spans(self, line: int) -> Iterator[Tuple[int, int, int]]:
+        """Tokens de una línea del tramo"""
+        first, last = self.offsets[line], self.offsets[line + 1]
+        return zip(self.starts[first:last], self.ends[first:last], self.types[first:last])
+
+    def slice(self, first: int, last: int) -> 'TokenLines':
+        """Tramo con las líneas [first, last)"""
+        lines = TokenLines()
+        begin, end = self.offsets[first], self.offsets[last]
+        lines.offsets = array('I', (offset - begin for offset in self.offsets[first:last + 1]))
+        lines.starts = self.starts[begin:end]
+        lines.ends = self.ends[begin:end]
+        lines.types = self.types[begin:end]
+        return lines
+
+    @property
+    def nbytes(self) -> int:
+        """Memoria de los arrays (sin la cabecera de los objetos)"""
+        return sum(
+            len(values) * values.itemsize
+            for values in (self.offsets, self.starts, self.ends, self.types)
+        )
+
+
+class TokenStore:
+    """Tokens de todas las líneas de un documento, en bloques de TokenLines"""
+
+    def __init__(self, line_count: int = 1):
+        self._blocks: List[TokenLines] = []
+        self._line_starts: List[int] = []
+        self.reset(line_count)
+
+    def reset(self, line_count: int):
+        """Deja line_count líneas sin tokens"""
+        self._blocks = [
+            TokenLines.empty(min(BLOCK_LINES, line_count - first))
+            for first in range(0, max(line_count, 1), BLOCK_LINES)
+        ]
+        self._refresh()
+
+    def _refresh(self):
+        self._line_starts = [0, *accumulate(len(block) for block in self._blocks)]
+
+    @property
+    def line_count(self) -> int:
+        return self._line_starts[-1]
+
+    def _locate(self, line: int) -> Tuple[int, int]:
+        """(bloque, línea dentro del bloque); el final cae en el último bloque"""
+        block = min(bisect_right(self._line_starts, line) - 1, len(self._blocks) - 1)
+        return block, line - self._line_starts[block]
+
+    def spans(self, line: int) -> Iterator[Tuple[int, int, int]]:
+        """Tokens de una línea (vacío fuera del documento)"""
+        if not 0 <= line < self.line_count:
+            return iter(())
+        block, index = self._locate(line)
+        return self._blocks[block].spans(index)
+
+    def splice(self, first: int, removed: int, lines: TokenLines):
+        """Sustituye las líneas [first, first + removed) por las de lines"""
+        first = max(0, min(first, self.line_count))
+        removed = max(0, min(removed, self.line_count - first))
+        first_block, first_index = self._locate(first)
+        last_block, last_index = self._locate(first + removed)
+        merged = TokenLines.concat(self._blocks[first_block:last_block + 1])
+        end_index = self._line_starts[last_block] - self._line_starts[first_block] + last_index
+        merged = TokenLines.concat([
+            merged.slice(0, first_index), lines, merged.slice(end_index, len(merged))
+        ])
+        blocks = [
+            merged.slice(start, min(start + BLOCK_LINES, len(merged)))
+            for start in range(0, len(merged), BLOCK_LINES)
+        ]
+        if not blocks and len(self._blocks) == last_block - first_block + 1:
+            # Siempre queda un bloque, aunque esté vacío
+            blocks = [TokenLines.empty(0)]
+        self._blocks[first_block:last_block + 1] = blocks
+        self._refresh()
+
+    def set_lines(self, first: int, lines: TokenLines):
+        """Sustituye los tokens de las líneas first.. por los de lines"""
+        count = min(len(lines), self.line_count - first)
+        self.splice(first, count, lines if count == len(lines) else lines.slice(0, count))
+
+    @property
+    def nbytes(self) -> int:
+        return sum(block.nbytes for block in self._blocks)
@@ -0,0 +1,362 @@
+"""
+Tokenizador incremental por líneas.
+
+Resaltado rápido para lenguajes sin gramática tree-sitter (o con la
+gramática sin instalar): un lexer de expresiones regulares que recorre el
+texto línea a línea con un estado entre líneas (dentro de un comentario
+de bloque o de una cadena de varias líneas). Se guarda el estado al final
+de cada línea; tras una edición solo se vuelven a tokenizar las líneas
+sucias y las siguientes mientras su estado final cambie: en cuanto
+coincide con el guardado, el resto del documento sigue valiendo.
+"""
+
+import re
+from array import array
+from typing import TYPE_CHECKING, Callable, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from core.buffer.line_index import LineIndex
+from core.models.text_buffer import LINE_INDEX_BULK_THRESHOLD
+from core.syntax.highlighter import TYPE_IDS, TextSource, TokenType
+from core.syntax.ranges import add_range, shift_ranges, take_range
+from core.syntax.token_store import TokenLines, TokenStore
+
+if TYPE_CHECKING:
+    from core.buffer.undo_stack import Edit
+
+
+class LexerSpec(NamedTuple):
+    keywords: FrozenSet[str]
+    line_comments: Tuple[str, ...]
+    # Construcciones de varias líneas: (apertura, cierre, tipo)
+    blocks: Tuple[Tuple[str, str, TokenType], ...]
+    # Comillas de las cadenas de una línea
+    quotes: str
+
+
+_C_BLOCK = (('/*', '*/', TokenType.COMMENT),)
+
+LEXERS: Dict[str, LexerSpec] = {
+    'python': LexerSpec(
+        frozenset((
+            'False None True and as assert async await break class continue def del '
+            'elif else except finally for from global if import in is lambda '
+            'nonlocal not or pass raise return try while with yield match case'
+        ).split()),
+        ('#',),
+        (('"""', '"""', TokenType.STRING), ("'''", "'''", TokenType.STRING)),
+        '"\'',
+    ),
+    'javascript': LexerSpec(
+        frozenset((
+            'async await break case catch class const continue debugger default '
+            'delete do else export extends false finally for function if import '
+            'in instanceof let new null of return static super switch this throw '
+            'true try typeof undefined var void while with yield'
+        ).split()),
+        ('//',),
+        _C_BLOCK + (('`', '`', TokenType.STRING),),
+        '"\'',
+    ),
+    'rust': LexerSpec(
+        frozenset((
+            'as async await break const continue crate dyn else enum extern false '
+            'fn for if impl in let loop match mod move mut pub ref return self '
+            'Self static struct super trait true type unsafe use where while'
+        ).split()),
+        ('//',),
+        _C_BLOCK,
+        '"',
+    ),
+    'c': LexerSpec(
+        frozenset((
+            'auto break case char const continue default do double else enum '
+            'extern float for goto if inline int long register return short '
+            'signed sizeof static struct switch typedef union unsigned void '
+            'volatile while #include #define #ifdef #ifndef #endif #if #else'
+        ).split()),
+        ('//',),
+        _C_BLOCK,
+        '"\'',
+    ),
+    'css': LexerSpec(frozenset(('!important',)), (), _C_BLOCK, '"\''),
+    'json': LexerSpec(frozenset(('true', 'false', 'null')), (), (), '"'),
+    'yaml': LexerSpec(
+        frozenset(('true', 'false', 'null', 'yes', 'no', 'on', 'off')), ('#',), (), '"\''
+    ),
+    'html': LexerSpec(frozenset(), (), (('<!--', '-->', TokenType.COMMENT),), '"\''),
+    'markdown': LexerSpec(frozenset(), (), (('```', '```', TokenType.STRING),), ''),
+}
+LEXERS['typescript'] = LEXERS['javascript']._replace(keywords=LEXERS['javascript'].keywords | {
+    'abstract', 'as', 'declare', 'enum', 'implements', 'interface', 'keyof',
+    'namespace', 'private', 'protected', 'public', 'readonly', 'type',
+})
+LEXERS['cpp'] = LEXERS['c']._replace(keywords=LEXERS['c'].keywords | {
+    'bool', 'catch', 'class', 'constexpr', 'delete', 'false', 'friend',
+    'namespace', 'new', 'nullptr', 'operator', 'private', 'protected',
+    'public', 'template', 'this', 'throw', 'true', 'try', 'typename',
+    'using', 'virtual',
+})
+
+# Expresión de cada lexer, compilada al primer uso
+_PATTERNS: Dict[str, 're.Pattern'] = {}
+
+# Estado de una línea aún sin tokenizar: nunca coincide con uno real
+_UNKNOWN_STATE = 0xFFFF
+
+_KEYWORD = TYPE_IDS[TokenType.KEYWORD]
+_STRING = TYPE_IDS[TokenType.STRING]
+_COMMENT = TYPE_IDS[TokenType.COMMENT]
+_NUMBER = TYPE_IDS[TokenType.NUMBER]
+_FUNCTION = TYPE_IDS[TokenType.FUNCTION]
+_OPERATOR = TYPE_IDS[TokenType.OPERATOR]
+
+
+def _pattern(language: str) -> 're.Pattern':
+    pattern = _PATTERNS.get(language)
+    if pattern is not None:
+        return pattern
+    spec = LEXERS[language]
+    parts = []
+    if spec.blocks:
+        opens = sorted((start for start, _, _ in spec.blocks), key=len, reverse=True)
+        parts.append('(?P<block>' + '|'.join(map(re.escape, opens)) + ')')
+    if spec.line_comments:
+        parts.append('(?P<comment>(?:' + '|'.join(map(re.escape, spec.line_comments)) + ').*)')
+    if spec.quotes:
+        parts.append('(?P<string>' + '|'.join(
+            f'{q}(?:[^{q}\\\\]|\\\\.)*{q}?' for q in spec.quotes
+        ) + ')')
+    parts.append(r'(?P<number>\b(?:0[xXbBoO][0-9a-fA-F_]+|\d[\d_]*(?:\.\d*)?(?:[eE][+-]?\d+)?))')
+    parts.append(r'(?P<word>#?[^\W\d]\w*)(?P<call>\s*\()?')
+    parts.append(r'(?P<operator>[-+*/%=<>!&|^~?:]+)')
+    pattern = _PATTERNS[language] = re.compile('|'.join(parts))
+    return pattern
+
+
+class IncrementalTokenizer:
+    """
+    Tokens por línea con estado entre líneas. Las filas se marcan sucias
+    con mark_dirty / edit_lines y se tokenizan al pedirlas.
+    """
+
+    def __init__(self, language: str):
+        self.language = language
+        self._spec: Optional[LexerSpec] = LEXERS.get(language)
+        # Estado al final de cada línea (0: fuera de bloque, i + 1: dentro de blocks[i])
+        self._states = array('H')
+        self._tokens = TokenStore(0)
+        # Filas por tokenizar; sin tamaño conocido, todo el documento
+        self._dirty: List[Tuple[int, int]] = []
+        self._sized = False
+        # Texto que se sigue con reset() / edit() (modo HighlightService)
+        self._source: Optional[TextSource] = None
+        self._lines: Optional[LineIndex] = None
+        # Filas tokenizadas de nuevo en el último reparse()
+        self.changed_rows: List[Tuple[int, int]] = []
+
+    @property
+    def available(self) -> bool:
+        """Si hay lexer para el lenguaje"""
+        return self._spec is not None
+
+    # ==================== FILAS SUCIAS ====================
+
+    def invalidate_cache(self):
+        """Olvida todos los estados: se vuelve a tokenizar el documento entero"""
+        self._states = array('H')
+        self._tokens.reset(0)
+        self._dirty = []
+        self._sized = False
+
+    def mark_dirty(self, start_line: int, end_line: int):
+        """Las líneas [start_line, end_line] cambiaron sin cambiar de número"""
+        if self._sized:
+            last = len(self._states) - 1
+            if start_line <= last:
+                add_range(self._dirty, max(0, start_line), min(end_line, last))
+
+    def edit_lines(self, start_line: int, old_end_line: int, new_end_line: int):
+        """
+        Las líneas [start_line, old_end_line] pasan a ser [start_line,
+        new_end_line]: se desplazan los estados y tokens de las siguientes.
+        """
+        if not self._sized:
+            return
+        if start_line >= len(self._states) or old_end_line >= len(self._states):
+            self.invalidate_cache()
+            return
+        added = new_end_line - start_line + 1
+        self._states[start_line:old_end_line + 1] = array('H', [_UNKNOWN_STATE]) * added
+        self._tokens.splice(start_line, old_end_line - start_line + 1, TokenLines.empty(added))
+        self._dirty = shift_ranges(self._dirty, start_line, old_end_line, new_end_line)
+
+    # ==================== TOKENIZACIÓN ====================
+
+    def tokenize(
+        self, line_text: Callable[[int], str], line_count: int, last_line: Optional[int] = None
+    ) -> List[Tuple[int, int]]:
+        """
+        Tokeniza las filas sucias hasta last_line (todas si es None).
+        Devuelve los rangos de filas cuyos tokens se recalcularon.
+        """
+        if not self._sized or len(self._states) != line_count:
+            # Primer uso o filas que no cuadran con el texto: desde cero
+            self._states = array('H', [_UNKNOWN_STATE]) * line_count
+            self._tokens.reset(line_count)
+            self._dirty = [(0, line_count - 1)] if line_count else []
+            self._sized = True
+        if last_line is None:
+            last_line = line_count - 1
+        states = self._states
+        changed: List[Tuple[int, int]] = []
+        while self._dirty and self._dirty[0][0] <= last_line:
+            first, last = self._dirty[0]
+            state = states[first - 1] if first else 0
+            lines = TokenLines()
+            row = first
+            while row < line_count:
+                spans, state = self._lex_line(line_text(row), state)
+                lines.append(spans)
+                converged = row >= last and states[row] == state
+                states[row] = state
+                row += 1
+                if converged:
+                    break
+                if row > last and row > last_line:
+                    # El estado sigue cambiando, pero no hace falta ir más allá
+                    add_range(self._dirty, row, row)
+                    break
+            take_range(self._dirty, first, row - 1)
+            self._tokens.set_lines(first, lines)
+            add_range(changed, first, row - 1)
+        return changed
+
+    def line_tokens(self, line: int):
+        """Tokens de una línea ya tokenizada: (columna inicial, final, id de tipo)"""
+        return self._tokens.spans(line)
+
+    def _lex_line(self, text: str, state: int) -> Tuple[List[Tuple[int, int, int]], int]:
+        """Tokens de una línea que empieza en state, y el estado al final"""
+        spec = self._spec
+        if spec is None:
+            return [], 0
+        spans: List[Tuple[int, int, int]] = []
+        position = 0
+        if state:
+            _, close, token_type = spec.blocks[state - 1]
+            end = text.find(close)
+            if end < 0:
+                if text:
+                    spans.append((0, len(text), TYPE_IDS[token_type]))
+                return spans, state
+            position = end + len(close)
+            spans.append((0, position, TYPE_IDS[token_type]))
+            state = 0
+
+        pattern = _pattern(self.language)
+        length = len(text)
+        while position < length:
+            match = pattern.search(text, position)
+            if match is None:
+                break
+            kind = match.lastgroup
+            start, end = match.span()
+            position = end if end > start else start + 1
+            if kind == 'call':
+                kind = 'word'
+                end = match.end('word')
+            if kind == 'block':
+                opening = match.group()
+                for index, (start_text, close, token_type) in enumerate(spec.blocks):
+                    if start_text == opening:
+                        break
+                close_at = text.find(close, end)
+                if close_at < 0:
+                    spans.append((start, length, TYPE_IDS[token_type]))
+                    return spans, index + 1
+                position = close_at + len(close)
+                spans.append((start, position, TYPE_IDS[token_type]))
+            elif kind == 'word':
+                word = match.group('word')
+                if word in spec.keywords:
+                    spans.append((start, end, _KEYWORD))
+                elif match.group('call') is not None:
+                    spans.append((start, end, _FUNCTION))
+            elif kind == 'comment':
+                spans.append((start, end, _COMMENT))
+            elif kind == 'string':
+                spans.append((start, end, _STRING))
+            elif kind == 'number':
+                spans.append((start, end, _NUMBER))
+            elif kind == 'operator':
+                spans.append((start, end, _OPERATOR))
+        return spans, state
+
+    # ==================== INTERFAZ DEL HIGHLIGHTSERVICE ====================
+
+    @property
+    def line_count(self) -> int:
+        return self._lines.line_count if self._lines is not None else 0
+
+    def reset(self, source: TextSource):
+        """Sigue desde cero el texto de source (buffer o snapshot)"""
+        self._source = source
+        self._lines = LineIndex.from_chunks(source.iter_chunks())
+        self.invalidate_cache()
+        self.changed_rows = []
+
+    def replace_source(self, source: TextSource):
+        """Mismo texto leído de otro sitio: los estados y tokens siguen valiendo"""
+        self._source = source
+
+    def edit(self, edits: List['Edit'], source: TextSource) -> Tuple[int, int, int]:
+        """
+        Aplica un lote de ediciones; source es el texto tras el lote.
+        Devuelve las filas (inicio, fin anterior, fin nuevo) del tramo
+        editado, como TreeSitterHighlighter.edit.
+        """
+        self._source = source
+        old_count = self._lines.line_count
+        if len(edits) > LINE_INDEX_BULK_THRESHOLD:
+            self._lines = LineIndex.from_chunks(source.iter_chunks())
+            self.invalidate_cache()
+            new_count = self._lines.line_count
+            return 0, old_count - 1, new_count - 1
+        lines = self._lines
+        start = new_end = None
+        for edit in edits:
+            row = lines.offset_to_line_col(edit.position)[0]
+            old_end = row + edit.deleted_text.count('\n')
+            end = row + edit.inserted_text.count('\n')
+            lines.delete(edit.position, len(edit.deleted_text))
+            lines.insert(edit.position, edit.inserted_text)
+            self.edit_lines(row, old_end, end)
+            if start is None:
+                start, new_end = row, end
+            else:
+                if row <= new_end:
+                    new_end += end - old_end
+                start = min(start, row)
+                new_end = max(new_end, end)
+        # Lo que sigue al tramo no cambió: su número de líneas fija el fin anterior
+        return start, old_count - (lines.line_count - new_end), new_end
+
+    def reparse(self):
+        """Tokeniza todo lo sucio (hasta que los estados vuelvan a coincidir)"""
+        self.changed_rows = self.tokenize(self._line_text, self._lines.line_count)
+
+    def _line_text(self, row: int) -> str:
+        start = self._lines.line_to_offset(row)
+        return self._source.get_range(start, start + self._lines.line_length(row))
+
+    def line_spans(self, first_line: int, last_line: int) -> TokenLines:
+        """Tokens de las líneas [first_line, last_line], en columnas de carácter"""
+        lines = TokenLines()
+        if self._lines is None:
+            return lines
+        last_line = min(last_line, self.line_count - 1)
+        if self._dirty or not self._sized:
+            self.tokenize(self._line_text, self._lines.line_count, last_line)
+        for row in range(first_line, last_line + 1):
+            lines.append(self._tokens.spans(row))
+        return lines
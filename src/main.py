@@ -1,3 +1,4 @@
+import multiprocessing
 import sys
 from pathlib import Path
 from PySide6.QtCore import QUrl
@@ -33,4 +34,7 @@ def main():
     return app.exec()
 
 if __name__ == "__main__":
+    # Los pools de procesos usan spawn: en el ejecutable congelado
+    # (PyInstaller) cada hijo arranca este script y debe salir por aquí
+    multiprocessing.freeze_support()
     sys.exit(main())
\ No newline at end of file
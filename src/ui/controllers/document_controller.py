@@ -1,21 +1,131 @@
-from PySide6.QtCore import QObject, Signal, Slot, Property
+import re
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+from typing import Callable, List, Optional, Tuple
+from PySide6.QtCore import QObject, Signal, Slot, Property, QTimer
+from PySide6.QtGui import QColor, QSyntaxHighlighter, QTextCharFormat, QTextCursor, QTextDocument
+from core.buffer.base import BufferSnapshot
 from core.models.document import Document
 from pathlib import Path
-from core.models.search_engine import SearchEngine
+from core.models.search_engine import SearchEngine, compile_query, iter_match_batches
+from core.syntax.highlight_service import HighlightService
+from core.syntax.highlighter import TOKEN_TYPES, TokenType
+from core.syntax.token_store import TokenLines
+from ui.controllers.highlight_model import HighlightModel
+
+
+# Intervalo de agrupación de deltas (~1 frame a 60 Hz)
+EDIT_BATCH_INTERVAL_MS = 16
+# Por encima de este número de ediciones se recarga la vista entera
+VIEW_PATCH_LIMIT = 500
+# Espera máxima al hilo de resaltado antes de guardar un archivo grande
+SAVE_HIGHLIGHT_WAIT_SECONDS = 0.5
+# Hilos para búsquedas en segundo plano (compartidos por todos los documentos)
+SEARCH_WORKERS = 2
+# Colores de los tokens (Atom One Dark); los identificadores usan el del texto
+TOKEN_COLORS = {
+    TokenType.KEYWORD: "#C678DD",
+    TokenType.STRING: "#98C379",
+    TokenType.COMMENT: "#5C6370",
+    TokenType.NUMBER: "#D19A66",
+    TokenType.FUNCTION: "#61AFEF",
+    TokenType.OPERATOR: "#56B6C2",
+}
+
+_search_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _search_executor() -> ThreadPoolExecutor:
+    global _search_pool
+    if _search_pool is None:
+        _search_pool = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix='search')
+    return _search_pool
+
+
+def _match_dict(match) -> dict:
+    return {"start": match.start, "end": match.end, "line": match.line}
+
+
+def _valid_query(query: str, case_sensitive: bool, whole_word: bool, regex: bool) -> bool:
+    """Si la consulta compila (una expresión a medio escribir no lo hace)"""
+    try:
+        compile_query(query, case_sensitive, whole_word, regex)
+    except re.error:
+        return False
+    return True
+
+
+class _SpanHighlighter(QSyntaxHighlighter):
+    """Pinta cada bloque con los tokens de su fila en el HighlightModel"""
+
+    def __init__(self, document: QTextDocument, model: HighlightModel):
+        super().__init__(document)
+        self._model = model
+        # Formato por id de tipo (None: color del texto)
+        self._formats: List[Optional[QTextCharFormat]] = []
+        for token_type in TOKEN_TYPES:
+            color = TOKEN_COLORS.get(token_type)
+            text_format = None
+            if color is not None:
+                text_format = QTextCharFormat()
+                text_format.setForeground(QColor(color))
+            self._formats.append(text_format)
+
+    def highlightBlock(self, text: str):
+        formats = self._formats
+        for start, end, type_id in self._model.spans(self.currentBlock().blockNumber()):
+            text_format = formats[type_id]
+            if text_format is not None:
+                self.setFormat(start, end - start, text_format)
 
 
 class DocumentController(QObject):
     textChanged = Signal()
+    contentsChanged = Signal()
     modifiedChanged = Signal(bool)
+    saveCompleted = Signal(int, float)  # bytes escritos, bytes/segundo
+    matchesChanged = Signal()
+    searchResults = Signal(int, "QVariantList")  # id de búsqueda, lote de coincidencias
+    searchFinished = Signal(int, int)  # id de búsqueda, total
+    # Desde el hilo de búsqueda; llegan encolados al hilo de la GUI
+    _searchBatch = Signal(int, "QVariantList")
+    _searchDone = Signal(int, int)
+    # Desde el hilo de resaltado: versión del buffer, primera línea, tokens por línea
+    _highlightBatch = Signal(int, int, object)
 
     def __init__(self, document: Document):
         super().__init__()
         self._document = document
         self._updating_from_backend = False
+        self._applying_view_edits = False
         self._search_engine = SearchEngine()
+        self._search_key: Optional[Tuple[str, bool, bool, bool]] = None
+        self._search_job = 0
+        self._search_cancel: Optional[Event] = None
+        self._searchBatch.connect(self._on_search_batch)
+        self._searchDone.connect(self._on_search_done)
+        document.buffer.add_listener(self._on_buffer_changed)
+
+        # Resaltado de sintaxis en segundo plano
+        self._highlights: Optional[HighlightService] = None
+        self._highlight_model = HighlightModel(self)
+        self._span_highlighter: Optional[_SpanHighlighter] = None
+        self._highlightBatch.connect(self._on_highlight_batch)
+        self._start_highlighting()
+
+        # Sincronización incremental con el QTextDocument del editor QML
+        self._text_document: Optional[QTextDocument] = None
+        self._pending_edits: List[Tuple[int, int, str]] = []
+        self._pending_length = 0
+        self._needs_resync = False
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(EDIT_BATCH_INTERVAL_MS)
+        self._flush_timer.timeout.connect(self._flush_pending_edits)
 
     @Property(str, notify=textChanged)
     def text(self) -> str:
+        self._flush_pending_edits()
         return self._document.buffer.get_text()
 
     @Property(bool, notify=modifiedChanged)
@@ -30,137 +140,479 @@ class DocumentController(QObject):
     def language(self) -> str:
         return self._document.language
 
-    @Property(bool, notify=textChanged)
+    @Property(bool, notify=contentsChanged)
     def canUndo(self) -> bool:
         return self._document.buffer.can_undo()
 
-    @Property(bool, notify=textChanged)
+    @Property(bool, notify=contentsChanged)
     def canRedo(self) -> bool:
         return self._document.buffer.can_redo()
 
-    # NUEVO: Sincronización completa del texto
     @Slot(str)
     def setText(self, new_text: str):
-        """Reemplaza todo el texto - llamado desde QML"""
+        """Reemplaza todo el texto aplicando solo el rango que cambió"""
         if self._updating_from_backend:
             return
 
+        self._flush_pending_edits()
+        self._replace_changed_range(new_text)
+
+    def _replace_changed_range(self, new_text: str) -> bool:
+        """Aplica al buffer solo la diferencia entre prefijo y sufijo comunes"""
         old_text = self._document.buffer.get_text()
         if old_text == new_text:
+            return False
+
+        limit = min(len(old_text), len(new_text))
+        prefix = 0
+        while prefix < limit and old_text[prefix] == new_text[prefix]:
+            prefix += 1
+        suffix = 0
+        while (suffix < limit - prefix
+               and old_text[-1 - suffix] == new_text[-1 - suffix]):
+            suffix += 1
+
+        self._document.buffer.replace(
+            prefix,
+            len(old_text) - prefix - suffix,
+            new_text[prefix:len(new_text) - suffix],
+        )
+        return True
+
+    # ==================== SINCRONIZACIÓN POR DELTAS ====================
+
+    @Slot(QObject)
+    def attachTextDocument(self, quick_document):
+        """Escucha los cambios del QQuickTextDocument del editor QML"""
+        self.detachTextDocument()
+        self._text_document = quick_document.textDocument()
+        # El historial de deshacer es el del TextBuffer, no el de Qt
+        self._text_document.setUndoRedoEnabled(False)
+        self._pending_length = len(self._document.buffer)
+        self._text_document.contentsChange.connect(self._on_contents_change)
+        # Los tokens siguen en el modelo: el editor se pinta sin esperar al hilo
+        self._span_highlighter = _SpanHighlighter(self._text_document, self._highlight_model)
+
+    @Slot()
+    def detachTextDocument(self):
+        """Deja de escuchar el editor QML (al cambiar de pestaña)"""
+        if self._text_document is None:
             return
+        self._flush_pending_edits()
+        self._text_document.contentsChange.disconnect(self._on_contents_change)
+        self._span_highlighter.setDocument(None)
+        self._span_highlighter = None
+        self._text_document = None
 
-        # Reemplazar todo el buffer
-        # (Ineficiente pero funcional para MVP)
-        if len(old_text) > 0:
-            self._document.buffer.delete(0, len(old_text))
-        if len(new_text) > 0:
-            self._document.buffer.insert(0, new_text)
+    @Slot(int, int, str)
+    def applyEdit(self, position: int, removed: int, inserted: str):
+        """Aplica un delta (posición, caracteres eliminados, texto insertado)"""
+        if self._updating_from_backend:
+            return
+        self._queue_edit(position, removed, inserted)
+
+    def _on_contents_change(self, position: int, removed: int, added: int):
+        """Traduce contentsChange de Qt a un delta del buffer"""
+        if self._updating_from_backend:
+            return
+
+        doc_length = self._text_document.characterCount() - 1
+        # Qt puede contar el separador final de párrafo: acotar al documento
+        added = max(0, min(added, doc_length - position))
+        removed = max(0, min(removed, self._pending_length - position))
+
+        inserted = ""
+        if added:
+            cursor = QTextCursor(self._text_document)
+            cursor.setPosition(position)
+            cursor.setPosition(position + added, QTextCursor.KeepAnchor)
+            inserted = cursor.selectedText().replace("\u2029", "\n")
+
+        if removed == added and not self._needs_resync:
+            # Cambio solo de formato (resaltado): el texto sigue igual
+            self._flush_pending_edits()
+            if self._document.buffer.get_range(position, position + removed) == inserted:
+                return
+
+        self._queue_edit(position, removed, inserted)
+        if self._pending_length != doc_length:
+            self._needs_resync = True
+
+    def _queue_edit(self, position: int, removed: int, inserted: str):
+        """Encola un delta; los deltas se aplican una vez por frame"""
+        if not removed and not inserted:
+            return
+
+        if self._pending_edits and not removed:
+            # Tecleo contiguo: fusionar con el delta anterior
+            last_pos, last_removed, last_inserted = self._pending_edits[-1]
+            if position == last_pos + len(last_inserted):
+                self._pending_edits[-1] = (
+                    last_pos, last_removed, last_inserted + inserted
+                )
+                self._pending_length += len(inserted)
+                self._flush_timer.start()
+                return
 
+        self._pending_edits.append((position, removed, inserted))
+        self._pending_length += len(inserted) - removed
+        self._flush_timer.start()
+
+    def _flush_pending_edits(self):
+        """Aplica al buffer los deltas acumulados"""
+        self._flush_timer.stop()
+        if not self._pending_edits and not self._needs_resync:
+            return
+
+        edits, self._pending_edits = self._pending_edits, []
+        # Estos cambios ya están en la vista: no reflejarlos de vuelta
+        self._applying_view_edits = True
+        try:
+            if self._needs_resync:
+                # El delta de Qt no cuadra con el buffer: resincronizar una vez
+                self._needs_resync = False
+                text = self._text_document.toPlainText()
+                self._pending_length = len(text)
+                self._replace_changed_range(text)
+            else:
+                buffer = self._document.buffer
+                for position, removed, inserted in edits:
+                    buffer.replace(position, removed, inserted)
+        finally:
+            self._applying_view_edits = False
+
+    def _on_buffer_changed(self, edits):
+        """Listener del TextBuffer: marca modificado y actualiza la vista"""
+        self._highlight_model.apply_edits(edits, self._document.buffer.snapshot)
+        if not self._applying_view_edits:
+            self._sync_view(edits)
         self._document._modified = True
-        self._emit_changes()
+        self.contentsChanged.emit()
+        self.modifiedChanged.emit(True)
+
+    def _sync_view(self, edits):
+        """Refleja en el editor QML cambios del backend sin recargar todo"""
+        if self._text_document is None or len(edits) > VIEW_PATCH_LIMIT:
+            self._update_text_from_backend()
+            return
+
+        self._updating_from_backend = True
+        cursor = QTextCursor(self._text_document)
+        cursor.beginEditBlock()
+        for edit in edits:
+            cursor.setPosition(edit.position)
+            cursor.setPosition(edit.position + len(edit.deleted_text), QTextCursor.KeepAnchor)
+            cursor.insertText(edit.inserted_text)
+        cursor.endEditBlock()
+        self._updating_from_backend = False
+        self._pending_length = len(self._document.buffer)
 
     @Slot(int, str)
     def insert(self, position: int, text: str):
         """Inserta texto en posición específica"""
+        self._flush_pending_edits()
         self._document.buffer.insert(position, text)
-        self._document._modified = True
-        self._emit_changes()
 
     @Slot(int, int)
     def delete(self, position: int, length: int):
         """Elimina texto"""
+        self._flush_pending_edits()
         self._document.buffer.delete(position, length)
-        self._document._modified = True
-        self._emit_changes()
 
     @Slot()
     def undo(self):
         """Deshacer"""
+        self._flush_pending_edits()
         self._document.buffer.undo()
-        self._update_text_from_backend()
 
     @Slot()
     def redo(self):
         """Rehacer"""
+        self._flush_pending_edits()
         self._document.buffer.redo()
-        self._update_text_from_backend()
 
     @Slot(result=bool)
     def save(self) -> bool:
         """Guardar documento"""
-        success = self._document.save()
+        self._flush_pending_edits()
+        success = self._save_mapped(self._document.save)
         if success:
             self.modifiedChanged.emit(False)
+            self._emit_save_stats()
+        return success
+
+    def _save_mapped(self, save: Callable[[], bool]) -> bool:
+        """
+        Guarda un archivo grande, que al guardarse se mapea de nuevo: el
+        hilo de resaltado tiene que estar parado mientras se cambia el
+        mapeo, y después sigue con el nuevo. Si no para a tiempo, el
+        resaltado se reinicia.
+        """
+        highlights = self._highlights
+        if not self._document.large_file or highlights is None:
+            return save()
+        idle = highlights.wait_idle(SAVE_HIGHLIGHT_WAIT_SECONDS)
+        success = save()
+        if idle:
+            highlights.replace_source()
+        else:
+            self._start_highlighting()
         return success
 
     @Slot(str, result=bool)
     def saveAs(self, path: str) -> bool:
         """Guardar como"""
-        success = self._document.save_as(Path(path))
+        self._flush_pending_edits()
+        language = self._document.language
+        success = self._save_mapped(lambda: self._document.save_as(Path(path)))
         if success:
             self.modifiedChanged.emit(False)
+            self._emit_save_stats()
+        if self._document.language != language:
+            self._start_highlighting()
         return success
 
-    def _emit_changes(self):
-        """Emite señales de cambio"""
-        self.textChanged.emit()
-        self.modifiedChanged.emit(self._document.modified)
+    def _emit_save_stats(self):
+        """Informa del tamaño y la velocidad del último guardado"""
+        result = self._document.last_save
+        if result:
+            self.saveCompleted.emit(result.bytes_written, result.bytes_per_second)
 
     def _update_text_from_backend(self):
-        """Actualiza texto desde el backend (para undo/redo)"""
+        """Recarga completa de la vista desde el backend"""
         self._updating_from_backend = True
         self.textChanged.emit()
+        self.contentsChanged.emit()
+        self._updating_from_backend = False
+        self._pending_length = len(self._document.buffer)
+        if self._highlights is not None:
+            self._highlight_model.reset(self._document.buffer.snapshot())
+            self._highlights.invalidate()
+
+    # ==================== RESALTADO DE SINTAXIS ====================
+
+    @Property(QObject, constant=True)
+    def highlightModel(self) -> HighlightModel:
+        """Tokens por línea, para componentes QML (minimapa, etc.)"""
+        return self._highlight_model
+
+    def _start_highlighting(self):
+        """(Re)inicia el resaltado en segundo plano para el lenguaje actual"""
+        self.stopHighlighting()
+        self._highlight_model.reset(self._document.buffer.snapshot())
+        service = HighlightService(
+            self._document.buffer, self._document.language, self._highlightBatch.emit
+        )
+        self._highlights = service if service.available else None
+
+    @Slot()
+    def stopHighlighting(self):
+        """Detiene el hilo de resaltado (al cerrar el documento)"""
+        if self._highlights is not None:
+            self._highlights.close()
+            self._highlights = None
+
+    @Slot(int, int)
+    def setViewport(self, first_line: int, last_line: int):
+        """Líneas visibles en el editor: se resaltan antes que el resto"""
+        if self._highlights is not None:
+            self._highlights.set_viewport(first_line, last_line)
+
+    @Slot(int, int, object)
+    def _on_highlight_batch(self, version: int, first_line: int, lines: TokenLines):
+        """Guarda los tokens de una entrega y repinta esas líneas (hilo de la GUI)"""
+        if self._highlights is None:
+            return
+        # Las filas del modelo han de reflejar el buffer
+        self._flush_pending_edits()
+        if version != self._document.buffer.version:
+            # Calculada sobre un texto que ya cambió: pedirla otra vez
+            self._highlights.redeliver(version, first_line, first_line + len(lines) - 1)
+            return
+        count = self._highlight_model.set_lines(first_line, lines)
+        if self._text_document is None:
+            return
+        block = self._text_document.findBlockByNumber(first_line)
+        self._updating_from_backend = True
+        for _ in range(count):
+            if not block.isValid():
+                break
+            self._span_highlighter.rehighlightBlock(block)
+            block = block.next()
         self._updating_from_backend = False
 
-    @Slot(str, bool, bool, result="QVariantList")
-    def search(self, query: str, case_sensitive: bool, whole_word: bool):
+    @Slot(str, bool, bool, bool, result="QVariantList")
+    def search(self, query: str, case_sensitive: bool, whole_word: bool, regex: bool):
         """Busca en el documento"""
+        self._flush_pending_edits()
         text = self._document.buffer.get_text()
-        matches = self._search_engine.search(text, query, case_sensitive, whole_word)
+        self._search_key = None
+        try:
+            matches = self._search_engine.search(
+                text, query, case_sensitive, whole_word,
+                line_of=self._document.buffer.line_of, regex=regex
+            )
+        except re.error:
+            return []
 
         # Retornar lista de matches como diccionarios
-        return [{"start": m.start, "end": m.end, "line": m.line} for m in matches]
+        return [_match_dict(m) for m in matches]
+
+    @Slot(str, bool, bool, bool, result=int)
+    def searchAsync(
+        self, query: str, case_sensitive: bool, whole_word: bool, regex: bool
+    ) -> int:
+        """
+        Busca en un hilo aparte sobre un snapshot del buffer. Los resultados
+        llegan por lotes con searchResults y el total con searchFinished.
+        Cancela la búsqueda anterior; devuelve el id de la nueva.
+        """
+        self.cancelSearch()
+        self._flush_pending_edits()
+        self._search_job += 1
+        job = self._search_job
+        if not query or not _valid_query(query, case_sensitive, whole_word, regex):
+            self.searchFinished.emit(job, 0)
+            return job
+
+        cancel = self._search_cancel = Event()
+        _search_executor().submit(
+            self._run_search, job, self._document.buffer.snapshot(),
+            query, case_sensitive, whole_word, regex, cancel
+        )
+        return job
+
+    @Slot()
+    def cancelSearch(self):
+        """Cancela la búsqueda en segundo plano en curso"""
+        if self._search_cancel is not None:
+            self._search_cancel.set()
+            self._search_cancel = None
+
+    def _run_search(
+        self, job: int, snapshot: BufferSnapshot, query: str,
+        case_sensitive: bool, whole_word: bool, regex: bool, cancel: Event
+    ):
+        """Cuerpo de la búsqueda en segundo plano (hilo de trabajo)"""
+        total = 0
+        try:
+            for batch in iter_match_batches(
+                snapshot.iter_chunks(), query, case_sensitive, whole_word, cancel,
+                regex=regex
+            ):
+                total += len(batch)
+                self._searchBatch.emit(job, [_match_dict(m) for m in batch])
+        except (ValueError, OSError):
+            # El archivo mapeado se cerró a mitad de la búsqueda
+            return
+        if not cancel.is_set():
+            self._searchDone.emit(job, total)
+
+    @Slot(int, "QVariantList")
+    def _on_search_batch(self, job: int, batch):
+        # Los lotes de búsquedas ya canceladas se descartan
+        if job == self._search_job and self._search_cancel is not None:
+            self.searchResults.emit(job, batch)
+
+    @Slot(int, int)
+    def _on_search_done(self, job: int, total: int):
+        if job == self._search_job and self._search_cancel is not None:
+            self._search_cancel = None
+            self.searchFinished.emit(job, total)
+
+    @Slot(str, bool, bool, bool, result=int)
+    def startSearch(
+        self, query: str, case_sensitive: bool, whole_word: bool, regex: bool
+    ) -> int:
+        """
+        Inicia una búsqueda viva; las ediciones la mantienen al día.
+        Repetir la misma consulta reutiliza la sesión abierta.
+        """
+        self._flush_pending_edits()
+        key = (query, case_sensitive, whole_word, regex)
+        if key != self._search_key:
+            self._search_key = key
+            if not _valid_query(query, case_sensitive, whole_word, regex):
+                query = ""
+            self._search_engine.search_buffer(
+                self._document.buffer, query, case_sensitive, whole_word,
+                on_update=self.matchesChanged.emit, regex=regex
+            )
+            self.matchesChanged.emit()
+        return self._search_engine.match_count
+
+    @Slot()
+    def stopSearch(self):
+        """Cierra la búsqueda viva"""
+        self._search_engine.close_session()
+        self._search_key = None
+
+    @Property(int, notify=matchesChanged)
+    def matchCount(self) -> int:
+        return self._search_engine.match_count
+
+    @Property(int, notify=matchesChanged)
+    def currentMatch(self) -> int:
+        return self._search_engine.current_match
+
+    @Slot(int, int, result="QVariantList")
+    def matchesInRange(self, start: int, end: int):
+        """Coincidencias visibles entre start y end (p. ej. el viewport)"""
+        return [_match_dict(m) for m in self._search_engine.matches_in_range(start, end)]
 
     @Slot(int, result="QVariantMap")
     def findNext(self, current_position: int):
         """Encuentra siguiente coincidencia"""
+        self._flush_pending_edits()
         match = self._search_engine.next_match(current_position)
+        self.matchesChanged.emit()
         if match:
-            return {"start": match.start, "end": match.end, "line": match.line}
+            return _match_dict(match)
         return {}
 
     @Slot(int, result="QVariantMap")
     def findPrevious(self, current_position: int):
         """Encuentra coincidencia anterior"""
+        self._flush_pending_edits()
         match = self._search_engine.previous_match(current_position)
+        self.matchesChanged.emit()
         if match:
-            return {"start": match.start, "end": match.end, "line": match.line}
+            return _match_dict(match)
         return {}
 
     @Slot(str, result=bool)
     def replaceCurrent(self, replacement: str):
         """Reemplaza coincidencia actual"""
-        text = self._document.buffer.get_text()
-        new_text, start, end = self._search_engine.replace_current(text, replacement)
+        self._flush_pending_edits()
+        match = self._search_engine.current
+        if match is None:
+            return False
 
-        if new_text != text:
-            self.setText(new_text)
-            return True
-        return False
+        buffer = self._document.buffer
+        replacement = self._search_engine.replacement_for(buffer, match, replacement)
+        if buffer.get_range(match.start, match.end) == replacement:
+            return False
+        buffer.replace(match.start, match.end - match.start, replacement)
+        return True
 
-    @Slot(str, str, bool, bool, result=int)
+    @Slot(str, str, bool, bool, bool, result=int)
     def replaceAll(
-        self, query: str, replacement: str, case_sensitive: bool, whole_word: bool
+        self, query: str, replacement: str, case_sensitive: bool, whole_word: bool,
+        regex: bool
     ):
         """Reemplaza todas las coincidencias"""
-        text = self._document.buffer.get_text()
-        new_text, count = self._search_engine.replace_all(
-            text, query, replacement, case_sensitive, whole_word
-        )
-
-        if count > 0:
-            self.setText(new_text)
-        return count
+        self._flush_pending_edits()
+        if not _valid_query(query, case_sensitive, whole_word, regex):
+            return 0
+        # Un solo lote: un único undo (compacto) y una única notificación
+        try:
+            return self._search_engine.replace_all_in_buffer(
+                self._document.buffer, query, replacement, case_sensitive, whole_word,
+                regex=regex
+            )
+        except re.error:
+            # Referencia a un grupo que no existe
+            return 0
 
     @Slot(result=int)
     def getMatchCount(self):
@@ -175,12 +627,19 @@ class DocumentController(QObject):
     @Slot(int, result=int)
     def goToLine(self, line_number: int):
         """Va a una línea específica y retorna la posición"""
-        text = self._document.buffer.get_text()
-        lines = text.split('\n')
-        
-        if line_number < 1 or line_number > len(lines):
+        self._flush_pending_edits()
+        buffer = self._document.buffer
+        if line_number < 1 or line_number > buffer.line_count:
             return 0
-        
-        # Calcular posición del inicio de la línea
-        position = sum(len(lines[i]) + 1 for i in range(line_number - 1))
-        return position
+        return buffer.line_to_offset(line_number - 1)
+
+    @Slot(int, result="QVariantMap")
+    def lineColumnAt(self, position: int):
+        """Línea y columna (1-based) de una posición del cursor"""
+        self._flush_pending_edits()
+        line, column = self._document.buffer.offset_to_line_col(position)
+        return {"line": line + 1, "column": column + 1}
+
+    @Property(int, notify=contentsChanged)
+    def lineCount(self) -> int:
+        return self._document.buffer.line_count
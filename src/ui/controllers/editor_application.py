@@ -1,16 +1,43 @@
-from typing import List, Optional
+import re
+import threading
+import time
+from typing import List, Optional, Set
 from pathlib import Path
-from PySide6.QtCore import QObject, Slot, Signal, Property
+from PySide6.QtCore import QFileSystemWatcher, QObject, QTimer, Slot, Signal, Property
 
 from core.models.document import Document
 from core.models.file_tree import FileTree
+from core.models.search_engine import SearchPattern, compile_query
+from core.models.trigram_index import TrigramIndex
+from core.models.workspace_search import WorkspaceSearch, replace_in_files
 from ui.controllers.document_controller import DocumentController
 
+# Índice de trigramas para acotar "buscar en archivos"
+TRIGRAM_INDEX_ENABLED = True
+# Tras una búsqueda, el índice se resincroniza entero (en segundo plano)
+# si la última sincronización completa es más antigua que esto: recoge lo
+# que no avisa el sistema de archivos (p. ej. escrituras sin renombrar)
+INDEX_REFRESH_SECONDS = 30
+# Espera tras un aviso de cambios antes de reindexar sus carpetas
+FOLDER_REFRESH_DELAY_MS = 300
+# Carpetas vigiladas como máximo (cada una consume un recurso del sistema)
+MAX_WATCHED_FOLDERS = 8192
+
 class EditorApplication(QObject):
     documentsChanged = Signal()
     currentDocumentChanged = Signal()
     fileTreeChanged = Signal()  # NUEVO
     workspaceFolderChanged = Signal()  # NUEVO
+    findInFilesResults = Signal(int, "QVariantList")  # id de búsqueda, resultados por archivo
+    findInFilesFinished = Signal(int, int, int)  # id de búsqueda, archivos, coincidencias
+    replaceInFilesProgress = Signal(int, int, int)  # id, archivos hechos, total
+    replaceInFilesFinished = Signal(int, int, int)  # id, archivos, reemplazos
+    # Desde los hilos de trabajo; llegan encolados al hilo de la GUI
+    _findInFilesBatch = Signal(int, "QVariantList")
+    _findInFilesDone = Signal(int, int, int)
+    _replaceInFilesStep = Signal(int, int, int)
+    _replaceInFilesDone = Signal(int, int, int)
+    _indexFoldersChanged = Signal()
     
     def __init__(self):
         super().__init__()
@@ -18,6 +45,25 @@ class EditorApplication(QObject):
         self._current: Optional[DocumentController] = None
         self._file_tree = FileTree()  # NUEVO
         self._workspace_folder: Optional[Path] = None  # NUEVO
+        self._workspace_search: Optional[WorkspaceSearch] = None
+        self._workspace_search_job = 0
+        self._trigram_index: Optional[TrigramIndex] = None
+        self._index_ready = False
+        self._findInFilesBatch.connect(self._on_find_in_files_batch)
+        self._findInFilesDone.connect(self._on_find_in_files_done)
+        self._replace_job = 0
+        self._replace_cancel: Optional[threading.Event] = None
+        self._replaceInFilesStep.connect(self._on_replace_in_files_step)
+        self._replaceInFilesDone.connect(self._on_replace_in_files_done)
+        # Avisos de cambios en las carpetas del índice
+        self._folder_watcher = QFileSystemWatcher(self)
+        self._folder_watcher.directoryChanged.connect(self._on_folder_changed)
+        self._changed_folders: Set[str] = set()
+        self._folder_timer = QTimer(self)
+        self._folder_timer.setSingleShot(True)
+        self._folder_timer.setInterval(FOLDER_REFRESH_DELAY_MS)
+        self._folder_timer.timeout.connect(self._refresh_changed_folders)
+        self._indexFoldersChanged.connect(self._watch_index_folders)
     
     # ==================== NUEVO: GESTIÓN DE WORKSPACE ====================
     
@@ -29,8 +75,10 @@ class EditorApplication(QObject):
             print(f"Invalid folder: {folder_path}")
             return
         
+        self.cancelFindInFiles()
         self._workspace_folder = path
         self._file_tree.load_directory(path)
+        self._open_index(path)
         
         self.workspaceFolderChanged.emit()
         self.fileTreeChanged.emit()
@@ -41,6 +89,12 @@ class EditorApplication(QObject):
         if self._file_tree.toggle_node(node_path):
             self.fileTreeChanged.emit()
     
+    @Slot(str)
+    def loadMoreFileTreeNode(self, node_path: str):
+        """Muestra la siguiente página de una carpeta grande"""
+        if self._file_tree.load_more(node_path):
+            self.fileTreeChanged.emit()
+    
     @Slot()
     def refreshFileTree(self):
         """Refresca el árbol de archivos"""
@@ -64,6 +118,259 @@ class EditorApplication(QObject):
             return self._workspace_folder.name
         return "No Folder Open"
     
+    # ==================== BUSCAR EN ARCHIVOS ====================
+    
+    @Slot(str, bool, bool, bool, result=int)
+    def findInFiles(
+        self, query: str, case_sensitive: bool, whole_word: bool, regex: bool
+    ) -> int:
+        """
+        Busca en todos los archivos del workspace en segundo plano. Los
+        resultados llegan por archivo con findInFilesResults. Cancela la
+        búsqueda anterior; devuelve el id de la nueva.
+        """
+        return self._start_find_in_files(query, case_sensitive, whole_word, regex, None)
+    
+    @Slot(str, str, bool, bool, bool, result=int)
+    def previewReplaceInFiles(
+        self, query: str, replacement: str, case_sensitive: bool, whole_word: bool,
+        regex: bool
+    ) -> int:
+        """Como findInFiles, con la vista previa de cada línea ya reemplazada"""
+        return self._start_find_in_files(query, case_sensitive, whole_word, regex, replacement)
+    
+    def _start_find_in_files(
+        self, query: str, case_sensitive: bool, whole_word: bool, regex: bool,
+        replacement: Optional[str]
+    ) -> int:
+        self.cancelFindInFiles()
+        self._workspace_search_job += 1
+        job = self._workspace_search_job
+        try:
+            pattern = compile_query(query, case_sensitive, whole_word, regex)
+        except re.error:
+            pattern = None
+        if not query or pattern is None or not self._workspace_folder:
+            self.findInFilesFinished.emit(job, 0, 0)
+            return job
+        
+        index = self._trigram_index if self._index_ready else None
+        search = WorkspaceSearch(
+            self._workspace_folder, query, case_sensitive, whole_word, index=index, regex=regex
+        )
+        self._workspace_search = search
+        threading.Thread(
+            target=self._run_find_in_files, args=(job, search, replacement, pattern),
+            name='find-in-files', daemon=True
+        ).start()
+        return job
+    
+    @Slot()
+    def cancelFindInFiles(self):
+        """Cancela la búsqueda en archivos en curso"""
+        if self._workspace_search is not None:
+            self._workspace_search.cancel()
+            self._workspace_search = None
+    
+    def _run_find_in_files(
+        self, job: int, search: WorkspaceSearch, replacement: Optional[str],
+        pattern: SearchPattern
+    ):
+        """Cuerpo de la búsqueda en archivos (hilo de trabajo)"""
+        matches = 0
+        files = 0
+        try:
+            for result in search.run():
+                files += 1
+                matches += len(result.matches)
+                self._findInFilesBatch.emit(job, [result.to_dict(replacement, pattern)])
+        except Exception as e:
+            print(f"Error searching {search.root}: {e}")
+        if not search.cancelled:
+            self._findInFilesDone.emit(job, files, matches)
+        
+        # Recoger cambios sin aviso para la próxima búsqueda
+        index = search.index
+        if index is not None and time.monotonic() - index.last_update > INDEX_REFRESH_SECONDS:
+            self._update_index(index)
+    
+    @Slot(int, "QVariantList")
+    def _on_find_in_files_batch(self, job: int, results):
+        # Los resultados de búsquedas ya canceladas se descartan
+        if job == self._workspace_search_job and self._workspace_search is not None:
+            self.findInFilesResults.emit(job, results)
+    
+    @Slot(int, int, int)
+    def _on_find_in_files_done(self, job: int, files: int, matches: int):
+        if job == self._workspace_search_job and self._workspace_search is not None:
+            self._workspace_search = None
+            self.findInFilesFinished.emit(job, files, matches)
+    
+    @Slot(str, str, bool, bool, bool, "QVariantList", result=int)
+    def replaceInFiles(
+        self, query: str, replacement: str, case_sensitive: bool, whole_word: bool,
+        regex: bool, paths
+    ) -> int:
+        """
+        Reemplaza en los archivos indicados (los de la vista previa). Los
+        abiertos en el editor se editan en su buffer (quedan sin guardar);
+        el resto se reescribe en disco en segundo plano, informando del
+        progreso con replaceInFilesProgress.
+        """
+        self.cancelReplaceInFiles()
+        self._replace_job += 1
+        job = self._replace_job
+        
+        open_documents = {
+            str(ctrl._document.file_path): ctrl
+            for ctrl in self._documents if ctrl._document.file_path
+        }
+        files = 0
+        replacements = 0
+        on_disk = []
+        for path in paths:
+            ctrl = open_documents.get(str(path))
+            if ctrl is None:
+                on_disk.append(str(path))
+                continue
+            count = ctrl.replaceAll(query, replacement, case_sensitive, whole_word, regex)
+            if count:
+                files += 1
+                replacements += count
+        
+        cancel = self._replace_cancel = threading.Event()
+        threading.Thread(
+            target=self._run_replace_in_files,
+            args=(job, on_disk, query, replacement, case_sensitive, whole_word, regex,
+                  cancel, files, replacements),
+            name='replace-in-files', daemon=True
+        ).start()
+        return job
+    
+    @Slot()
+    def cancelReplaceInFiles(self):
+        """Detiene el reemplazo en archivos en curso (tras el archivo actual)"""
+        if self._replace_cancel is not None:
+            self._replace_cancel.set()
+            self._replace_cancel = None
+    
+    def _run_replace_in_files(
+        self, job: int, paths: List[str], query: str, replacement: str,
+        case_sensitive: bool, whole_word: bool, regex: bool, cancel: threading.Event,
+        files: int, replacements: int
+    ):
+        """Cuerpo del reemplazo en archivos (hilo de trabajo)"""
+        try:
+            changed, count = replace_in_files(
+                paths, query, replacement, case_sensitive, whole_word,
+                progress=lambda done, total: self._replaceInFilesStep.emit(job, done, total),
+                cancel=cancel, regex=regex
+            )
+        except re.error:
+            changed, count = 0, 0
+        self._replaceInFilesDone.emit(job, files + changed, replacements + count)
+        
+        index = self._trigram_index
+        if index is not None and paths and index.root == self._workspace_folder:
+            self._update_index(index, paths)
+    
+    @Slot(int, int, int)
+    def _on_replace_in_files_step(self, job: int, done: int, total: int):
+        if job == self._replace_job:
+            self.replaceInFilesProgress.emit(job, done, total)
+    
+    @Slot(int, int, int)
+    def _on_replace_in_files_done(self, job: int, files: int, replacements: int):
+        if job == self._replace_job:
+            self._replace_cancel = None
+            self.replaceInFilesFinished.emit(job, files, replacements)
+    
+    # ==================== ÍNDICE DE TRIGRAMAS ====================
+    
+    def _open_index(self, folder: Path):
+        """Abre el índice del workspace y lo sincroniza en segundo plano"""
+        if self._trigram_index is not None:
+            self._trigram_index.close()
+        self._trigram_index = None
+        self._index_ready = False
+        watched = self._folder_watcher.directories()
+        if watched:
+            self._folder_watcher.removePaths(watched)
+        self._changed_folders.clear()
+        if not TRIGRAM_INDEX_ENABLED:
+            return
+        try:
+            self._trigram_index = TrigramIndex(folder)
+        except Exception as e:
+            print(f"Error opening index for {folder}: {e}")
+            return
+        threading.Thread(
+            target=self._update_index, args=(self._trigram_index,),
+            name='trigram-index', daemon=True
+        ).start()
+    
+    def _update_index(self, index: TrigramIndex, paths: Optional[List[str]] = None):
+        """Sincroniza el índice con el disco (hilo de trabajo)"""
+        try:
+            index.update(paths)
+        except Exception as e:
+            print(f"Error updating index for {index.root}: {e}")
+            return
+        if index is self._trigram_index:
+            self._index_ready = True
+            self._indexFoldersChanged.emit()
+    
+    @Slot()
+    def _watch_index_folders(self):
+        """Vigila las carpetas que recorrió el índice"""
+        index = self._trigram_index
+        if index is None:
+            return
+        watched = set(self._folder_watcher.directories())
+        room = MAX_WATCHED_FOLDERS - len(watched)
+        folders = [folder for folder in index.folders if folder not in watched][:max(room, 0)]
+        if folders:
+            # Las que no se pueden vigilar quedan para la sincronización completa
+            self._folder_watcher.addPaths(folders)
+    
+    @Slot(str)
+    def _on_folder_changed(self, folder: str):
+        """Cambios en una carpeta vigilada: se reindexa al cabo de un momento"""
+        self._changed_folders.add(folder)
+        self._folder_timer.start()
+    
+    @Slot()
+    def _refresh_changed_folders(self):
+        index = self._trigram_index
+        folders, self._changed_folders = sorted(self._changed_folders), set()
+        if index is None or not folders:
+            return
+        threading.Thread(
+            target=self._refresh_index_folders, args=(index, folders),
+            name='trigram-index', daemon=True
+        ).start()
+    
+    def _refresh_index_folders(self, index: TrigramIndex, folders: List[str]):
+        """Reindexa los archivos de unas carpetas (hilo de trabajo)"""
+        try:
+            index.refresh_folders(folders)
+        except Exception as e:
+            print(f"Error updating index for {index.root}: {e}")
+            return
+        if index is self._trigram_index:
+            self._indexFoldersChanged.emit()
+    
+    def _on_document_saved(self, controller: DocumentController):
+        """Reindexa un archivo guardado dentro del workspace"""
+        index = self._trigram_index
+        path = controller._document.file_path
+        if index is None or path is None or not path.is_relative_to(index.root):
+            return
+        threading.Thread(
+            target=self._update_index, args=(index, [str(path)]),
+            name='trigram-index', daemon=True
+        ).start()
+    
     # ==================== MÉTODOS EXISTENTES ====================
     
     @Slot(str)
@@ -88,6 +395,7 @@ class EditorApplication(QObject):
         # Crear nuevo documento
         doc = Document(path)
         ctrl = DocumentController(doc)
+        ctrl.saveCompleted.connect(lambda *_: self._on_document_saved(ctrl))
         self._documents.append(ctrl)
         self._current = ctrl
         
@@ -99,6 +407,7 @@ class EditorApplication(QObject):
         """Crea documento nuevo"""
         doc = Document()
         ctrl = DocumentController(doc)
+        ctrl.saveCompleted.connect(lambda *_: self._on_document_saved(ctrl))
         self._documents.append(ctrl)
         self._current = ctrl
         
@@ -110,6 +419,11 @@ class EditorApplication(QObject):
         """Cierra un documento"""
         if controller in self._documents:
             idx = self._documents.index(controller)
+            controller.detachTextDocument()
+            controller.cancelSearch()
+            controller.stopSearch()
+            controller.stopHighlighting()
+            controller._document.close()
             self._documents.remove(controller)
             
             if self._current == controller:
@@ -0,0 +1,97 @@
+from typing import Callable, Dict, Iterator, List, Tuple
+from PySide6.QtCore import QAbstractListModel, QByteArray, QModelIndex, Qt
+from core.buffer.base import BufferSnapshot
+from core.buffer.line_index import LineIndex
+from core.syntax.highlighter import TOKEN_TYPES
+from core.syntax.token_store import TokenLines, TokenStore
+
+
+# Por encima de este número de ediciones se vacían todos los tokens
+MODEL_PATCH_LIMIT = 500
+
+
+class HighlightModel(QAbstractListModel):
+    """
+    Tokens de resaltado del documento, una fila por línea, guardados en un
+    TokenStore (arrays compactos). Sigue las ediciones del buffer moviendo
+    filas, así que las líneas que no cambian conservan sus tokens hasta que
+    el HighlightService entregue los nuevos.
+    """
+
+    SpansRole = Qt.UserRole + 1
+    TypesRole = Qt.UserRole + 2
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._store = TokenStore()
+        # Longitudes de línea del texto al que corresponden las filas
+        self._lines = LineIndex()
+
+    def roleNames(self) -> Dict[int, QByteArray]:
+        return {
+            self.SpansRole: QByteArray(b"spans"),
+            self.TypesRole: QByteArray(b"types"),
+        }
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return self._store.line_count
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == self.SpansRole:
+            # Plano para QML: [inicio, fin, id de tipo, ...]
+            return [value for span in self._store.spans(index.row()) for value in span]
+        if role == self.TypesRole:
+            return [TOKEN_TYPES[type_id].value for _, _, type_id in self._store.spans(index.row())]
+        return None
+
+    def spans(self, line: int) -> Iterator[Tuple[int, int, int]]:
+        """Tokens de una línea: (columna inicial, columna final, id de tipo)"""
+        return self._store.spans(line)
+
+    @property
+    def nbytes(self) -> int:
+        return self._store.nbytes
+
+    def reset(self, snapshot: BufferSnapshot):
+        """Vacía los tokens y toma las líneas de snapshot"""
+        self.beginResetModel()
+        self._lines = LineIndex.from_chunks(snapshot.iter_chunks())
+        self._store.reset(self._lines.line_count)
+        self.endResetModel()
+
+    def apply_edits(self, edits: List, snapshot: Callable[[], BufferSnapshot]):
+        """Mueve las filas según un lote de ediciones del buffer"""
+        if len(edits) > MODEL_PATCH_LIMIT:
+            self.reset(snapshot())
+            return
+        for edit in edits:
+            row = self._lines.offset_to_line_col(edit.position)[0]
+            removed = edit.deleted_text.count('\n')
+            added = edit.inserted_text.count('\n')
+            self._lines.delete(edit.position, len(edit.deleted_text))
+            self._lines.insert(edit.position, edit.inserted_text)
+            # La fila editada conserva sus tokens hasta la próxima entrega
+            if removed:
+                self.beginRemoveRows(QModelIndex(), row + 1, row + removed)
+                self._store.splice(row + 1, removed, TokenLines.empty(0))
+                self.endRemoveRows()
+            if added:
+                self.beginInsertRows(QModelIndex(), row + 1, row + added)
+                self._store.splice(row + 1, 0, TokenLines.empty(added))
+                self.endInsertRows()
+
+    def set_lines(self, first_line: int, lines: TokenLines) -> int:
+        """Guarda los tokens de una entrega; devuelve cuántas filas cambiaron"""
+        count = min(len(lines), self._store.line_count - first_line)
+        if count <= 0:
+            return 0
+        self._store.set_lines(first_line, lines)
+        self.dataChanged.emit(
+            self.index(first_line), self.index(first_line + count - 1),
+            [self.SpansRole, self.TypesRole]
+        )
+        return count
@@ -7,6 +7,7 @@ RowLayout {
     spacing: 0
     
     property var currentDocument: null
+    property var attachedDocument: null
     property int lineNumber: 1
     property int columnNumber: 1
     property int cursorPosition: textEditor.cursorPosition
@@ -22,6 +23,56 @@ RowLayout {
         textEditor.cursorPosition = position
     }
     
+    // Carga el texto del documento y engancha la sincronización por deltas
+    function bindDocument() {
+        if (attachedDocument) {
+            attachedDocument.detachTextDocument()
+        }
+        attachedDocument = currentDocument
+        reloadText()
+        if (currentDocument) {
+            currentDocument.attachTextDocument(textEditor.textDocument)
+            updateViewport()
+        }
+    }
+    
+    // Líneas visibles: el resaltado en segundo plano las atiende primero
+    function updateViewport() {
+        if (!currentDocument) {
+            return
+        }
+        var lineHeight = Math.max(1, editorMetrics.lineSpacing)
+        var contentY = editorScroll.contentItem.contentY - textEditor.topPadding
+        var first = Math.max(0, Math.floor(contentY / lineHeight))
+        currentDocument.setViewport(first, first + Math.ceil(editorScroll.height / lineHeight))
+    }
+    
+    FontMetrics {
+        id: editorMetrics
+        font: textEditor.font
+    }
+    
+    // Recarga completa (undo/redo, reemplazos desde el backend)
+    function reloadText() {
+        var position = textEditor.cursorPosition
+        textEditor.internalChange = true
+        textEditor.text = currentDocument ? currentDocument.text : ""
+        textEditor.internalChange = false
+        textEditor.cursorPosition = Math.min(position, textEditor.length)
+    }
+    
+    onCurrentDocumentChanged: bindDocument()
+    Component.onCompleted: bindDocument()
+    
+    Connections {
+        target: currentDocument
+        ignoreUnknownSignals: true
+        
+        function onTextChanged() {
+            editorArea.reloadText()
+        }
+    }
+    
     // Line Numbers
     ScrollView {
         id: lineNumberScroll
@@ -48,15 +99,18 @@ RowLayout {
             property int lineCount: 1
             
             function updateLineNumbers() {
-                var text = textEditor.text
-                var lines = text.split('\n').length
-                lineCount = Math.max(1, lines)
+                // lineCount del editor evita copiar y partir todo el texto
+                var lines = Math.max(1, textEditor.lineCount)
+                if (lines === lineCount && lineNumbers.text.length > 0) {
+                    return
+                }
+                lineCount = lines
                 
-                var numbers = ""
+                var numbers = []
                 for (var i = 1; i <= lineCount; i++) {
-                    numbers += i + "\n"
+                    numbers.push(i)
                 }
-                lineNumbers.text = numbers
+                lineNumbers.text = numbers.join("\n") + "\n"
             }
             
             Component.onCompleted: {
@@ -81,11 +135,13 @@ RowLayout {
         
         ScrollBar.vertical.onPositionChanged: {
             lineNumberScroll.ScrollBar.vertical.position = ScrollBar.vertical.position
+            editorArea.updateViewport()
         }
         
+        onHeightChanged: editorArea.updateViewport()
+        
         TextArea {
             id: textEditor
-            text: currentDocument ? currentDocument.text : ""
             font.family: "Consolas"
             font.pixelSize: 13
             color: "#ABB2BF"
@@ -123,29 +179,42 @@ RowLayout {
                 }
             }
             
+            // Los cambios del usuario llegan al backend como deltas
+            // (contentsChange del textDocument), no como texto completo
             property bool internalChange: false
             
             onTextChanged: {
-                if (!internalChange && currentDocument) {
-                    currentDocument.setText(text)
-                }
-                
                 lineNumbers.updateLineNumbers()
-                updateCursorInfo()
+                cursorInfoTimer.restartIfIdle()
             }
             
             onCursorPositionChanged: {
-                updateCursorInfo()
+                cursorInfoTimer.restartIfIdle()
             }
             
-            function updateCursorInfo() {
-                var text = textEditor.text
-                var cursorPos = textEditor.cursorPosition
-                var textBeforeCursor = text.substring(0, cursorPos)
-                var lines = textBeforeCursor.split('\n')
+            // Línea/columna se resuelven en el backend (índice de líneas),
+            // como mucho una vez por frame
+            Timer {
+                id: cursorInfoTimer
+                interval: 16
                 
-                editorArea.lineNumber = lines.length
-                editorArea.columnNumber = lines[lines.length - 1].length + 1
+                function restartIfIdle() {
+                    if (!running) start()
+                }
+                
+                onTriggered: textEditor.updateCursorInfo()
+            }
+            
+            function updateCursorInfo() {
+                if (!currentDocument) {
+                    editorArea.lineNumber = 1
+                    editorArea.columnNumber = 1
+                    editorArea.cursorPositionChanged()
+                    return
+                }
+                var info = currentDocument.lineColumnAt(textEditor.cursorPosition)
+                editorArea.lineNumber = info.line
+                editorArea.columnNumber = info.column
                 editorArea.cursorPositionChanged()
             }
         }
@@ -13,6 +13,9 @@ Popup {
     z: 101
     
     property string searchText: findInput.text
+    property int matchCount: 0
+    property int currentMatch: 0
+    property bool useRegex: false
     
     background: Rectangle {
         color: "#282C34"
@@ -25,12 +28,41 @@ Popup {
         anchors.margins: 16
         spacing: 12
         
-        Text {
-            text: "Find"
-            color: "#ABB2BF"
-            font.family: "Consolas"
-            font.pixelSize: 13
-            font.bold: true
+        RowLayout {
+            Layout.fillWidth: true
+            
+            Text {
+                text: "Find"
+                color: "#ABB2BF"
+                font.family: "Consolas"
+                font.pixelSize: 13
+                font.bold: true
+            }
+            
+            Item { Layout.fillWidth: true }
+            
+            // Interpretar la consulta como expresión regular
+            Rectangle {
+                width: 28
+                height: 20
+                color: findModal.useRegex ? "#3E4451" : "transparent"
+                border.color: findModal.useRegex ? "#528BFF" : "#3E4451"
+                border.width: 1
+                
+                Text {
+                    anchors.centerIn: parent
+                    text: ".*"
+                    color: findModal.useRegex ? "#ABB2BF" : "#5C6370"
+                    font.family: "Consolas"
+                    font.pixelSize: 12
+                }
+                
+                MouseArea {
+                    anchors.fill: parent
+                    cursorShape: Qt.PointingHandCursor
+                    onClicked: findModal.useRegex = !findModal.useRegex
+                }
+            }
         }
         
         TextField {
@@ -97,6 +129,15 @@ Popup {
             }
             
             Item { Layout.fillWidth: true }
+            
+            Text {
+                text: findModal.searchText === "" ? "" :
+                      (findModal.matchCount === 0 ? "No results" :
+                       findModal.currentMatch + " of " + findModal.matchCount)
+                color: "#5C6370"
+                font.family: "Consolas"
+                font.pixelSize: 12
+            }
         }
     }
     
@@ -14,6 +14,7 @@ Popup {
     
     property string searchText: replaceFindInput.text
     property string replaceText: replaceWithInput.text
+    property bool useRegex: false
     
     background: Rectangle {
         color: "#282C34"
@@ -26,12 +27,41 @@ Popup {
         anchors.margins: 16
         spacing: 12
         
-        Text {
-            text: "Replace"
-            color: "#ABB2BF"
-            font.family: "Consolas"
-            font.pixelSize: 13
-            font.bold: true
+        RowLayout {
+            Layout.fillWidth: true
+            
+            Text {
+                text: "Replace"
+                color: "#ABB2BF"
+                font.family: "Consolas"
+                font.pixelSize: 13
+                font.bold: true
+            }
+            
+            Item { Layout.fillWidth: true }
+            
+            // Interpretar la consulta como expresión regular
+            Rectangle {
+                width: 28
+                height: 20
+                color: replaceModal.useRegex ? "#3E4451" : "transparent"
+                border.color: replaceModal.useRegex ? "#528BFF" : "#3E4451"
+                border.width: 1
+                
+                Text {
+                    anchors.centerIn: parent
+                    text: ".*"
+                    color: replaceModal.useRegex ? "#ABB2BF" : "#5C6370"
+                    font.family: "Consolas"
+                    font.pixelSize: 12
+                }
+                
+                MouseArea {
+                    anchors.fill: parent
+                    cursorShape: Qt.PointingHandCursor
+                    onClicked: replaceModal.useRegex = !replaceModal.useRegex
+                }
+            }
         }
         
         TextField {
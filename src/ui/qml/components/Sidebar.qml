@@ -10,6 +10,75 @@ Rectangle {
     z: 10
     
     signal openFolderRequested()
+    signal openMatchRequested(string path, int line, int column, int length)
+    
+    property bool searchMode: false
+    property int searchJob: -1
+    property string searchStatus: ""
+    property string searchQuery: ""
+    property int replaceJob: -1
+    property var resultPaths: []
+    property bool useRegex: false
+    
+    function startFindInFiles(query) {
+        searchResults.clear()
+        searchQuery = query
+        resultPaths = []
+        searchStatus = query === "" ? "" : "Searching..."
+        var replacement = replaceInFilesInput.text
+        searchJob = replacement === "" ? editor.findInFiles(query, false, false, useRegex)
+                                       : editor.previewReplaceInFiles(query, replacement, false,
+                                                                      false, useRegex)
+    }
+    
+    function startReplaceInFiles() {
+        if (searchQuery === "" || resultPaths.length === 0) return
+        searchStatus = "Replacing..."
+        replaceJob = editor.replaceInFiles(searchQuery, replaceInFilesInput.text,
+                                           false, false, useRegex, resultPaths)
+    }
+    
+    Connections {
+        target: editor
+        
+        function onFindInFilesResults(job, results) {
+            if (job !== sidebar.searchJob) return
+            for (var i = 0; i < results.length; i++) {
+                var file = results[i]
+                sidebar.resultPaths = sidebar.resultPaths.concat([file.path])
+                searchResults.append({ isFile: true, path: file.path, text: file.name,
+                                       line: 0, column: 0, length: 0 })
+                for (var j = 0; j < file.matches.length; j++) {
+                    var m = file.matches[j]
+                    searchResults.append({ isFile: false, path: file.path,
+                                           text: (m.line + 1) + ": " + (m.replaced !== undefined
+                                                 ? m.replaced : m.preview).trim(),
+                                           line: m.line, column: m.column, length: m.length })
+                }
+            }
+        }
+        
+        function onFindInFilesFinished(job, files, matches) {
+            if (job !== sidebar.searchJob) return
+            sidebar.searchStatus = matches + " results in " + files + " files"
+        }
+        
+        function onReplaceInFilesProgress(job, done, total) {
+            if (job !== sidebar.replaceJob) return
+            sidebar.searchStatus = "Replacing... " + done + "/" + total + " files"
+        }
+        
+        function onReplaceInFilesFinished(job, files, replacements) {
+            if (job !== sidebar.replaceJob) return
+            sidebar.searchStatus = "Replaced " + replacements + " occurrences in " + files + " files"
+            searchResults.clear()
+            sidebar.resultPaths = []
+        }
+    }
+    
+    ListModel {
+        id: searchResults
+    }
     
     // Border
     Rectangle {
@@ -52,6 +121,36 @@ Rectangle {
                     elide: Text.ElideRight
                 }
                 
+                Rectangle {
+                    width: 24
+                    height: 24
+                    radius: 2
+                    color: sidebar.searchMode ? "#3E4451" :
+                           (searchToggleMouseArea.containsMouse ? "#2C313A" : "transparent")
+                    visible: editor.workspaceFolder !== ""
+                    
+                    Text {
+                        text: "🔍"
+                        color: "#ABB2BF"
+                        font.pixelSize: 12
+                        anchors.centerIn: parent
+                    }
+                    
+                    MouseArea {
+                        id: searchToggleMouseArea
+                        anchors.fill: parent
+                        hoverEnabled: true
+                        cursorShape: Qt.PointingHandCursor
+                        onClicked: {
+                            sidebar.searchMode = !sidebar.searchMode
+                            if (sidebar.searchMode)
+                                findInFilesInput.forceActiveFocus()
+                            else
+                                editor.cancelFindInFiles()
+                        }
+                    }
+                }
+                
                 Rectangle {
                     width: 24
                     height: 24
@@ -76,11 +175,146 @@ Rectangle {
             }
         }
         
+        // Find in files
+        ColumnLayout {
+            Layout.fillWidth: true
+            Layout.fillHeight: true
+            Layout.margins: 8
+            visible: editor.workspaceFolder !== "" && sidebar.searchMode
+            spacing: 6
+            
+            RowLayout {
+                Layout.fillWidth: true
+                spacing: 4
+                
+                TextField {
+                    id: findInFilesInput
+                    Layout.fillWidth: true
+                    placeholderText: "Find in files..."
+                    color: "#ABB2BF"
+                    font.family: "Consolas"
+                    font.pixelSize: 12
+                    
+                    background: Rectangle {
+                        color: "#1B1D23"
+                        border.color: findInFilesInput.activeFocus ? "#528BFF" : "#181A1F"
+                        border.width: 1
+                    }
+                    
+                    onAccepted: sidebar.startFindInFiles(text)
+                }
+                
+                // Interpretar la consulta como expresión regular
+                Rectangle {
+                    width: 28
+                    height: 24
+                    color: sidebar.useRegex ? "#3E4451" : "transparent"
+                    border.color: sidebar.useRegex ? "#528BFF" : "#3E4451"
+                    border.width: 1
+                    
+                    Text {
+                        anchors.centerIn: parent
+                        text: ".*"
+                        color: sidebar.useRegex ? "#ABB2BF" : "#5C6370"
+                        font.family: "Consolas"
+                        font.pixelSize: 12
+                    }
+                    
+                    MouseArea {
+                        anchors.fill: parent
+                        cursorShape: Qt.PointingHandCursor
+                        onClicked: {
+                            sidebar.useRegex = !sidebar.useRegex
+                            sidebar.startFindInFiles(findInFilesInput.text)
+                        }
+                    }
+                }
+            }
+            
+            RowLayout {
+                Layout.fillWidth: true
+                spacing: 4
+                
+                TextField {
+                    id: replaceInFilesInput
+                    Layout.fillWidth: true
+                    placeholderText: "Replace..."
+                    color: "#ABB2BF"
+                    font.family: "Consolas"
+                    font.pixelSize: 12
+                    
+                    background: Rectangle {
+                        color: "#1B1D23"
+                        border.color: replaceInFilesInput.activeFocus ? "#528BFF" : "#181A1F"
+                        border.width: 1
+                    }
+                    
+                    // Vista previa con el reemplazo aplicado
+                    onAccepted: sidebar.startFindInFiles(findInFilesInput.text)
+                }
+                
+                Button {
+                    text: "Replace All"
+                    font.pixelSize: 11
+                    enabled: sidebar.resultPaths.length > 0
+                    onClicked: sidebar.startReplaceInFiles()
+                }
+            }
+            
+            Text {
+                text: sidebar.searchStatus
+                color: "#5C6370"
+                font.family: "Consolas"
+                font.pixelSize: 11
+                visible: text !== ""
+            }
+            
+            ListView {
+                id: searchResultsView
+                Layout.fillWidth: true
+                Layout.fillHeight: true
+                model: searchResults
+                clip: true
+                
+                ScrollBar.vertical: ScrollBar {
+                    policy: ScrollBar.AsNeeded
+                    width: 10
+                }
+                
+                delegate: Rectangle {
+                    width: searchResultsView.width
+                    height: 22
+                    color: resultMouseArea.containsMouse ? "#2C313A" : "transparent"
+                    
+                    Text {
+                        anchors.fill: parent
+                        anchors.leftMargin: model.isFile ? 4 : 16
+                        verticalAlignment: Text.AlignVCenter
+                        text: model.text
+                        color: model.isFile ? "#ABB2BF" : "#7F848E"
+                        font.family: "Consolas"
+                        font.pixelSize: 12
+                        font.bold: model.isFile
+                        elide: Text.ElideRight
+                    }
+                    
+                    MouseArea {
+                        id: resultMouseArea
+                        anchors.fill: parent
+                        hoverEnabled: true
+                        cursorShape: Qt.PointingHandCursor
+                        onClicked: sidebar.openMatchRequested(model.path, model.line,
+                                                              model.column, model.length)
+                    }
+                }
+            }
+        }
+        
         // File tree
         ScrollView {
             Layout.fillWidth: true
             Layout.fillHeight: true
-            visible: editor.workspaceFolder !== ""
+            visible: editor.workspaceFolder !== "" && !sidebar.searchMode
             clip: true
             
             ScrollBar.vertical: ScrollBar {
@@ -106,6 +340,9 @@ Rectangle {
                         
                         Text {
                             text: {
+                                if (modelData.isMore) {
+                                    return "…"
+                                }
                                 if (modelData.isFolder) {
                                     return modelData.expanded ? "▼" : "▶"
                                 } else {
@@ -127,7 +364,7 @@ Rectangle {
                         
                         Text {
                             text: modelData.name
-                            color: modelData.isFolder ? "#ABB2BF" : "#ABB2BF"
+                            color: modelData.isMore ? "#5C6370" : "#ABB2BF"
                             font.family: "Consolas"
                             font.pixelSize: 12
                             Layout.fillWidth: true
@@ -142,7 +379,9 @@ Rectangle {
                         cursorShape: Qt.PointingHandCursor
                         
                         onClicked: {
-                            if (modelData.isFolder) {
+                            if (modelData.isMore) {
+                                editor.loadMoreFileTreeNode(modelData.path)
+                            } else if (modelData.isFolder) {
                                 editor.toggleFileTreeNode(modelData.path)
                             } else {
                                 editor.openDocument(modelData.path)
@@ -9,11 +9,40 @@ Rectangle {
     
     property var currentDocument: null
     property string cursorText: "Ln 1, Col 1"
+    property string message: ""
     
     function updateCursorPosition(line, col) {
         cursorText = "Ln " + line + ", Col " + col
     }
     
+    function formatBytes(bytes) {
+        if (bytes >= 1024 * 1024) return (bytes / (1024 * 1024)).toFixed(1) + " MB"
+        if (bytes >= 1024) return (bytes / 1024).toFixed(1) + " KB"
+        return bytes + " B"
+    }
+    
+    // Mensaje temporal (guardado, reemplazos...)
+    function showMessage(text) {
+        message = text
+        messageTimer.restart()
+    }
+    
+    Timer {
+        id: messageTimer
+        interval: 4000
+        onTriggered: statusBar.message = ""
+    }
+    
+    Connections {
+        target: currentDocument
+        ignoreUnknownSignals: true
+        
+        function onSaveCompleted(bytesWritten, bytesPerSecond) {
+            statusBar.showMessage("Saved " + formatBytes(bytesWritten) +
+                                  " (" + formatBytes(bytesPerSecond) + "/s)")
+        }
+    }
+    
     // Top border
     Rectangle {
         anchors.top: parent.top
@@ -43,6 +72,13 @@ Rectangle {
             font.pixelSize: 11
         }
         
+        Text {
+            text: statusBar.message
+            color: "#5C6370"
+            font.family: "Consolas"
+            font.pixelSize: 11
+        }
+        
         Item { Layout.fillWidth: true }
         
         Text {
@@ -64,6 +64,38 @@ ApplicationWindow {
     // Modals
     FindModal {
         id: findModal
+        property int searchJob: -1
+        
+        // Mientras se escribe la consulta se cuenta en segundo plano
+        function countMatches() {
+            if (!editor.currentDocument || !visible) return
+            matchCount = 0
+            currentMatch = 0
+            searchJob = editor.currentDocument.searchAsync(searchText, false, false, useRegex)
+        }
+        onSearchTextChanged: countMatches()
+        onUseRegexChanged: countMatches()
+        onClosed: {
+            if (editor.currentDocument) {
+                editor.currentDocument.cancelSearch()
+                editor.currentDocument.stopSearch()
+            }
+        }
+    }
+    
+    Connections {
+        target: editor.currentDocument
+        ignoreUnknownSignals: true
+        
+        function onSearchResults(job, batch) {
+            if (job === findModal.searchJob)
+                findModal.matchCount += batch.length
+        }
+        
+        function onMatchesChanged() {
+            findModal.matchCount = editor.currentDocument.matchCount
+            findModal.currentMatch = editor.currentDocument.currentMatch
+        }
     }
     
     ReplaceModal {
@@ -112,6 +144,12 @@ ApplicationWindow {
             id: sidebar
             visible: sidebarVisible
             onOpenFolderRequested: folderOpenDialog.open()
+            onOpenMatchRequested: function(path, line, column, length) {
+                editor.openDocument(path)
+                if (!editor.currentDocument) return
+                var position = editor.currentDocument.goToLine(line + 1) + column
+                editorArea.selectText(position, position + length)
+            }
         }
         
         // Main Content Area
@@ -189,8 +227,9 @@ ApplicationWindow {
     function findNext() {
         if (!editor.currentDocument || findModal.searchText === "") return
         
-        var matches = editor.currentDocument.search(findModal.searchText, false, false)
-        if (matches.length === 0) return
+        // Reutiliza la búsqueda viva si la consulta no ha cambiado
+        if (editor.currentDocument.startSearch(findModal.searchText, false, false,
+                                                 findModal.useRegex) === 0) return
         
         var match = editor.currentDocument.findNext(editorArea.cursorPosition)
         if (match.start !== undefined) {
@@ -201,8 +240,9 @@ ApplicationWindow {
     function findPrevious() {
         if (!editor.currentDocument || findModal.searchText === "") return
         
-        var matches = editor.currentDocument.search(findModal.searchText, false, false)
-        if (matches.length === 0) return
+        // Reutiliza la búsqueda viva si la consulta no ha cambiado
+        if (editor.currentDocument.startSearch(findModal.searchText, false, false,
+                                                 findModal.useRegex) === 0) return
         
         var match = editor.currentDocument.findPrevious(editorArea.cursorPosition)
         if (match.start !== undefined) {
@@ -226,10 +266,11 @@ ApplicationWindow {
             replaceModal.searchText,
             replaceModal.replaceText,
             false,
-            false
+            false,
+            replaceModal.useRegex
         )
         
-        console.log("Replaced " + count + " occurrences")
+        statusBar.showMessage("Replaced " + count + " occurrences")
         replaceModal.close()
     }
     
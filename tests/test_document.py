@@ -0,0 +1,150 @@
+from core.buffer import mapped_text
+from core.buffer.mapped_text import MappedText
+from core.models import document
+from core.models.document import Document
+
+def test_mapped_text_slices_by_character(tmp_path, monkeypatch):
+    monkeypatch.setattr(mapped_text, "BLOCK_SIZE", 5)
+    path = tmp_path / "utf8.txt"
+    text = "añoño\n日本語 text\nend"
+    path.write_text(text, encoding="utf-8")
+    
+    mapped = MappedText(path)
+    assert len(mapped) == len(text)
+    assert mapped[0:len(text)] == text
+    assert mapped[3:12] == text[3:12]
+    mapped.close()
+
+def test_large_file_mode_edits_and_lines(tmp_path, monkeypatch):
+    monkeypatch.setattr(document, "LARGE_FILE_THRESHOLD", 1)
+    path = tmp_path / "big.log"
+    path.write_text("line 1\nline 2\nline 3\n", encoding="utf-8")
+    
+    doc = Document(path)
+    assert doc.large_file
+    assert doc.buffer.backend == "piece_table"
+    doc.buffer.insert(7, "new\n")
+    assert doc.buffer.line(1) == "new"
+    assert doc.buffer.line_count == 5
+    assert doc.buffer.get_text() == "line 1\nnew\nline 2\nline 3\n"
+    doc.close()
+
+def test_large_file_mode_keeps_encoding_and_newlines(tmp_path, monkeypatch):
+    monkeypatch.setattr(document, "LARGE_FILE_THRESHOLD", 1)
+    monkeypatch.setattr(mapped_text, "BLOCK_SIZE", 4)
+    cases = [
+        (b"caf\xe9\r\nna\xefve\r\n", "latin-1", "café\nnaïve\n"),
+        (b"\xef\xbb\xbfa\r\n\xc3\xb1\r\n", "utf-8-sig", "a\nñ\n"),
+        (b"ab\r\ncd\r\r\n", "utf-8", "ab\ncd\r\n"),
+    ]
+    for data, encoding, text in cases:
+        path = tmp_path / "big.txt"
+        path.write_bytes(data)
+        doc = Document(path)
+        assert doc.large_file and doc.encoding == encoding
+        assert doc.buffer.get_text() == text
+        assert doc.buffer.line_count == text.count("\n") + 1
+        doc.buffer.insert(0, "x")
+        assert doc.save()
+        bom = b"\xef\xbb\xbf" if data.startswith(b"\xef\xbb\xbf") else b""
+        assert path.read_bytes() == bom + b"x" + data[len(bom):]
+        doc.close()
+
+def test_large_file_save_releases_mapping_before_replace(tmp_path, monkeypatch):
+    import os
+    from core.models import file_saver
+    monkeypatch.setattr(document, "LARGE_FILE_THRESHOLD", 1)
+    monkeypatch.setattr(mapped_text, "BLOCK_SIZE", 4)
+    path = tmp_path / "big.txt"
+    path.write_bytes(b"caf\xe9\r\none\r\n")
+    doc = Document(path)
+    doc.buffer.insert(0, "x")
+    mapped = doc._mapped
+    replace = os.replace
+    
+    def replace_unmapped(src, dst):
+        # Windows no reemplaza un archivo con un mapeo abierto
+        assert mapped._map.closed
+        replace(src, dst)
+    
+    monkeypatch.setattr(file_saver.os, "replace", replace_unmapped)
+    assert doc.save()
+    assert path.read_bytes() == b"xcaf\xe9\r\none\r\n"
+    # El documento sigue leyendo del archivo nuevo, con el historial intacto
+    assert doc.large_file and doc._mapped is not mapped
+    assert doc.buffer.get_text() == "xcafé\none\n"
+    doc.buffer.insert(len(doc.buffer), "two\n")
+    doc.buffer.undo()
+    doc.buffer.undo()
+    assert doc.buffer.get_text() == "café\none\n"
+    assert doc.save()
+    assert path.read_bytes() == b"caf\xe9\r\none\r\n"
+    
+    def failing_replace(src, dst):
+        raise PermissionError("in use")
+    
+    monkeypatch.setattr(file_saver.os, "replace", failing_replace)
+    doc.buffer.insert(0, "y")
+    assert not doc.save()
+    assert path.read_bytes() == b"caf\xe9\r\none\r\n"
+    assert doc.buffer.get_text() == "ycafé\none\n"
+    doc.close()
+
+def test_save_is_atomic_and_keeps_format(tmp_path):
+    path = tmp_path / "crlf.txt"
+    path.write_bytes(b"\xef\xbb\xbfone\r\ntwo\r\n")
+    path.chmod(0o640)
+    
+    doc = Document(path)
+    assert doc.buffer.get_text() == "one\ntwo\n"
+    doc.buffer.insert(3, "!")
+    assert doc.save()
+    
+    assert path.read_bytes() == b"\xef\xbb\xbfone!\r\ntwo\r\n"
+    assert path.stat().st_mode & 0o777 == 0o640
+    assert doc.last_save.bytes_written == len(path.read_bytes())
+    assert [p.name for p in tmp_path.iterdir()] == ["crlf.txt"]
+
+def test_latin1_file_switches_to_utf8_when_needed(tmp_path):
+    path = tmp_path / "latin.txt"
+    path.write_bytes(b"caf\xe9\n")
+    
+    doc = Document(path)
+    assert doc.encoding == "latin-1"
+    doc.buffer.insert(0, "x")
+    assert doc.save()
+    assert path.read_bytes() == b"xcaf\xe9\n"
+    doc.buffer.insert(0, "€ ")
+    assert doc.save()
+    assert doc.encoding == "utf-8"
+    assert path.read_text(encoding="utf-8") == "€ xcafé\n"
+    assert [p.name for p in tmp_path.iterdir()] == ["latin.txt"]
+
+def test_save_writes_through_symlinks(tmp_path):
+    target = tmp_path / "a.txt"
+    target.write_text("old\n")
+    link = tmp_path / "link.txt"
+    link.symlink_to(target)
+    
+    doc = Document(link)
+    doc.buffer.insert(0, "new ")
+    assert doc.save()
+    assert link.is_symlink()
+    assert target.read_text() == "new old\n"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.txt", "link.txt"]
+
+def test_failed_save_leaves_original(tmp_path):
+    from core.models.file_saver import save_chunks
+    path = tmp_path / "keep.txt"
+    path.write_text("original")
+    
+    def chunks():
+        yield "partial"
+        raise OSError("disk full")
+    
+    try:
+        save_chunks(path, chunks())
+    except OSError:
+        pass
+    assert path.read_text() == "original"
+    assert [p.name for p in tmp_path.iterdir()] == ["keep.txt"]
@@ -0,0 +1,41 @@
+from core.models.file_tree import FILE_PAGE_SIZE, FileTree
+from core.models.gitignore import parse_rules
+
+def _names(tree):
+    return [node["name"] for node in tree.get_flat_list()[1:]]
+
+def test_folders_first_and_gitignore_rules(tmp_path):
+    (tmp_path / ".gitignore").write_text("*.log\n/out/\nbuild-*\n!keep.log\n")
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / ".gitignore").write_text("generated.py\n")
+    (tmp_path / "src" / "generated.py").write_text("")
+    (tmp_path / "src" / "main.py").write_text("")
+    (tmp_path / "out").mkdir()
+    (tmp_path / "b.txt").write_text("")
+    (tmp_path / "a.log").write_text("")
+    (tmp_path / "keep.log").write_text("")
+    (tmp_path / "build-x").write_text("")
+    (tmp_path / "out.txt").write_text("")
+    tree = FileTree(tmp_path)
+    assert _names(tree) == ["src", "b.txt", "keep.log", "out.txt"]
+    tree.toggle_node(str(tmp_path / "src"))
+    assert _names(tree) == ["src", "main.py", "b.txt", "keep.log", "out.txt"]
+
+def test_large_folders_load_in_pages(tmp_path):
+    total = FILE_PAGE_SIZE * 2 + 10
+    for i in range(total):
+        (tmp_path / f"f{i:05}.txt").write_text("")
+    tree = FileTree(tmp_path)
+    rows = tree.get_flat_list()
+    assert len(rows) == FILE_PAGE_SIZE + 2
+    assert rows[-1]["isMore"] and rows[-1]["name"] == f"{total - FILE_PAGE_SIZE} more…"
+    while tree.get_flat_list()[-1]["isMore"]:
+        assert tree.load_more(tree.get_flat_list()[-1]["path"])
+    assert _names(tree) == [f"f{i:05}.txt" for i in range(total)]
+
+def test_rule_patterns():
+    (rule,) = parse_rules("docs/**/*.md")
+    assert rule.pattern.match("docs/a/b/c.md") and rule.pattern.match("docs/c.md")
+    assert not rule.pattern.match("src/docs/c.md")
+    (rule,) = parse_rules("cache/")
+    assert rule.dir_only and rule.pattern.match("a/b/cache")
@@ -1,3 +1,6 @@
+from core.buffer.gap_buffer import GapBuffer
+from core.models.text_buffer import TextBuffer
+
 def test_insert_at_beginning():
     buf = GapBuffer("world")
     buf.insert(0, "hello ")
@@ -17,4 +20,47 @@ def test_undo_redo():
     assert buffer.get_text() == "initial"
     
     buffer.redo()
-    assert buffer.get_text() == "initial text"
\ No newline at end of file
+    assert buffer.get_text() == "initial text"
+
+def test_replace_records_single_edit():
+    buffer = TextBuffer("hello world")
+    buffer.replace(6, 5, "there")
+    assert buffer.get_text() == "hello there"
+    
+    buffer.undo()
+    assert buffer.get_text() == "hello world"
+    assert not buffer.can_undo()
+    
+    buffer.redo()
+    assert buffer.get_text() == "hello there"
+
+def test_replace_noop_keeps_history_clean():
+    buffer = TextBuffer("abc")
+    buffer.replace(1, 1, "b")
+    assert buffer.get_text() == "abc"
+    assert not buffer.can_undo()
+
+def test_positions_are_character_offsets():
+    buf = GapBuffer("naïve")
+    buf.insert(5, " café")
+    assert buf.get_text() == "naïve café"
+    assert len(buf) == 10
+    assert buf.delete(2, 1) == "ï"
+    
+    buf.insert(0, "日本 ")
+    assert buf.get_text() == "日本 nave café"
+    assert buf.delete(0, 3) == "日本 "
+    assert buf.get_text() == "nave café"
+
+def test_range_reads_across_gap():
+    buf = GapBuffer("hello world")
+    buf.insert(5, ",")
+    assert buf.get_range(3, 9) == "lo, wo"
+    assert buf.get_range(0, 6) == "hello,"
+    assert "".join(buf.iter_chunks(4)) == "hello, world"
+    assert all(len(chunk) <= 4 for chunk in buf.iter_chunks(4))
+
+def test_text_buffer_line_access():
+    buffer = TextBuffer("first\nsecond\nthird")
+    assert buffer.line(1) == "second"
+    assert buffer.line(2) == "third"
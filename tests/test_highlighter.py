@@ -0,0 +1,190 @@
+import queue
+import random
+
+import pytest
+
+pytest.importorskip("tree_sitter_python")
+
+from pathlib import Path
+
+from core.models.text_buffer import TextBuffer
+from core.models.document import Document
+from core.syntax.grammars import GRAMMARS, GrammarRegistry
+from core.syntax.highlight_service import HighlightService
+from core.syntax.highlighter import TYPE_IDS, TokenType, TreeSitterHighlighter
+
+PIECES = ["def f(x):\n", "    return x\n", "'ñé'", "# ü\n", "(", ")", "\n", "1", " ", "😀"]
+
+def _as_lists(lines):
+    return [list(lines.spans(i)) for i in range(len(lines))]
+
+def _full_parse(highlighter, text):
+    return str(highlighter._parse(text.encode("utf-8")).root_node)
+
+def test_incremental_parse_matches_full_parse():
+    rng = random.Random(5)
+    buffer = TextBuffer("".join(rng.choice(PIECES) for _ in range(40)))
+    highlighter = TreeSitterHighlighter("python")
+    highlighter.attach(buffer)
+    for _ in range(200):
+        if len(buffer) and rng.random() < 0.3:
+            buffer.delete(rng.randrange(len(buffer)), rng.randint(1, 5))
+        elif buffer.can_undo() and rng.random() < 0.1:
+            buffer.undo()
+        else:
+            buffer.insert(rng.randint(0, len(buffer)), rng.choice(PIECES))
+        text = buffer.get_text()
+        assert str(highlighter._tree.root_node) == _full_parse(highlighter, text)
+        assert highlighter._tree.root_node.end_byte == len(text.encode("utf-8"))
+
+def test_batched_edits_apply_as_one_tree_edit():
+    buffer = TextBuffer("a = 'ñ'\nb = 2\nc = 3\n")
+    highlighter = TreeSitterHighlighter("python")
+    highlighter.attach(buffer)
+    version = highlighter.tree_version
+    with buffer.transaction():
+        buffer.insert(len(buffer), "def g():\n    pass\n")
+        buffer.replace(0, 1, "alpha")
+        buffer.delete(buffer.line_to_offset(1), 6)
+    assert highlighter.tree_version == version + 1
+    assert str(highlighter._tree.root_node) == _full_parse(highlighter, buffer.get_text())
+    assert highlighter.changed_ranges
+
+    highlighter.detach()
+    buffer.insert(0, "x")
+    assert highlighter.tree_version == version + 1
+
+def test_viewport_tokens_are_cached_and_renumbered_after_edits():
+    buffer = TextBuffer("x = 1\n" * 50 + "s = 'ñ'\n" * 50)
+    highlighter = TreeSitterHighlighter("python")
+    highlighter.attach(buffer)
+    before = highlighter.get_tokens(60, 62)
+    assert {t.line for t in before} == {60, 61, 62}
+    assert set(highlighter._line_tokens) == {60, 61, 62}
+
+    buffer.insert(0, "# new\n")
+    assert set(highlighter._line_tokens) == {61, 62, 63}
+    after = highlighter.get_tokens(61, 63)
+    assert [(t.type, t.start - 6, t.end - 6, t.line - 1) for t in after] == [
+        (t.type, t.start, t.end, t.line) for t in before
+    ]
+
+    text = buffer.get_text().encode("utf-8")
+    strings = [t for t in after if t.type.value == "string"]
+    assert [text[t.start:t.end].decode("utf-8") for t in strings] == ["'ñ'"] * 3
+
+
+def test_line_spans_split_multiline_tokens_in_char_columns():
+    highlighter = TreeSitterHighlighter("python")
+    highlighter.parse('x = """ñ\nmid\nend""" # é\n')
+    string, comment = TYPE_IDS[TokenType.STRING], TYPE_IDS[TokenType.COMMENT]
+    assert _as_lists(highlighter.line_spans(1, 2)) == [
+        [(0, 3, string)],
+        [(0, 6, string), (7, 10, comment)],
+    ]
+    assert _as_lists(highlighter.line_spans(0, 0))[0][-1] == (4, 8, string)
+
+def test_service_results_converge_after_stale_results_are_dropped():
+    rng = random.Random(3)
+    buffer = TextBuffer("".join(rng.choice(PIECES) for _ in range(300)))
+    results = queue.Queue()
+    service = HighlightService(buffer, "python", lambda *result: results.put(result))
+    # La vista: tokens por línea, que se desplazan con las ediciones como los bloques de Qt
+    view = [None] * buffer.line_count
+
+    def track(edits):
+        for edit in edits:
+            text = buffer_text[0]
+            row = text.count("\n", 0, edit.position)
+            old_rows = edit.deleted_text.count("\n")
+            view[row:row + old_rows + 1] = [None] * (edit.inserted_text.count("\n") + 1)
+            end = edit.position + len(edit.deleted_text)
+            buffer_text[0] = text[:edit.position] + edit.inserted_text + text[end:]
+
+    def receive():
+        while not results.empty():
+            version, first, lines = results.get()
+            if version != buffer.version:
+                service.redeliver(version, first, first + len(lines) - 1)
+            else:
+                view[first:first + len(lines)] = _as_lists(lines)
+
+    buffer_text = [buffer.get_text()]
+    buffer.add_listener(track)
+    for _ in range(100):
+        buffer.insert(rng.randint(0, len(buffer)), rng.choice(PIECES))
+        if rng.random() < 0.2:
+            buffer.undo()
+        receive()
+    while not (service.wait_idle(5) and results.empty()):
+        receive()
+    service.close()
+
+    reference = TreeSitterHighlighter("python")
+    reference.parse(buffer.get_text())
+    assert view == _as_lists(reference.line_spans(0, buffer.line_count - 1))
+
+def test_service_follows_large_file_after_save(tmp_path, monkeypatch):
+    from core.models import document
+    from core.syntax import highlighter
+    monkeypatch.setattr(document, "LARGE_FILE_THRESHOLD", 1)
+    # Caché pequeña: al volver a entregar se releen líneas del texto
+    monkeypatch.setattr(highlighter, "TOKEN_CACHE_LINES", 16)
+    path = tmp_path / "big.py"
+    path.write_text("def f(x):\n    return x\n" * 50)
+    doc = Document(path)
+    results = queue.Queue()
+    service = HighlightService(doc.buffer, "python", lambda *result: results.put(result))
+    doc.buffer.insert(0, "# top\n")
+    assert service.wait_idle(5)
+    assert doc.save()
+    service.replace_source()
+    # El mapeo anterior está cerrado: el hilo tiene que leer del nuevo
+    service.invalidate()
+    assert service.wait_idle(5)
+    view = {}
+    while not results.empty():
+        version, first, lines = results.get()
+        if version == doc.buffer.version:
+            for i, spans in enumerate(_as_lists(lines)):
+                view[first + i] = spans
+    service.close()
+    doc.close()
+
+    reference = TreeSitterHighlighter("python")
+    reference.parse(path.read_text())
+    expected = _as_lists(reference.line_spans(0, doc.buffer.line_count - 1))
+    assert [view.get(row) for row in range(len(expected))] == expected
+
+def test_grammar_registry_loads_once_and_pools_parsers():
+    registry = GrammarRegistry()
+    language = registry.language("python")
+    assert registry.language("python") is language
+    with registry.parser("python") as parser:
+        first = parser
+        with registry.parser("python") as other:
+            assert other is not first
+    with registry.parser("python") as parser:
+        assert parser in (first, other)
+        assert parser.language is language
+    with registry.parser("cobol") as parser:
+        assert parser is None
+
+def test_grammar_registry_covers_detected_languages():
+    for suffix in [".py", ".js", ".ts", ".html", ".css", ".json", ".md"]:
+        assert Document._detect_language(Path("file" + suffix)) in GRAMMARS
+
+def test_grammar_registry_covers_editor_document_languages():
+    pytest.importorskip("PySide6")
+    from core.editor.document import Document as EditorDocument
+    suffixes = [".py", ".js", ".ts", ".rs", ".cpp", ".c", ".h", ".hpp", ".html", ".css",
+                ".json", ".yaml", ".yml", ".md"]
+    for suffix in suffixes:
+        assert EditorDocument._detect_language("file" + suffix) in GRAMMARS
+
+@pytest.mark.parametrize("language", list(GRAMMARS))
+def test_highlight_query_compiles_with_its_grammar(language):
+    pytest.importorskip(GRAMMARS[language].module)
+    highlighter = TreeSitterHighlighter(language)
+    assert highlighter.available
+    assert highlighter._query() is not None
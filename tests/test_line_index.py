@@ -0,0 +1,29 @@
+from core.buffer.line_index import LineIndex
+from core.models.text_buffer import TextBuffer
+
+def test_offset_to_line_col():
+    index = LineIndex("ab\ncd\n\nefg")
+    assert index.line_count == 4
+    assert index.offset_to_line_col(0) == (0, 0)
+    assert index.offset_to_line_col(4) == (1, 1)
+    assert index.offset_to_line_col(6) == (2, 0)
+    assert index.offset_to_line_col(10) == (3, 3)
+    assert index.line_to_offset(3) == 7
+
+def test_incremental_updates_match_text():
+    buffer = TextBuffer("one\ntwo\nthree")
+    buffer.insert(3, "\nnew")
+    buffer.delete(8, 4)
+    text = buffer.get_text()
+    assert buffer.line_count == text.count("\n") + 1
+    for line, content in enumerate(text.split("\n")):
+        offset = buffer.line_to_offset(line)
+        assert text[offset:offset + len(content)] == content
+
+def test_index_follows_undo():
+    buffer = TextBuffer("a\nb")
+    buffer.insert(3, "\nc\nd")
+    assert buffer.line_count == 4
+    buffer.undo()
+    assert buffer.line_count == 2
+    assert buffer.offset_to_line_col(2) == (1, 0)
@@ -0,0 +1,43 @@
+from core.buffer.piece_table import PieceTable
+from core.models.text_buffer import TextBuffer
+
+def test_insert_delete():
+    table = PieceTable("hello world")
+    table.insert(5, ",")
+    table.insert(12, "!")
+    assert table.get_text() == "hello, world!"
+    assert table.delete(0, 7) == "hello, "
+    assert table.get_text() == "world!"
+    assert len(table) == 6
+
+def test_typing_extends_last_piece():
+    table = PieceTable("ab")
+    for i, ch in enumerate("xyz"):
+        table.insert(1 + i, ch)
+    assert table.get_text() == "axyzb"
+    assert table.piece_count == 3
+
+def test_snapshots_are_immutable():
+    table = PieceTable("abc")
+    before = table.create_snapshot()
+    table.insert(3, "def")
+    table.delete(0, 1)
+    assert before.get_text() == "abc"
+    assert table.get_text() == "bcdef"
+    
+    table.restore_snapshot(before)
+    assert table.get_text() == "abc"
+
+def test_text_buffer_backend_selection():
+    buffer = TextBuffer("x", backend="piece_table")
+    buffer.insert(1, "yz")
+    buffer.undo()
+    assert buffer.get_text() == "x"
+    assert buffer.backend == "piece_table"
+    assert TextBuffer("x").backend == "gap"
+
+def test_range_and_chunks():
+    table = PieceTable("abcdef")
+    table.insert(3, "XYZ")
+    assert table.get_range(2, 7) == "cXYZd"
+    assert list(table.iter_chunks(2)) == ["ab", "c", "XY", "Z", "de", "f"]
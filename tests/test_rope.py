@@ -0,0 +1,30 @@
+from core.buffer import rope
+from core.buffer.rope import Rope
+from core.models.text_buffer import TextBuffer
+
+def test_edits_across_chunks(monkeypatch):
+    monkeypatch.setattr(rope, "CHUNK_SIZE", 4)
+    monkeypatch.setattr(rope, "MIN_CHUNK", 1)
+    monkeypatch.setattr(rope, "MAX_CHUNK", 8)
+    
+    buf = Rope("abcdefghijklmnop")
+    assert buf.chunk_count == 4
+    buf.insert(6, "XYZ")
+    assert buf.get_text() == "abcdefXYZghijklmnop"
+    assert buf.delete(2, 10) == "cdefXYZghi"
+    assert buf.get_text() == "abjklmnop"
+    assert len(buf) == 9
+
+def test_snapshot_survives_edits():
+    buf = Rope("hello")
+    snapshot = buf.create_snapshot()
+    buf.insert(5, " world")
+    assert snapshot.get_text() == "hello"
+    assert buf.get_text() == "hello world"
+
+def test_rope_behind_text_buffer():
+    buffer = TextBuffer("one\ntwo", backend="rope")
+    buffer.replace(4, 3, "2\n3")
+    assert buffer.line_count == 3
+    buffer.undo()
+    assert buffer.get_text() == "one\ntwo"
@@ -0,0 +1,177 @@
+import random
+from threading import Event
+
+from core.models.search_engine import (
+    LiteralPattern, SearchEngine, SearchSession, compile_query, iter_match_batches
+)
+from core.models.text_buffer import TextBuffer
+
+def _spans(matches):
+    return [(m.start, m.end, m.line) for m in matches]
+
+def _expected(text, query, case_sensitive=False, whole_word=False, regex=False):
+    return _spans(SearchEngine().search(text, query, case_sensitive, whole_word, regex=regex))
+
+def test_session_tracks_edits():
+    buffer = TextBuffer("foo bar\nfoo\nbaz foo")
+    session = SearchSession(buffer, "foo")
+    assert session.match_count == 3
+
+    buffer.insert(0, "xx\n")
+    assert _spans(session.matches) == _expected(buffer.get_text(), "foo")
+
+    buffer.delete(3, 3)
+    assert session.match_count == 2
+
+    buffer.insert(len(buffer), " fo")
+    buffer.insert(len(buffer), "o")
+    assert _spans(session.matches) == _expected(buffer.get_text(), "foo")
+
+def test_session_whole_word_reacts_to_neighbours():
+    buffer = TextBuffer("foo foo")
+    session = SearchSession(buffer, "foo", whole_word=True)
+    buffer.insert(3, "d")
+    assert _spans(session.matches) == [(5, 8, 0)]
+    buffer.undo()
+    assert session.match_count == 2
+
+def test_session_transaction_and_undo():
+    buffer = TextBuffer("a\n" * 50)
+    session = SearchSession(buffer, "a")
+    buffer.apply_edits((i * 2, 1, "bab") for i in range(0, 50, 3))
+    assert _spans(session.matches) == _expected(buffer.get_text(), "a")
+    buffer.undo()
+    assert _spans(session.matches) == _expected(buffer.get_text(), "a")
+
+def test_session_random_edits_match_full_scan():
+    rng = random.Random(7)
+    buffer = TextBuffer("")
+    session = SearchSession(buffer, "ab")
+    for _ in range(500):
+        if len(buffer) and rng.random() < 0.4:
+            position = rng.randrange(len(buffer))
+            buffer.delete(position, rng.randint(1, 4))
+        else:
+            buffer.insert(rng.randint(0, len(buffer)), rng.choice(["a", "b", "ab", "\n", "x"]))
+        assert _spans(session.matches) == _expected(buffer.get_text(), "ab")
+
+def test_engine_session_updates_count_and_closes():
+    buffer = TextBuffer("one two one")
+    engine = SearchEngine()
+    updates = []
+    engine.search_buffer(buffer, "one", on_update=lambda: updates.append(engine.match_count))
+    assert engine.match_count == 2
+
+    buffer.insert(0, "one ")
+    assert updates == [3]
+
+    engine.close_session()
+    buffer.insert(0, "one ")
+    assert updates == [3]
+
+def test_navigation_wraps_with_bisect():
+    engine = SearchEngine()
+    engine.search("ab ab ab", "ab")
+    assert engine.next_match(0).start == 3
+    assert engine.next_match(6).start == 0
+    assert engine.previous_match(3).start == 0
+    assert engine.previous_match(0).start == 6
+    assert engine.current_match == 3
+
+def test_matches_in_range_is_viewport_slice():
+    engine = SearchEngine()
+    engine.search("x\n" * 1000, "x")
+    visible = engine.matches_in_range(100, 110)
+    assert [(m.start, m.line) for m in visible] == [(100, 50), (102, 51), (104, 52), (106, 53), (108, 54)]
+
+def test_chunked_search_matches_across_boundaries():
+    text = "foo food\nxfoo foo\n\nfoo" * 5
+    expected = _expected(text, "foo", whole_word=True)
+    for size in range(1, 12):
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        engine = SearchEngine()
+        found = _spans(engine.search_chunks(chunks, "foo", whole_word=True))
+        assert found == expected
+        assert _spans(engine._matches) == expected
+
+def test_chunked_search_stops_when_a_new_search_starts():
+    engine = SearchEngine()
+    chunks = ["ab "] * 100
+    stream = engine.search_chunks(chunks, "ab")
+    assert next(stream).start == 0
+    engine.search("ab", "ab")
+    assert list(stream) == []
+
+def test_match_batches_respect_size_and_cancel():
+    chunks = ["x y " * 100] * 3
+    batches = list(iter_match_batches(chunks, "x", batch_size=64))
+    assert sum(len(b) for b in batches) == 300
+    assert all(len(b) <= 64 for b in batches)
+
+    cancel = Event()
+    stream = iter_match_batches(chunks, "x", cancel=cancel, batch_size=64)
+    next(stream)
+    cancel.set()
+    assert list(stream) == []
+
+def test_replace_all_in_buffer_matches_string_replace():
+    text = "Foo foo food\n" * 50
+    buffer = TextBuffer(text)
+    count = SearchEngine().replace_all_in_buffer(buffer, "foo", "bar", whole_word=True)
+    assert count == 100
+    assert buffer.get_text() == SearchEngine().replace_all(text, "foo", "bar", whole_word=True)[0]
+    buffer.undo()
+    assert buffer.get_text() == text
+
+def test_compiled_queries_are_cached_and_literals_skip_the_regex_engine():
+    pattern = compile_query("Foo", False, False)
+    assert compile_query("Foo", False, False) is pattern
+    assert compile_query("Foo", False, False, True) is not pattern
+    assert isinstance(pattern._matcher, LiteralPattern)
+    # Sin distinguir mayúsculas en texto no ASCII se recurre al motor de regex
+    for text in ["foo FOO fOo", "ſoo Foo", "K foo"]:
+        assert [(m.start(), m.end()) for m in pattern.finditer(text)] == [
+            (m.start(), m.end()) for m in pattern.regex.finditer(text)
+        ]
+
+def test_regex_mode_chunked_matches_full_scan():
+    text = "id = 42\nname = 'x'\n\nvalue=7 # done\n" * 20
+    for query in [r"\w+\s*=\s*\d+", r"^\w", r"\d$", r"=\s*'[^']*'", r"(?<=# )\w+", r"\n\n\w"]:
+        expected = _expected(text, query, case_sensitive=True, regex=True)
+        assert expected
+        for size in (1, 5, 64):
+            chunks = [text[i:i + size] for i in range(0, len(text), size)]
+            found = _spans(SearchEngine().search_chunks(chunks, query, True, regex=True))
+            assert found == expected, (query, size)
+
+def test_regex_session_random_edits_match_full_scan():
+    rng = random.Random(11)
+    buffer = TextBuffer("")
+    session = SearchSession(buffer, r"a+b", regex=True)
+    for _ in range(300):
+        if len(buffer) and rng.random() < 0.4:
+            buffer.delete(rng.randrange(len(buffer)), rng.randint(1, 3))
+        else:
+            buffer.insert(rng.randint(0, len(buffer)), rng.choice(["a", "b", "aab", "\n", "x"]))
+        assert _spans(session.matches) == _expected(buffer.get_text(), r"a+b", regex=True)
+
+def test_zero_width_session_matches_follow_edits():
+    for query in (r"a|", r"b*", r"^", r"$"):
+        rng = random.Random(5)
+        buffer = TextBuffer("ab\nb")
+        session = SearchSession(buffer, query, regex=True)
+        for _ in range(200):
+            if len(buffer) and rng.random() < 0.4:
+                buffer.delete(rng.randrange(len(buffer)), rng.randint(1, 3))
+            else:
+                buffer.insert(rng.randint(0, len(buffer)), rng.choice(["a", "b", "\n", "x"]))
+            assert _spans(session.matches) == _expected(buffer.get_text(), query, regex=True), query
+
+def test_regex_replace_expands_groups_and_literal_replace_does_not():
+    text = "ana@host bob@mail\n" * 3
+    buffer = TextBuffer(text)
+    engine = SearchEngine()
+    assert engine.replace_all_in_buffer(buffer, r"(\w+)@(\w+)", r"\2:\1", regex=True) == 6
+    assert buffer.get_text() == "host:ana mail:bob\n" * 3
+    assert engine.replace_all(text, r"(\w+)@(\w+)", r"\2:\1", regex=True)[0] == buffer.get_text()
+    assert engine.replace_all("a.b", ".", r"\1")[0] == r"a\1b"
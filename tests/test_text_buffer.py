@@ -0,0 +1,66 @@
+from core.models.text_buffer import TextBuffer
+
+def test_apply_edits_is_one_undo_step():
+    buffer = TextBuffer("a-b-c-d")
+    buffer.apply_edits([(1, 1, "+"), (5, 1, "+"), (3, 1, "+")])
+    assert buffer.get_text() == "a+b+c+d"
+    
+    buffer.undo()
+    assert buffer.get_text() == "a-b-c-d"
+    buffer.redo()
+    assert buffer.get_text() == "a+b+c+d"
+
+def test_transaction_notifies_once():
+    buffer = TextBuffer("hello")
+    notifications = []
+    buffer.add_listener(notifications.append)
+    version = buffer.version
+    
+    with buffer.transaction():
+        buffer.insert(0, ">")
+        buffer.insert(6, "<")
+    
+    assert buffer.get_text() == ">hello<"
+    assert len(notifications) == 1
+    assert [e.inserted_text for e in notifications[0]] == [">", "<"]
+    assert buffer.version == version + 1
+
+def test_undo_notifies_inverse_edits():
+    buffer = TextBuffer("abc")
+    buffer.replace(1, 1, "XY")
+    notifications = []
+    buffer.add_listener(notifications.append)
+    
+    buffer.undo()
+    edit = notifications[0][0]
+    assert (edit.position, edit.deleted_text, edit.inserted_text) == (1, "XY", "b")
+
+def test_apply_edits_rejects_overlap():
+    buffer = TextBuffer("abcdef")
+    try:
+        buffer.apply_edits([(0, 3, "x"), (2, 2, "y")])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("overlapping edits accepted")
+    assert buffer.get_text() == "abcdef"
+
+def test_apply_edits_keeps_a_compact_undo_record():
+    buffer = TextBuffer("foo bar " * 1000)
+    progress = []
+    count = buffer.apply_edits(
+        ((i * 8, 3, "qux") for i in range(1000)), progress=lambda done, total: progress.append(done)
+    )
+    assert count == 1000
+    assert buffer.get_text() == "qux bar " * 1000
+    assert progress[-1] == 1000
+    
+    stats = buffer.undo_stats()
+    assert stats.undo_entries == 1
+    # Posiciones en un array y textos compartidos, no mil Edit
+    assert stats.undo_bytes < 1000 * 32
+    
+    buffer.undo()
+    assert buffer.get_text() == "foo bar " * 1000
+    buffer.redo()
+    assert buffer.get_text() == "qux bar " * 1000
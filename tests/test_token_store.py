@@ -0,0 +1,44 @@
+import random
+
+from core.syntax.token_store import BLOCK_LINES, TokenLines, TokenStore
+
+def _lines(rows):
+    lines = TokenLines()
+    for spans in rows:
+        lines.append(spans)
+    return lines
+
+def _rows(store):
+    return [list(store.spans(line)) for line in range(store.line_count)]
+
+def test_token_lines_pack_spans_per_line():
+    lines = _lines([[(0, 3, 1), (4, 6, 2)], [], [(1, 2, 0)]])
+    assert len(lines) == 3
+    assert list(lines.spans(0)) == [(0, 3, 1), (4, 6, 2)]
+    assert list(lines.spans(1)) == []
+    assert list(lines.slice(1, 3).spans(1)) == [(1, 2, 0)]
+    # offsets + inicio + fin + tipo: 4 * 4 + 3 * (4 + 4 + 1)
+    assert lines.nbytes == 43
+
+def test_store_splice_matches_list_model():
+    rng = random.Random(5)
+    count = 3 * BLOCK_LINES
+    store = TokenStore(count)
+    model = [[] for _ in range(count)]
+    for step in range(300):
+        first = rng.randint(0, len(model))
+        removed = rng.randint(0, 40)
+        rows = [[(i, i + 1, step % 7)] * rng.randint(0, 2) for i in range(rng.randint(0, 40))]
+        store.splice(first, removed, _lines(rows))
+        model[first:first + removed] = rows
+        assert store.line_count == len(model)
+    assert _rows(store) == model
+
+def test_store_set_lines_clips_to_document():
+    store = TokenStore(3)
+    store.set_lines(2, _lines([[(0, 1, 4)], [(0, 2, 4)]]))
+    assert _rows(store) == [[], [], [(0, 1, 4)]]
+    store.splice(0, 3, TokenLines.empty(0))
+    assert store.line_count == 0
+    store.splice(0, 0, TokenLines.empty(2))
+    assert _rows(store) == [[], []]
@@ -0,0 +1,86 @@
+import random
+
+from core.models.text_buffer import TextBuffer
+from core.syntax.highlighter import TYPE_IDS, TokenType
+from core.syntax.tokenizer import IncrementalTokenizer
+
+PIECES = ['"""', "/*", "*/", "x = 1\n", "# c\n", "def f(y):\n", "'s'", "\n", " ", "ñ"]
+OPERATOR, STRING, COMMENT, NUMBER, FUNCTION = (
+    TYPE_IDS[t] for t in (
+        TokenType.OPERATOR, TokenType.STRING, TokenType.COMMENT, TokenType.NUMBER,
+        TokenType.FUNCTION,
+    )
+)
+
+def _as_lists(lines):
+    return [list(lines.spans(i)) for i in range(len(lines))]
+
+def test_block_state_carries_across_lines():
+    lines = ['x = """a', "def", 'b""" + f(2)  # end']
+    tokenizer = IncrementalTokenizer("python")
+    assert tokenizer.tokenize(lines.__getitem__, len(lines)) == [(0, 2)]
+    assert [list(tokenizer.line_tokens(row)) for row in range(3)] == [
+        [(2, 3, OPERATOR), (4, 8, STRING)],
+        [(0, 3, STRING)],
+        [(0, 4, STRING), (5, 6, OPERATOR), (7, 8, FUNCTION), (9, 10, NUMBER), (13, 18, COMMENT)],
+    ]
+
+def test_relex_stops_when_state_matches_cache():
+    lines = ["x = 1"] * 1000
+    tokenizer = IncrementalTokenizer("python")
+    tokenizer.tokenize(lines.__getitem__, len(lines))
+    read = []
+
+    def line_text(row):
+        read.append(row)
+        return lines[row]
+
+    lines[10] = "y = 2"
+    tokenizer.mark_dirty(10, 10)
+    assert tokenizer.tokenize(line_text, len(lines)) == [(10, 10)]
+    assert read == [10]
+    # Abrir un bloque cambia el estado de las líneas siguientes: solo se
+    # llega hasta la última pedida
+    read.clear()
+    lines[500] = '"""'
+    tokenizer.mark_dirty(500, 500)
+    tokenizer.tokenize(line_text, len(lines), last_line=600)
+    assert read == list(range(500, 601))
+    # Al cerrarlo, se para donde el estado vuelve a coincidir con la caché
+    read.clear()
+    lines[500] = "x = 1"
+    tokenizer.mark_dirty(500, 500)
+    tokenizer.tokenize(line_text, len(lines))
+    assert read == list(range(500, 602))
+
+def test_inserted_lines_shift_cached_states():
+    lines = ["/* a", "b */", "x"]
+    tokenizer = IncrementalTokenizer("c")
+    tokenizer.tokenize(lines.__getitem__, len(lines))
+    lines[1:1] = ["new", "lines"]
+    tokenizer.edit_lines(1, 0, 2)
+    assert tokenizer.tokenize(lines.__getitem__, len(lines)) == [(1, 3)]
+    assert list(tokenizer.line_tokens(4)) == []
+
+def test_buffer_edits_match_full_tokenization():
+    for language in ("python", "c"):
+        rng = random.Random(11)
+        buffer = TextBuffer("".join(rng.choice(PIECES) for _ in range(200)))
+        tokenizer = IncrementalTokenizer(language)
+        tokenizer.reset(buffer.snapshot())
+        tokenizer.reparse()
+        buffer.add_listener(lambda edits: tokenizer.edit(edits, buffer.snapshot()))
+        for _ in range(150):
+            position = rng.randint(0, len(buffer))
+            if rng.random() < 0.3 and position < len(buffer):
+                buffer.delete(position, rng.randint(1, 5))
+            else:
+                buffer.insert(position, rng.choice(PIECES))
+            if rng.random() < 0.2:
+                buffer.undo()
+            if rng.random() < 0.5:
+                tokenizer.reparse()
+        reference = IncrementalTokenizer(language)
+        reference.reset(buffer.snapshot())
+        last = buffer.line_count - 1
+        assert _as_lists(tokenizer.line_spans(0, last)) == _as_lists(reference.line_spans(0, last))
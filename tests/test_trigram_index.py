@@ -0,0 +1,101 @@
+import os
+
+from core.models.trigram_index import TrigramIndex, regex_literals
+from core.models.workspace_search import WorkspaceSearch
+
+def _index(tmp_path):
+    root = tmp_path / "ws"
+    root.mkdir()
+    (root / "a.py").write_text("def parse_config():\n    pass\n")
+    (root / "b.py").write_text("import os\nos.getcwd()\n")
+    (root / "c.txt").write_text("Parse everything\n")
+    (root / ".cache").write_text("parse_config")
+    index = TrigramIndex(root, tmp_path / "index.sqlite")
+    return root, index
+
+def _names(paths):
+    return sorted(os.path.basename(p) for p in paths)
+
+def test_candidates_narrow_by_trigrams(tmp_path):
+    root, index = _index(tmp_path)
+    stats = index.update()
+    assert (stats.files, stats.indexed) == (3, 3)
+    assert _names(index.candidates("parse")) == ["a.py", "c.txt"]
+    # El índice no distingue mayúsculas: el filtrado fino lo hace la búsqueda
+    assert _names(index.candidates("parse", case_sensitive=True)) == ["a.py", "c.txt"]
+    assert _names(index.candidates("getcwd")) == ["b.py"]
+    assert index.candidates("zzz_missing") == []
+    assert index.candidates("os") is None
+
+def test_index_skips_gitignored_files(tmp_path):
+    root, index = _index(tmp_path)
+    (root / ".gitignore").write_text("c.txt\n")
+    assert index.update().files == 2
+    assert _names(index.candidates("parse")) == ["a.py"]
+
+def test_update_is_incremental_and_persistent(tmp_path):
+    root, index = _index(tmp_path)
+    index.update()
+    assert index.update().indexed == 0
+
+    (root / "b.py").write_text("nothing here\n")
+    (root / "c.txt").unlink()
+    (root / "d.py").write_text("getcwd()\n")
+    stats = index.update()
+    assert (stats.files, stats.indexed, stats.removed) == (3, 2, 1)
+    index.close()
+
+    reopened = TrigramIndex(root, tmp_path / "index.sqlite")
+    assert _names(reopened.candidates("getcwd")) == ["d.py"]
+    assert _names(reopened.candidates("parse")) == ["a.py"]
+
+def test_regex_literals():
+    assert regex_literals(r"parse_\w+\(config") == ["parse_", "(config"]
+    assert regex_literals(r"foo|bar") == []
+
+def test_workspace_search_uses_index(tmp_path):
+    root, index = _index(tmp_path)
+    index.update()
+    search = WorkspaceSearch(root, "parse", index=index)
+    results = list(search.run())
+    assert _names(r.path for r in results) == ["a.py", "c.txt"]
+    assert search.files_searched == 2
+
+def test_refresh_folders_syncs_only_changed_folders(tmp_path):
+    root, index = _index(tmp_path)
+    (root / "pkg").mkdir()
+    (root / "pkg" / "old.py").write_text("needle\n")
+    (root / "lib").mkdir()
+    (root / "lib" / "kept.py").write_text("needle\n")
+    index.update()
+    assert _names(index.folders) == ["lib", "pkg", "ws"]
+    (root / "a.py").write_text("needle in a\n")
+    (root / "new.txt").write_text("needle\n")
+    (root / "sub" / "deep").mkdir(parents=True)
+    (root / "sub" / "deep" / "x.txt").write_text("needle\n")
+    (root / "pkg" / "old.py").unlink()
+    (root / "pkg").rmdir()
+    (root / ".gitignore").write_text("c.txt\n")
+    # Las consultas solo leen el índice
+    assert _names(index.candidates("needle")) == ["kept.py", "old.py"]
+    stats = index.refresh_folders([str(root)])
+    assert (stats.files, stats.removed) == (5, 2)
+    assert _names(index.candidates("needle")) == ["a.py", "kept.py", "new.txt", "x.txt"]
+    assert index.candidates("parse") == []
+    assert _names(index.folders) == ["deep", "lib", "pkg", "sub", "ws"]
+
+def test_files_being_indexed_are_candidates(tmp_path):
+    root, index = _index(tmp_path)
+    index.update()
+    (root / "b.py").write_text("needle\n")
+    scan = index._scan
+    during = []
+
+    def spy(items):
+        during.append(index.candidates("needle"))
+        return scan(items)
+
+    index._scan = spy
+    index.update([str(root / "b.py")])
+    assert _names(during[0]) == ["b.py"]
+    assert _names(index.candidates("needle")) == ["b.py"]
@@ -0,0 +1,36 @@
+from core.buffer.undo_stack import Edit, UndoStack
+
+def test_contiguous_typing_is_merged():
+    stack = UndoStack()
+    for i, ch in enumerate("hello"):
+        stack.push(Edit(i, "", ch, timestamp=i * 0.1))
+    assert stack.stats().undo_entries == 1
+    assert stack.undo().inserted_text == "hello"
+
+def test_merge_window_and_newline_split_groups():
+    stack = UndoStack(merge_window=1.0)
+    stack.push(Edit(0, "", "a", timestamp=0.0))
+    stack.push(Edit(1, "", "b", timestamp=5.0))
+    stack.push(Edit(2, "", "\n", timestamp=5.1))
+    assert stack.stats().undo_entries == 3
+
+def test_backspace_run_is_merged():
+    stack = UndoStack()
+    stack.push(Edit(4, "d", "", timestamp=0.0))
+    stack.push(Edit(3, "c", "", timestamp=0.1))
+    stack.push(Edit(2, "b", "", timestamp=0.2))
+    edit = stack.undo()
+    assert (edit.position, edit.deleted_text) == (2, "bcd")
+
+def test_eviction_by_count_and_bytes():
+    stack = UndoStack(max_size=3)
+    for i in range(10):
+        stack.push(Edit(i * 10, "", "x", timestamp=i * 10.0))
+    assert stack.stats().undo_entries == 3
+    
+    stack = UndoStack(max_bytes=10_000)
+    for i in range(10):
+        stack.push(Edit(0, "", "y" * 4_000, timestamp=i * 10.0))
+    stats = stack.stats()
+    assert stats.undo_entries == 2
+    assert stats.undo_bytes <= 10_000
@@ -0,0 +1,77 @@
+from core.models import document
+from core.models.workspace_search import WorkspaceSearch, iter_workspace_files, replace_in_files, search_file
+
+def _workspace(tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "main.py").write_text("import os\nprint('hello')\nhello_world = 1\n")
+    (tmp_path / "src" / "notes.txt").write_text("Hello café\ncafé hello\n")
+    (tmp_path / "node_modules").mkdir()
+    (tmp_path / "node_modules" / "lib.js").write_text("hello")
+    (tmp_path / ".hidden").write_text("hello")
+    (tmp_path / "image.bin").write_bytes(b"\x89PNG\0\0hello")
+    return tmp_path
+
+def test_walk_uses_file_tree_ignore_rules(tmp_path):
+    root = _workspace(tmp_path)
+    names = sorted(p.rsplit("/", 1)[-1] for p in iter_workspace_files(root))
+    assert names == ["image.bin", "main.py", "notes.txt"]
+
+def test_walk_uses_gitignore_like_file_tree(tmp_path):
+    from core.models.file_tree import FileTree
+    root = _workspace(tmp_path)
+    (root / ".gitignore").write_text("*.bin\nout/\n")
+    (root / "out").mkdir()
+    (root / "out" / "build.log").write_text("hello")
+    (root / "src" / ".gitignore").write_text("notes.txt\n")
+    names = sorted(p.rsplit("/", 1)[-1] for p in iter_workspace_files(root))
+    assert names == ["main.py"]
+    tree = FileTree(root)
+    tree.toggle_node(str(root / "src"))
+    assert [node["name"] for node in tree.get_flat_list()[1:]] == ["src", "main.py"]
+
+def test_search_file_reports_lines_and_columns(tmp_path):
+    root = _workspace(tmp_path)
+    result = search_file(str(root / "src" / "notes.txt"), "hello")
+    assert [(m.line, m.column, m.preview) for m in result.matches] == [
+        (0, 0, "Hello café"), (1, 5, "café hello")
+    ]
+    assert search_file(str(root / "image.bin"), "hello") is None
+
+def test_whole_word_and_non_ascii_queries(tmp_path):
+    root = _workspace(tmp_path)
+    result = search_file(str(root / "src" / "main.py"), "hello", whole_word=True)
+    assert [m.line for m in result.matches] == [1]
+    result = search_file(str(root / "src" / "notes.txt"), "CAFÉ")
+    assert [(m.line, m.column, m.length) for m in result.matches] == [(0, 6, 4), (1, 0, 4)]
+
+def test_workspace_search_streams_file_results(tmp_path):
+    root = _workspace(tmp_path)
+    search = WorkspaceSearch(root, "hello", workers=2)
+    results = sorted(search.run(), key=lambda r: r.path)
+    assert [r.path.rsplit("/", 1)[-1] for r in results] == ["main.py", "notes.txt"]
+    assert sum(len(r.matches) for r in results) == 4
+
+def test_replace_preview_and_apply(tmp_path):
+    root = _workspace(tmp_path)
+    crlf = root / "src" / "win.txt"
+    crlf.write_bytes(b"hello there\r\nsay hello\r\n")
+    results = sorted(WorkspaceSearch(root, "hello", whole_word=True, workers=1).run(), key=lambda r: r.path)
+    previews = [m["replaced"] for r in results for m in r.to_dict("bye")["matches"]]
+    assert previews == ["print('bye')", "bye café", "café bye", "bye there", "say bye"]
+
+    progress = []
+    files, count = replace_in_files(
+        [r.path for r in results], "hello", "bye", whole_word=True,
+        progress=lambda done, total: progress.append((done, total))
+    )
+    assert (files, count) == (3, 5)
+    assert progress[-1] == (3, 3)
+    assert crlf.read_bytes() == b"bye there\r\nsay bye\r\n"
+    assert (root / "src" / "main.py").read_text() == "import os\nprint('bye')\nhello_world = 1\n"
+
+def test_replace_keeps_bytes_of_large_latin1_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(document, "LARGE_FILE_THRESHOLD", 1)
+    path = tmp_path / "legacy.txt"
+    path.write_bytes(b"caf\xe9 old\r\nna\xefve old\r\n")
+    assert replace_in_files([str(path)], "old", "new") == (1, 2)
+    assert path.read_bytes() == b"caf\xe9 new\r\nna\xefve new\r\n"